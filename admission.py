@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Module to bound the work the bot accepts and shed load with a cheap fallback
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from database import normalize_query
+
+BUSY_MESSAGE = ("I'm receiving a lot of messages right now and couldn't answer yours in time. "
+                "Please send it again in a minute.")
+
+
+class AdmissionController:
+    """
+    Admission control in front of the message pipeline.
+
+    A message is admitted only while fewer than max_in_flight messages are
+    queued or running; admitted messages that waited longer than
+    max_queue_age seconds before a worker picked them up are shed too. A shed
+    message gets a recently cached answer to the same question in the same
+    chat when there is one (answers depend on the guest's booking and thread,
+    so they are never shared across chats), or a polite busy message, without
+    touching OpenAI.
+    """
+
+    def __init__(self, max_in_flight: int = None, max_queue_age: float = None, cache_size: int = 500):
+        self.max_in_flight = max_in_flight or int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "64"))
+        self.max_queue_age = max_queue_age or float(os.environ.get("ADMISSION_MAX_QUEUE_AGE", "30"))
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._answers = OrderedDict()  # (chat id, normalized query) -> answer, LRU order
+        self._counters = {'admitted': 0, 'shed_full': 0, 'shed_expired': 0, 'served_cached': 0}
+
+    def try_admit(self) -> bool:
+        """Take an in-flight slot; False means the message must be shed"""
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self._counters['shed_full'] += 1
+                return False
+            self._in_flight += 1
+            self._counters['admitted'] += 1
+            return True
+
+    def release(self, count: int = 1):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - count)
+
+    def is_expired(self, enqueued_at: float) -> bool:
+        """Check (and count) whether an admitted message waited too long to start"""
+        if time.monotonic() - enqueued_at <= self.max_queue_age:
+            return False
+        with self._lock:
+            self._counters['shed_expired'] += 1
+        return True
+
+    def remember_answer(self, chat_id: str, query: str, answer: str):
+        key = (chat_id, normalize_query(query))
+        with self._lock:
+            self._answers[key] = answer
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.cache_size:
+                self._answers.popitem(last=False)
+
+    def cached_answer(self, chat_id: str, query: str) -> Optional[str]:
+        key = (chat_id, normalize_query(query))
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is not None:
+                self._answers.move_to_end(key)
+            return answer
+
+    def fallback(self, chat_id: str, query: str) -> str:
+        """Cheap reply for a shed message"""
+        answer = self.cached_answer(chat_id, query)
+        if answer is not None:
+            with self._lock:
+                self._counters['served_cached'] += 1
+            return answer
+        return BUSY_MESSAGE
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._counters)
+            metrics['in_flight'] = self._in_flight
+            metrics['max_in_flight'] = self.max_in_flight
+            metrics['shed'] = metrics['shed_full'] + metrics['shed_expired']
+            return metrics
+
+
+# Global admission controller instance
+admission_controller = None
+
+def get_admission_controller():
+    global admission_controller
+    if admission_controller is None:
+        admission_controller = AdmissionController()
+    return admission_controller
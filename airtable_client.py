@@ -3,9 +3,59 @@
 Module to handle Airtable connection and queries
 """
 import os
-from pyairtable import Api, Base, Table
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 import re
+from context_builder import Snippet
+from http_transport import mount_pool
+
+if TYPE_CHECKING:
+    from pyairtable import Table
+
+# Patterns to identify query types, checked in order
+QUERY_PATTERNS = {
+    'appliances': [
+        r'appliances?', r'refrigerator', r'fridge', r'oven', 
+        r'microwave', r'washer', r'dryer', r'coffee maker', r'toaster'
+    ],
+    'rooms': [
+        r'rooms?', r'bedrooms?', r'bathrooms?', r'kitchen', 
+        r'living room', r'dining room', r'terrace', r'balcony'
+    ],
+    'amenities': [
+        r'pool', r'jacuzzi', r'hot tub', r'gym', r'wifi', 
+        r'air conditioning', r'heating', r'tv', r'television'
+    ],
+    'location': [
+        r'floor', r'level', r'story', r'location',
+        r'first', r'second', r'third', r'fourth'
+    ]
+}
+
+def analyze_query(query: str) -> Dict[str, Any]:
+    """
+    Analyze a query to determine what type of information to search for
+    
+    Needs no Airtable connection, so routing can be replayed offline
+    (replay_routing.py).
+    """
+    query_lower = query.lower()
+    
+    # Determine what type of information to search for
+    query_type = 'general'
+    for category, pattern_list in QUERY_PATTERNS.items():
+        for pattern in pattern_list:
+            if re.search(pattern, query_lower):
+                query_type = category
+                break
+        if query_type != 'general':
+            break
+    
+    return {
+        'query_type': query_type,
+        'original_query': query,
+        'should_use_airtable': query_type != 'general'
+    }
 
 class AirtableClient:
     def __init__(self):
@@ -15,8 +65,13 @@ class AirtableClient:
         if not self.api_key or not self.base_id:
             raise ValueError("AIRTABLE_API_KEY and AIRTABLE_BASE_ID must be configured in .env")
         
+        # Imported here so importing this module stays cheap
+        from pyairtable import Api
+        
+        # One Api (and one pooled keep-alive session) for every table
         self.api = Api(self.api_key)
-        self.base = Base(self.api_key, self.base_id)
+        mount_pool(self.api.session)
+        self.base = self.api.base(self.base_id)
         
         # Table names
         self.items_table = "Items per property"
@@ -26,7 +81,7 @@ class AirtableClient:
         self._cache = {}
         self._cache_timeout = 300  # 5 minutes
     
-    def get_table(self, table_name: str) -> Table:
+    def get_table(self, table_name: str) -> 'Table':
         """Get a specific table"""
         return self.base.table(table_name)
     
@@ -177,43 +232,7 @@ class AirtableClient:
         """
         Analyze a query to determine what type of information to search for
         """
-        query_lower = query.lower()
-        
-        # Patterns to identify query types
-        patterns = {
-            'appliances': [
-                r'appliances?', r'refrigerator', r'fridge', r'oven', 
-                r'microwave', r'washer', r'dryer', r'coffee maker', r'toaster'
-            ],
-            'rooms': [
-                r'rooms?', r'bedrooms?', r'bathrooms?', r'kitchen', 
-                r'living room', r'dining room', r'terrace', r'balcony'
-            ],
-            'amenities': [
-                r'pool', r'jacuzzi', r'hot tub', r'gym', r'wifi', 
-                r'air conditioning', r'heating', r'tv', r'television'
-            ],
-            'location': [
-                r'floor', r'level', r'story', r'location',
-                r'first', r'second', r'third', r'fourth'
-            ]
-        }
-        
-        # Determine what type of information to search for
-        query_type = 'general'
-        for category, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                if re.search(pattern, query_lower):
-                    query_type = category
-                    break
-            if query_type != 'general':
-                break
-        
-        return {
-            'query_type': query_type,
-            'original_query': query,
-            'should_use_airtable': query_type != 'general'
-        }
+        return analyze_query(query)
     
     def format_response(self, data: Dict[str, Any], query: str) -> str:
         """
@@ -231,51 +250,72 @@ class AirtableClient:
         if items:
             response_parts.append("📦 **Items found:**")
             for item in items[:5]:  # Limit to 5 items
-                fields = item.get('fields', {})
-                
-                # Real fields from Items per property table
-                code = fields.get('Code', 'No description')
-                make = fields.get('Make (Brand)', '')
-                model = fields.get('Model', '')
-                category = fields.get('Category', [])
-                level = fields.get('Level of the house', [])
-                status = fields.get('Status', '')
-                
-                item_text = f"• **{code}**"
-                if make:
-                    item_text += f" (Brand: {make})"
-                if model:
-                    item_text += f" (Model: {model})"
-                if category:
-                    item_text += f" (Category: {', '.join(category)})"
-                if level:
-                    item_text += f" (Level: {', '.join(level)})"
-                if status:
-                    item_text += f" (Status: {status})"
-                
-                response_parts.append(item_text)
+                response_parts.append(self.format_item(item.get('fields', {})))
         
         # Format organization information
         if houses:
             response_parts.append("\n🏠 **House organization:**")
             for house in houses[:3]:  # Limit to 3 records
-                fields = house.get('fields', {})
-                
-                # Real fields from Houses Organization table
-                cod = fields.get('Cod', 'Not specified')
-                space = fields.get('Space', [])
-                properties = fields.get('Properties', [])
-                
-                house_text = f"• **{cod}**"
-                if space:
-                    house_text += f" (Spaces: {len(space)} references)"
-                if properties:
-                    house_text += f" (Properties: {len(properties)} references)"
-                
-                response_parts.append(house_text)
+                response_parts.append(self.format_house(house.get('fields', {})))
         
         return "\n".join(response_parts)
     
+    def format_item(self, fields: Dict[str, Any]) -> str:
+        """Format one record of the Items per property table"""
+        # Real fields from Items per property table
+        code = fields.get('Code', 'No description')
+        make = fields.get('Make (Brand)', '')
+        model = fields.get('Model', '')
+        category = fields.get('Category', [])
+        level = fields.get('Level of the house', [])
+        status = fields.get('Status', '')
+        
+        item_text = f"• **{code}**"
+        if make:
+            item_text += f" (Brand: {make})"
+        if model:
+            item_text += f" (Model: {model})"
+        if category:
+            item_text += f" (Category: {', '.join(category)})"
+        if level:
+            item_text += f" (Level: {', '.join(level)})"
+        if status:
+            item_text += f" (Status: {status})"
+        return item_text
+    
+    def format_house(self, fields: Dict[str, Any]) -> str:
+        """Format one record of the Houses Organization table"""
+        # Real fields from Houses Organization table
+        cod = fields.get('Cod', 'Not specified')
+        space = fields.get('Space', [])
+        properties = fields.get('Properties', [])
+        
+        house_text = f"• **{cod}**"
+        if space:
+            house_text += f" (Spaces: {len(space)} references)"
+        if properties:
+            house_text += f" (Properties: {len(properties)} references)"
+        return house_text
+    
+    def match_confidence(self, record: Dict[str, Any], query: str) -> float:
+        """
+        Fraction of the query's significant words that matched the record,
+        comparable with example similarities (0 to 1)
+        """
+        query_words = max(1, len([word for word in query.lower().split() if len(word) > 2]))
+        return min(1.0, record.get('match_score', 0) / query_words)
+    
+    def get_context_snippets(self, data: Dict[str, Any], query: str) -> List[Snippet]:
+        """Turn Airtable results into context snippets scored by match confidence"""
+        snippets = []
+        for item in data.get('items', []):
+            snippets.append(Snippet('airtable', "📦 **Items found:**", self.format_item(item.get('fields', {})),
+                                    self.match_confidence(item, query)))
+        for house in data.get('houses', []):
+            snippets.append(Snippet('airtable', "🏠 **House organization:**", self.format_house(house.get('fields', {})),
+                                    self.match_confidence(house, query)))
+        return snippets
+    
     def test_connection(self) -> bool:
         """
         Test Airtable connection
@@ -298,9 +338,13 @@ class AirtableClient:
 
 # Global Airtable client instance (will be initialized when needed)
 airtable_client = None
+_airtable_client_lock = threading.Lock()
 
 def get_airtable_client():
     global airtable_client
     if airtable_client is None:
-        airtable_client = AirtableClient()
+        # Startup checks may create it from another thread
+        with _airtable_client_lock:
+            if airtable_client is None:
+                airtable_client = AirtableClient()
     return airtable_client
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the conversation and feedback lookups, with and without indexes
+
+Fills a throwaway database with logged conversations (one million by
+default) and prints the query plan and timing of each hot query, first with
+the indexes from database.MIGRATIONS and then with them dropped. The text
+search runs both on the FTS5 index and as the LIKE scan it replaces.
+
+Usage:
+    python3 benchmark_database.py [conversations] [users]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from database import DatabaseManager
+
+QUERIES = {
+    'last conversation (/feedback)': ('''
+        SELECT id, query, response, timestamp
+        FROM conversation_logs
+        WHERE user_id = ?
+        ORDER BY id DESC
+        LIMIT 1
+    ''', lambda users: (f"user_{random.randrange(users)}",), 200),
+    'unprocessed feedback': ('''
+        SELECT id, user_id, original_query, original_response,
+               feedback_type, feedback_text, timestamp
+        FROM feedback
+        WHERE processed = FALSE
+        ORDER BY id DESC
+    ''', lambda users: (), 10),
+    'text search (FTS5)': ('''
+        SELECT c.id, c.query, c.response
+        FROM conversation_search s
+        JOIN conversation_logs c ON c.id = s.rowid
+        WHERE conversation_search MATCH ?
+        ORDER BY s.rank
+        LIMIT 20
+    ''', lambda users: (f'"{random.randrange(17, users)}"',), 200),
+    'text search (LIKE)': ('''
+        SELECT id, query, response
+        FROM conversation_logs
+        WHERE query LIKE ? OR response LIKE ?
+        LIMIT 20
+    ''', lambda users: (f"%item {random.randrange(users)}?%",) * 2, 5),
+}
+
+
+def populate(db: DatabaseManager, conversations: int, users: int):
+    print(f"📝 Logging {conversations:,} conversations from {users:,} users...")
+    started = time.monotonic()
+    batch = 10000
+    with db._connect() as conn:
+        for start in range(0, conversations, batch):
+            conn.executemany('''
+                INSERT INTO conversation_logs (user_id, query, response, response_time, used_rag, used_airtable)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(f"user_{random.randrange(users)}", f"Where is the item {i}?", f"It is in room {i % 17}.",
+                   random.random() * 5, True, i % 3 == 0)
+                  for i in range(start, min(start + batch, conversations))])
+        # Almost all feedback has been processed already
+        conn.executemany('''
+            INSERT INTO feedback (conversation_id, user_id, original_query, original_response,
+                                  feedback_type, feedback_text, processed)
+            VALUES (?, ?, 'query', 'response', 'example_response', 'expected', ?)
+        ''', [(i, f"user_{i % users}", i % 100 != 0) for i in range(1, conversations // 20)])
+    print(f"   done in {time.monotonic() - started:.1f}s")
+
+
+def run_queries(db: DatabaseManager, users: int):
+    conn = db._connect()
+    for name, (sql, params, runs) in QUERIES.items():
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params(users))]
+        started = time.perf_counter()
+        for _ in range(runs):
+            conn.execute(sql, params(users)).fetchall()
+        elapsed = (time.perf_counter() - started) / runs * 1000
+        print(f"   • {name}: {elapsed:.3f} ms")
+        for step in plan:
+            print(f"       {step}")
+
+
+def main():
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "benchmark.db"))
+        populate(db, conversations, users)
+        db._connect().execute("ANALYZE")
+
+        print("\n⚡ With indexes:")
+        run_queries(db, users)
+
+        with db._connect() as conn:
+            conn.execute("DROP INDEX idx_conversation_logs_user")
+            conn.execute("DROP INDEX idx_feedback_unprocessed")
+        db.close()  # fresh connection, so no statement is planned against the old schema
+        print("\n🐢 Without indexes:")
+        run_queries(db, users)
+
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Telegram Bot with Pinecone on a native asyncio runtime: RAG + Airtable + Successful response examples
+
+Same pipeline as bot_pinecone.py, but built on python-telegram-bot 20+ and
+AsyncOpenAI so one process can serve hundreds of concurrent chats without a
+thread per in-flight request. Airtable, Pinecone and SQLite calls are still
+synchronous SDKs and are offloaded to a bounded executor.
+"""
+import asyncio
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from openai import AsyncOpenAI
+from telegram.ext import Application, MessageHandler, CommandHandler, filters
+try:
+    from telegram.ext import AIORateLimiter
+except ImportError:
+    AIORateLimiter = None
+from dotenv import load_dotenv
+from database import db, get_database
+from airtable_client import get_airtable_client, analyze_query
+from pinecone_client import get_pinecone_manager
+from coalescer import MessageCoalescer
+from inflight import get_inflight_tracker, RequestSuperseded
+from context_builder import get_context_builder
+from fast_path import get_fast_path_router, routing_record
+from send_queue import split_message
+from log_writer import get_log_writer
+from feedback_worker import get_feedback_worker
+from chat_state import ChatStateStore, MODE_NORMAL, MODE_WAITING_FEEDBACK
+
+# Load environment variables
+load_dotenv()
+
+# Global variables
+TELEGRAM_TOKEN = os.environ["TELEGRAM_TOKEN"]
+ASSISTANT_ID = os.environ["ASSISTANT_ID"]
+MAX_CONCURRENT_CHATS = int(os.environ.get("MAX_CONCURRENT_CHATS", "200"))
+IO_WORKERS = int(os.environ.get("IO_WORKERS", "32"))
+BOT_MODE = os.environ.get("BOT_MODE", "polling")  # polling | webhook
+
+client = AsyncOpenAI()
+chat_states = ChatStateStore()  # chat_id -> ChatState, in memory only so the event loop never blocks on it
+chat_locks = {}  # chat_id -> [asyncio.Lock, users], one Assistant run per thread at a time
+coalescer = None
+loop = None
+concurrency = None
+in_progress = 0
+airtable_ready = False  # set by main(); without Airtable the bot answers from Pinecone and the Assistant
+
+@asynccontextmanager
+async def chat_turn(chat_id):
+    """Serialize work for one chat; the lock is dropped once nobody waits on it"""
+    entry = chat_locks.setdefault(chat_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del chat_locks[chat_id]
+
+async def handle_msg(update, context):
+    """Buffer the message so rapid-fire messages from one chat become a single request"""
+    chat_id = str(update.effective_chat.id)
+    text = update.message.text
+
+    print(f"📨 Message received from {chat_id}: {text[:50]}...")
+
+    if chat_states.get(chat_id).mode == MODE_WAITING_FEEDBACK:
+        print(f"📝 Processing feedback input for {chat_id}")
+        async with chat_turn(chat_id):
+            await handle_feedback_input(update, context)
+        return
+
+    # A newer message may make the chat's in-flight answer stale
+    get_inflight_tracker().supersede(chat_id)
+    coalescer.add(chat_id, update)
+
+def flush_messages(chat_id, updates):
+    """Called from the coalescer thread: schedule the batch on the event loop"""
+    if len(updates) > 1:
+        print(f"🧩 Merged {len(updates)} messages from {chat_id}")
+    asyncio.run_coroutine_threadsafe(process_message(chat_id, updates), loop)
+
+async def process_message(chat_id, updates):
+    global in_progress
+    async with chat_turn(chat_id), concurrency:
+        # Reply to the latest message of the batch
+        update = updates[-1]
+        request = get_inflight_tracker().begin(chat_id, [u.message.text for u in updates])
+        in_progress += 1
+        try:
+            text = "\n".join(request.texts)
+
+            # Medir tiempo de respuesta (and of each stage, in ms, logged with the conversation)
+            start_time = time.time()
+            telemetry = {}
+
+            # Obtener clientes
+            airtable_client = get_airtable_client() if airtable_ready else None
+            pinecone_manager = get_pinecone_manager()
+
+            # Analizar la consulta para determinar si usar Airtable
+            stage_started = time.perf_counter()
+            query_analysis = analyze_query(text)
+            telemetry['routing_ms'] = (time.perf_counter() - stage_started) * 1000
+            should_use_airtable = query_analysis['should_use_airtable'] and airtable_client is not None
+
+            print(f"🔍 Query analysis: {query_analysis['query_type']} (use Airtable: {should_use_airtable})")
+
+            # Airtable and Pinecone lookups run concurrently in the executor
+            airtable_task = None
+            if should_use_airtable:
+                print("📊 Querying Airtable...")
+                airtable_task = asyncio.to_thread(timed, telemetry, 'airtable_ms', airtable_client.get_property_info, text)
+            examples_task = asyncio.to_thread(pinecone_manager.search_similar_examples, text, 3, timings=telemetry)
+
+            if airtable_task:
+                airtable_data, examples = await asyncio.gather(airtable_task, examples_task)
+                print(f"📊 Airtable data: {len(airtable_data['items'])} items, {len(airtable_data['houses'])} houses")
+            else:
+                airtable_data, examples = None, await examples_task
+            request.check()
+
+            # Prepare context snippets
+            snippets = []
+            if airtable_data and (airtable_data['items'] or airtable_data['houses']):
+                snippets.extend(airtable_client.get_context_snippets(airtable_data, text))
+            snippets.extend(pinecone_manager.get_context_snippets(examples))
+
+            # Answer directly when retrieval is confident enough
+            stage_started = time.perf_counter()
+            decision = get_fast_path_router().route(text, query_analysis['query_type'], airtable_data, examples, airtable_client)
+            telemetry['routing_ms'] += (time.perf_counter() - stage_started) * 1000
+            context_stats = None
+            if decision['route'] != 'llm':
+                reply = decision['reply']
+                used_rag = False
+                used_airtable = decision['route'] == 'airtable'
+                used_pinecone = decision['route'] == 'example'
+            else:
+                # Pack the most relevant snippets into the token budget
+                context_text, context_stats = get_context_builder().build(snippets)
+                print(f"📋 Context: {context_stats['packed']}/{context_stats['candidates']} snippets, "
+                      f"{context_stats['tokens']}/{context_stats['budget']} tokens "
+                      f"({context_stats['duplicates']} duplicates, {context_stats['truncated']} truncated)")
+
+                reply = await ask_assistant(chat_id, text, context_text, request, telemetry)
+                used_rag = True
+                used_airtable = 'airtable' in context_stats['sources']
+                used_pinecone = 'pinecone' in context_stats['sources']
+
+            # Calculate response time
+            response_time = time.time() - start_time
+
+            # Send response (unless a newer message superseded it meanwhile)
+            if not request.mark_replied():
+                request.check()
+            stage_started = time.perf_counter()
+            for part in split_message(reply):
+                await update.message.reply_text(part)
+            telemetry['send_ms'] = (time.perf_counter() - stage_started) * 1000
+
+            # Log conversation and its routing (queued, written in batches off the event loop;
+            # log() itself may reserve a block of ids in SQLite, so it runs in the executor too)
+            sources = (['airtable'] if should_use_airtable else []) + ['pinecone']
+            routing = routing_record(text, query_analysis['query_type'], sources, decision, examples,
+                                     airtable_data, airtable_client, context_stats)
+            conversation_id = await asyncio.to_thread(
+                get_log_writer().log,
+                user_id=chat_id,
+                query=text,
+                response=reply,
+                response_time=response_time,
+                used_rag=used_rag,
+                used_airtable=used_airtable,
+                used_pinecone=used_pinecone,
+                telemetry=telemetry,
+                routing=routing
+            )
+
+            # Keep the conversation for /feedback
+            chat_states.set_last_conversation(chat_id, conversation_id, text, reply)
+
+            print(f"✅ Response sent to {chat_id} in {response_time:.2f}s via {decision['route']} (RAG: {used_rag}, Airtable: {used_airtable}, Pinecone: {used_pinecone})")
+
+        except RequestSuperseded:
+            print(f"⏭️ Dropped stale request for {chat_id}")
+        except Exception as e:
+            print(f"❌ Error processing message: {e}")
+            import traceback
+            print(f"🔍 Full error traceback:")
+            traceback.print_exc()
+            await update.message.reply_text("Sorry, there was an error processing your message. Please try again.")
+        finally:
+            in_progress -= 1
+            get_inflight_tracker().finish(request)
+
+def timed(telemetry, name, func, *args):
+    """Call func and record how long it took, in ms, under telemetry[name]"""
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        telemetry[name] = (time.perf_counter() - started) * 1000
+
+async def ask_assistant(chat_id, text, context_text, request, telemetry=None):
+    """Run the OpenAI Assistant on the chat's thread and return its reply; telemetry gets run timings and tokens"""
+    telemetry = telemetry if telemetry is not None else {}
+    print("🧠 Using OpenAI Assistant...")
+
+    # 1) thread per chat
+    thread_id = chat_states.get(chat_id).thread_id
+    if thread_id is None:
+        t = await client.beta.threads.create()
+        thread_id = t.id
+        chat_states.set_thread(chat_id, thread_id)
+
+    # 2) Prepare message with context if available
+    message_content = text
+    if context_text:
+        message_content = f"Context for reference:\n{context_text}\n\nGuest question: {text}"
+        print(f"📝 Message with context: {len(message_content)} characters")
+
+    # 3) user message
+    stage_started = time.perf_counter()
+    await client.beta.threads.messages.create(thread_id=thread_id, role="user", content=message_content)
+
+    # 4) Assistant run
+    request.check()
+    run = await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=ASSISTANT_ID)
+    request.set_run(thread_id, run.id)
+    telemetry['run_create_ms'] = (time.perf_counter() - stage_started) * 1000
+
+    # 5) polling without blocking the event loop
+    stage_started = time.perf_counter()
+    telemetry['poll_count'] = 0
+    cancel_sent = False
+    while True:
+        r = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+        telemetry['poll_count'] += 1
+        if r.status in ["completed","failed","requires_action","cancelled","expired"]: break
+        if request.cancelled and not cancel_sent:
+            print(f"🛑 Cancelling run {run.id} for {chat_id}")
+            try:
+                await client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+            except Exception as e:
+                print(f"⚠️ Could not cancel run {run.id}: {e}")
+            cancel_sent = True
+        await asyncio.sleep(0.7)
+    telemetry['poll_wait_ms'] = (time.perf_counter() - stage_started) * 1000
+    if r.usage:
+        telemetry['prompt_tokens'] = r.usage.prompt_tokens
+        telemetry['completion_tokens'] = r.usage.completion_tokens
+    request.check()
+
+    # 6) last response
+    msgs = await client.beta.threads.messages.list(thread_id=thread_id, order="desc")
+    return msgs.data[0].content[0].text.value
+
+async def get_last_conversation(chat_id):
+    """Last conversation of the chat, from the state cache or else from the log"""
+    last_conv = chat_states.last_conversation(chat_id)
+    if last_conv is None:
+        await asyncio.to_thread(get_log_writer().flush)
+        last_conv = await asyncio.to_thread(db.get_last_conversation, chat_id)
+    return last_conv
+
+async def handle_feedback_input(update, context):
+    """Handle user feedback input with expected response"""
+    chat_id = str(update.effective_chat.id)
+    text = update.message.text
+
+    # The conversation /feedback showed (older states only have the last one)
+    last_conv = chat_states.feedback_conversation(chat_id) or await get_last_conversation(chat_id)
+    if not last_conv:
+        await update.message.reply_text("I can't find a recent conversation to give feedback on.")
+        chat_states.set_mode(chat_id, MODE_NORMAL)
+        return
+
+    # Save feedback in SQLite (the conversation row may still be queued)
+    await asyncio.to_thread(get_log_writer().flush)
+    await asyncio.to_thread(
+        db.add_feedback,
+        user_id=chat_id,
+        original_query=last_conv['query'],
+        original_response=last_conv['response'],
+        feedback_type='example_response',
+        feedback_text=text,
+        conversation_id=last_conv['id']
+    )
+
+    # The feedback worker turns it into a Pinecone example in its next batch
+    get_feedback_worker().wake()
+    await update.message.reply_text("✅ Thank you! Your expected response will be saved as a successful example. This will help improve my future responses.")
+
+    # Reset state
+    chat_states.set_mode(chat_id, MODE_NORMAL)
+    print(f"✅ Reset user state for {chat_id} to 'normal'")
+
+async def feedback_command(update, context):
+    """Command /feedback - Request expected response"""
+    chat_id = str(update.effective_chat.id)
+
+    # Check if there's a recent conversation (cached, the log is only read after eviction)
+    last_conv = await get_last_conversation(chat_id)
+    if not last_conv:
+        await update.message.reply_text("I can't find a recent conversation to give feedback on.")
+        return
+
+    # Show last conversation and request expected response
+    feedback_text = f"""
+🤖 **Feedback Request**
+
+**Guest Question:** {last_conv['query']}
+
+**Bot Response:** {last_conv['response']}
+
+---
+**💡 How should I have responded?**
+"""
+
+    await update.message.reply_text(feedback_text)
+    chat_states.request_feedback(chat_id, last_conv)
+    print(f"⏳ Set user state for {chat_id} to 'waiting_feedback'")
+
+async def stats_command(update, context):
+    """Command /stats"""
+    # SQLite and Pinecone statistics
+    pinecone_manager = get_pinecone_manager()
+    sqlite_stats, pinecone_stats = await asyncio.gather(
+        asyncio.to_thread(db.get_feedback_stats),
+        asyncio.to_thread(pinecone_manager.get_index_stats)
+    )
+
+    stats_text = f"""
+📊 **Bot Statistics:**
+
+**💾 Local database:**
+• Total conversations: {sqlite_stats['total_conversations']}
+• Conversations with feedback: {sqlite_stats['conversations_with_feedback']}
+• Feedback rate: {sqlite_stats['feedback_rate']:.1f}%
+
+**🧠 Example memory (Pinecone):**
+• Total examples: {pinecone_stats.get('total_vector_count', 0)}
+• Dimension: {pinecone_stats.get('dimension', 'N/A')}
+
+**Feedback types:**
+"""
+
+    for feedback_type, count in sqlite_stats['feedback_types'].items():
+        emoji = "📝" if feedback_type == "example_response" else "👍" if feedback_type == "positive" else "👎" if feedback_type == "negative" else "📝"
+        stats_text += f"• {emoji} {feedback_type}: {count}\n"
+
+    stats_text += f"""
+**⚙️ Runtime:**
+• Chats in progress: {in_progress}/{MAX_CONCURRENT_CHATS}
+• Chats waiting: {sum(users for _, users in chat_locks.values()) - in_progress}
+"""
+
+    await update.message.reply_text(stats_text)
+
+async def help_command(update, context):
+    """Command /help"""
+    help_text = """
+🤖 **Available commands:**
+
+• `/feedback` - Provide the response you expected
+• `/stats` - View usage statistics and examples
+• `/help` - Show this help
+
+**Information sources:**
+• 🧠 **RAG (OpenAI)** - For general queries
+• 📊 **Airtable** - For specific property data
+• 📚 **Pinecone** - Examples of successful responses
+
+Your feedback helps me improve continuously! 🚀
+"""
+    await update.message.reply_text(help_text)
+
+async def post_init(application):
+    """Set up the executor, concurrency limit and coalescer on the running loop"""
+    global loop, concurrency, coalescer
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io"))
+    concurrency = asyncio.Semaphore(MAX_CONCURRENT_CHATS)
+    coalescer = MessageCoalescer(on_flush=flush_messages)
+    coalescer.start()
+    # Open the database (and run its migrations) before the first message, off the loop
+    await asyncio.to_thread(get_database)
+    get_log_writer()
+    get_feedback_worker().start()
+
+async def post_shutdown(application):
+    if coalescer:
+        coalescer.stop(flush=False)
+    await asyncio.to_thread(get_feedback_worker().stop)
+    await asyncio.to_thread(get_log_writer().stop)
+    await client.close()
+
+def main():
+    print("🤖 Starting async bot with Pinecone (RAG + Airtable + Examples)...")
+    print(f"📱 Token: {TELEGRAM_TOKEN[:10]}...")
+    print(f"🧠 Assistant: {ASSISTANT_ID}")
+
+    # Test connections
+    global airtable_ready
+    print("📊 Testing Airtable connection...")
+    try:
+        airtable_ready = get_airtable_client().test_connection()
+    except Exception as e:
+        print(f"❌ Error creating Airtable client: {e}")
+    if not airtable_ready:
+        print("⚠️ Airtable not available, answering without it")
+
+    print("🧠 Testing Pinecone connection...")
+    stats = get_pinecone_manager().get_index_stats()
+    print(f"✅ Pinecone connection successful ({stats.get('total_vector_count', 0)} examples)")
+
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(True)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    # PTB's rate limiter (python-telegram-bot[rate-limiter]) paces sends and honors retry_after
+    try:
+        builder = builder.rate_limiter(AIORateLimiter(max_retries=3))
+    except (TypeError, RuntimeError):
+        print("⚠️ AIORateLimiter not available, sends are not rate limited")
+    app = builder.build()
+
+    # Handlers
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_msg))
+    app.add_handler(CommandHandler("feedback", feedback_command))
+    app.add_handler(CommandHandler("stats", stats_command))
+    app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("start", help_command))
+
+    print(f"✅ Async bot started (up to {MAX_CONCURRENT_CHATS} concurrent chats, {IO_WORKERS} I/O workers)")
+    print("🛑 Press Ctrl+C to stop the bot")
+
+    # run_polling / run_webhook handle SIGINT/SIGTERM and shut the application down cleanly.
+    # WEBHOOK_QUEUE_SIZE (webhook_server.py) does not apply here: MAX_CONCURRENT_CHATS bounds the work
+    if BOT_MODE == "webhook":
+        app.run_webhook(
+            listen=os.environ.get("WEBHOOK_LISTEN", "0.0.0.0"),
+            port=int(os.environ.get("WEBHOOK_PORT", "8443")),
+            url_path=os.environ.get("WEBHOOK_PATH", "/telegram").lstrip("/"),
+            webhook_url=os.environ["WEBHOOK_URL"],
+            # Like webhook_server.py: without a configured secret, a random one still rejects forged updates
+            secret_token=os.environ.get("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+        )
+    else:
+        app.run_polling()
+
+if __name__ == "__main__":
+    main()
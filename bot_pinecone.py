@@ -2,16 +2,36 @@
 """
 Telegram Bot with Pinecone: RAG + Airtable + Successful response examples
 """
-from openai import OpenAI
+import time
+IMPORTS_STARTED = time.monotonic()
+from telegram import Update
 from telegram.ext import Updater, MessageHandler, Filters, CommandHandler
 import os
 from dotenv import load_dotenv
 import signal
 import sys
-import time
-from database import db
-from airtable_client import get_airtable_client
+from database import db, get_database
+from airtable_client import get_airtable_client, analyze_query
 from pinecone_client import get_pinecone_manager
+from dispatcher import get_dispatcher, PRIORITY_HIGH
+from coalescer import MessageCoalescer
+from inflight import get_inflight_tracker, RequestSuperseded
+from context_builder import get_context_builder
+from fast_path import get_fast_path_router, routing_record
+from webhook_server import WebhookServer
+from send_queue import OutboundScheduler
+from thread_pool import AssistantThreadPool
+from http_transport import get_openai_client, get_transport_metrics, telegram_request_kwargs
+import http_transport
+from chat_state import get_chat_state_store, MODE_NORMAL, MODE_WAITING_FEEDBACK
+from admission import get_admission_controller
+from log_writer import get_log_writer
+from log_retention import get_log_retention
+from feedback_worker import get_feedback_worker
+from startup import get_startup_checks
+
+startup = get_startup_checks()
+startup.phase('imports', since=IMPORTS_STARTED)
 
 # Load environment variables
 load_dotenv()
@@ -20,35 +40,105 @@ load_dotenv()
 OPENAI_KEY = os.environ["OPENAI_API_KEY"]
 TELEGRAM_TOKEN = os.environ["TELEGRAM_TOKEN"]
 ASSISTANT_ID = os.environ["ASSISTANT_ID"]
-
-client = OpenAI()
-threads = {}  # chat_id -> thread_id
-user_states = {}  # chat_id -> estado actual del usuario
+BOT_MODE = os.environ.get("BOT_MODE", "polling")  # polling | webhook
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+
+chat_states = get_chat_state_store()  # chat_id -> ChatState, written through to the shared state store
+coalescer = None
+outbound = None  # OutboundScheduler, started in main()
+thread_pool = None  # AssistantThreadPool, started in build_updater()
+
+def send_reply(update, text, on_sent=None):
+    """Send a reply through the outbound scheduler so bursts respect Telegram's limits"""
+    if outbound is None:
+        update.message.reply_text(text)
+        if on_sent:
+            on_sent(True)
+        return
+    # Like reply_text, only quote the guest's message in group chats
+    reply_to = update.message.message_id if update.effective_chat.type != 'private' else None
+    outbound.send(update.effective_chat.id, text, reply_to_message_id=reply_to, on_sent=on_sent)
+
+def send_timer(conversation_id):
+    """on_sent callback recording the conversation's send_ms, from queueing to delivery"""
+    started = time.perf_counter()
+    def on_sent(delivered):
+        if delivered:
+            get_log_writer().record_send(conversation_id, (time.perf_counter() - started) * 1000)
+    return on_sent
 
 def handle_msg(update, context):
-    try:
-        chat_id = str(update.effective_chat.id)
-        text = update.message.text
-        
-        print(f"📨 Message received from {chat_id}: {text[:50]}...")
+    """Buffer the message so rapid-fire messages from one chat become a single request"""
+    chat_id = str(update.effective_chat.id)
+    text = update.message.text
+    
+    print(f"📨 Message received from {chat_id}: {text[:50]}...")
+
+    # Verificar si el usuario está en modo feedback
+    mode = chat_states.get(chat_id).mode
+    print(f"🔍 User state for {chat_id}: {mode}")
+    if mode == MODE_WAITING_FEEDBACK:
+        print(f"📝 Processing feedback input for {chat_id}")
+        get_dispatcher().submit(chat_id, handle_feedback_input, update, context, priority=PRIORITY_HIGH)
+        return
 
-        # Verificar si el usuario está en modo feedback
-        print(f"🔍 User state for {chat_id}: {user_states.get(chat_id, 'normal')}")
-        if chat_id in user_states and user_states[chat_id] == 'waiting_feedback':
-            print(f"📝 Processing feedback input for {chat_id}")
-            handle_feedback_input(update, context)
-            return
+    # Shed load up front when too many messages are already queued or running
+    admission = get_admission_controller()
+    if not admission.try_admit():
+        print(f"🚫 Overloaded, shedding message from {chat_id}")
+        send_reply(update, admission.fallback(chat_id, text))
+        return
 
-        # Medir tiempo de respuesta
+    # A newer message may make the chat's in-flight answer stale
+    get_inflight_tracker().supersede(chat_id)
+    get_coalescer().add(chat_id, (update, context, time.monotonic()))
+
+def flush_messages(chat_id, items):
+    """Hand a coalesced batch to the dispatcher so slow chats don't block the others"""
+    updates = [update for update, _, _ in items]
+    context = items[-1][1]
+    received_at = items[0][2]
+    if len(updates) > 1:
+        print(f"🧩 Merged {len(updates)} messages from {chat_id}")
+    get_dispatcher().submit(chat_id, process_message, updates, context, received_at)
+
+def get_coalescer():
+    global coalescer
+    if coalescer is None:
+        coalescer = MessageCoalescer(on_flush=flush_messages)
+        coalescer.start()
+    return coalescer
+
+def process_message(updates, context, received_at):
+    # Reply to the latest message of the batch
+    update = updates[-1]
+    chat_id = str(update.effective_chat.id)
+    
+    # Messages that waited too long in the queue get the cheap fallback instead
+    admission = get_admission_controller()
+    if admission.is_expired(received_at):
+        print(f"🚫 Shedding request from {chat_id} after {time.monotonic() - received_at:.1f}s in queue")
+        send_reply(update, admission.fallback(chat_id, "\n".join(u.message.text for u in updates)))
+        admission.release(len(updates))
+        return
+    
+    request = get_inflight_tracker().begin(chat_id, [u.message.text for u in updates])
+    try:
+        text = "\n".join(request.texts)
+
+        # Medir tiempo de respuesta (and of each stage, in ms, logged with the conversation)
         start_time = time.time()
+        telemetry = {}
 
-        # Obtener clientes
-        airtable_client = get_airtable_client()
-        pinecone_manager = get_pinecone_manager()
+        # Obtener clientes (a backend whose startup check has not passed yet is skipped)
+        airtable_client = get_airtable_client() if startup.is_ready('airtable') else None
+        pinecone_manager = get_pinecone_manager() if startup.is_ready('pinecone') else None
         
         # Analizar la consulta para determinar si usar Airtable
-        query_analysis = airtable_client.analyze_query(text)
-        should_use_airtable = query_analysis['should_use_airtable']
+        stage_started = time.perf_counter()
+        query_analysis = analyze_query(text)
+        telemetry['routing_ms'] = (time.perf_counter() - stage_started) * 1000
+        should_use_airtable = query_analysis['should_use_airtable'] and airtable_client is not None
         
         print(f"🔍 Query analysis: {query_analysis['query_type']} (use Airtable: {should_use_airtable})")
 
@@ -56,106 +146,171 @@ def handle_msg(update, context):
         airtable_data = None
         if should_use_airtable:
             print("📊 Querying Airtable...")
+            stage_started = time.perf_counter()
             airtable_data = airtable_client.get_property_info(text)
+            telemetry['airtable_ms'] = (time.perf_counter() - stage_started) * 1000
             print(f"📊 Airtable data: {len(airtable_data['items'])} items, {len(airtable_data['houses'])} houses")
+            request.check()
 
-        # Prepare context
-        context_parts = []
+        # Prepare context snippets
+        snippets = []
         
         # Airtable context
         if airtable_data and (airtable_data['items'] or airtable_data['houses']):
-            airtable_context = airtable_client.format_response(airtable_data, text)
-            if airtable_context != "I didn't find specific information about that in my database.":
-                context_parts.append(airtable_context)
-                print(f"📋 Airtable context: {len(airtable_context)} characters")
+            snippets.extend(airtable_client.get_context_snippets(airtable_data, text))
         
         # Pinecone successful examples context
-        pinecone_context = pinecone_manager.get_examples_for_context(text, top_k=2)
-        if pinecone_context:
-            context_parts.append(pinecone_context)
-            print(f"📚 Pinecone context: {len(pinecone_context)} characters")
+        examples = []
+        if pinecone_manager:
+            examples = pinecone_manager.search_similar_examples(text, top_k=3, timings=telemetry)
+            snippets.extend(pinecone_manager.get_context_snippets(examples))
+            request.check()
         
-        # Always use OpenAI Assistant, but with context if available
-        print("🧠 Using OpenAI Assistant...")
-        
-        # 1) thread per chat
-        if chat_id not in threads:
-            t = client.beta.threads.create()
-            threads[chat_id] = t.id
-        thread_id = threads[chat_id]
-
-        # 2) Prepare message with context if available
-        message_content = text
-        if context_parts:
-            context_text = "\n\n".join(context_parts)
-            message_content = f"Context for reference:\n{context_text}\n\nGuest question: {text}"
-            print(f"📝 Message with context: {len(message_content)} characters")
-
-        # 3) user message
-        client.beta.threads.messages.create(thread_id=thread_id, role="user", content=message_content)
-
-        # 4) Assistant run
-        run = client.beta.threads.runs.create(thread_id=thread_id, assistant_id=ASSISTANT_ID)
-
-        # 5) basic polling
-        while True:
-            r = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
-            if r.status in ["completed","failed","requires_action"]: break
-            time.sleep(0.7)
-
-        # 6) last response
-        msgs = client.beta.threads.messages.list(thread_id=thread_id, order="desc")
-        reply = msgs.data[0].content[0].text.value
-        used_rag = True
-        used_airtable = bool(airtable_data and (airtable_data['items'] or airtable_data['houses']))
-        used_pinecone = bool(pinecone_context)
+        # Answer directly when retrieval is confident enough
+        stage_started = time.perf_counter()
+        decision = get_fast_path_router().route(text, query_analysis['query_type'], airtable_data, examples, airtable_client)
+        telemetry['routing_ms'] += (time.perf_counter() - stage_started) * 1000
+        context_stats = None
+        if decision['route'] != 'llm':
+            reply = decision['reply']
+            used_rag = False
+            used_airtable = decision['route'] == 'airtable'
+            used_pinecone = decision['route'] == 'example'
+        else:
+            # Pack the most relevant snippets into the token budget
+            context_text, context_stats = get_context_builder().build(snippets)
+            print(f"📋 Context: {context_stats['packed']}/{context_stats['candidates']} snippets, "
+                  f"{context_stats['tokens']}/{context_stats['budget']} tokens "
+                  f"({context_stats['duplicates']} duplicates, {context_stats['truncated']} truncated)")
+            
+            reply = ask_assistant(chat_id, text, context_text, request, telemetry)
+            used_rag = True
+            used_airtable = 'airtable' in context_stats['sources']
+            used_pinecone = 'pinecone' in context_stats['sources']
         
         # Calculate response time
         response_time = time.time() - start_time
         
-        # Send response
-        update.message.reply_text(reply)
+        # Send response (unless a newer message superseded it meanwhile)
+        if not request.mark_replied():
+            request.check()
         
-        # Log conversation
-        conversation_id = db.log_conversation(
+        # Log conversation and its routing (queued, written in batches off this thread)
+        sources = (['airtable'] if should_use_airtable else []) + (['pinecone'] if pinecone_manager else [])
+        routing = routing_record(text, query_analysis['query_type'], sources, decision, examples,
+                                 airtable_data, airtable_client, context_stats)
+        conversation_id = get_log_writer().log(
             user_id=chat_id,
             query=text,
             response=reply,
             response_time=response_time,
             used_rag=used_rag,
-            used_airtable=used_airtable
+            used_airtable=used_airtable,
+            used_pinecone=used_pinecone,
+            telemetry=telemetry,
+            routing=routing
         )
+        # send_ms is filled in once the outbound queue has delivered the reply
+        send_reply(update, reply, on_sent=send_timer(conversation_id))
+        admission.remember_answer(chat_id, text, reply)
         
-        # Save conversation ID for feedback
-        if chat_id not in user_states or not isinstance(user_states[chat_id], dict):
-            user_states[chat_id] = {}
-        user_states[chat_id]['last_conversation_id'] = conversation_id
+        # Keep the conversation for /feedback
+        chat_states.set_last_conversation(chat_id, conversation_id, text, reply)
         
-        print(f"✅ Response sent to {chat_id} in {response_time:.2f}s (RAG: {used_rag}, Airtable: {used_airtable}, Pinecone: {used_pinecone})")
+        print(f"✅ Response sent to {chat_id} in {response_time:.2f}s via {decision['route']} (RAG: {used_rag}, Airtable: {used_airtable}, Pinecone: {used_pinecone})")
         
+    except RequestSuperseded:
+        print(f"⏭️ Dropped stale request for {chat_id}")
     except Exception as e:
         print(f"❌ Error processing message: {e}")
         import traceback
         print(f"🔍 Full error traceback:")
         traceback.print_exc()
-        update.message.reply_text("Sorry, there was an error processing your message. Please try again.")
+        send_reply(update, "Sorry, there was an error processing your message. Please try again.")
+    finally:
+        get_inflight_tracker().finish(request)
+        admission.release(len(updates))
+
+def ask_assistant(chat_id, text, context_text, request, telemetry=None):
+    """Run the OpenAI Assistant on the chat's thread and return its reply; telemetry gets run timings and tokens"""
+    telemetry = telemetry if telemetry is not None else {}
+    print("🧠 Using OpenAI Assistant...")
+    client = get_openai_client()
+    
+    # 1) thread per chat (new chats claim a pre-created one)
+    thread_id = chat_states.get(chat_id).thread_id
+    if thread_id is None:
+        thread_id = thread_pool.claim() if thread_pool else client.beta.threads.create().id
+        chat_states.set_thread(chat_id, thread_id)
+
+    # 2) Prepare message with context if available
+    message_content = text
+    if context_text:
+        message_content = f"Context for reference:\n{context_text}\n\nGuest question: {text}"
+        print(f"📝 Message with context: {len(message_content)} characters")
+
+    # 3) user message
+    stage_started = time.perf_counter()
+    client.beta.threads.messages.create(thread_id=thread_id, role="user", content=message_content)
+
+    # 4) Assistant run
+    request.check()
+    run = client.beta.threads.runs.create(thread_id=thread_id, assistant_id=ASSISTANT_ID)
+    request.set_run(thread_id, run.id)
+    telemetry['run_create_ms'] = (time.perf_counter() - stage_started) * 1000
+
+    # 5) basic polling (a superseded run is cancelled, then awaited so the thread is free again)
+    stage_started = time.perf_counter()
+    telemetry['poll_count'] = 0
+    cancel_sent = False
+    while True:
+        r = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+        telemetry['poll_count'] += 1
+        if r.status in ["completed","failed","requires_action","cancelled","expired"]: break
+        if request.cancelled and not cancel_sent:
+            print(f"🛑 Cancelling run {run.id} for {chat_id}")
+            try:
+                client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+            except Exception as e:
+                print(f"⚠️ Could not cancel run {run.id}: {e}")
+            cancel_sent = True
+        time.sleep(0.7)
+    telemetry['poll_wait_ms'] = (time.perf_counter() - stage_started) * 1000
+    if r.usage:
+        telemetry['prompt_tokens'] = r.usage.prompt_tokens
+        telemetry['completion_tokens'] = r.usage.completion_tokens
+    request.check()
+
+    # 6) last response
+    msgs = client.beta.threads.messages.list(thread_id=thread_id, order="desc")
+    reply = msgs.data[0].content[0].text.value
+    return reply
+
+def get_last_conversation(chat_id):
+    """Last conversation of the chat, from the state cache or else from the log"""
+    last_conv = chat_states.last_conversation(chat_id)
+    if last_conv is None:
+        get_log_writer().flush()
+        last_conv = db.get_last_conversation(chat_id)
+    return last_conv
 
 def handle_feedback_input(update, context):
     """Handle user feedback input with expected response"""
     chat_id = str(update.effective_chat.id)
     text = update.message.text
     
-    # Get last conversation
-    last_conv = db.get_last_conversation(chat_id)
+    # The conversation /feedback showed (older states only have the last one)
+    last_conv = chat_states.feedback_conversation(chat_id) or get_last_conversation(chat_id)
     if not last_conv:
-        update.message.reply_text("I can't find a recent conversation to give feedback on.")
-        user_states[chat_id] = 'normal'
+        send_reply(update, "I can't find a recent conversation to give feedback on.")
+        chat_states.set_mode(chat_id, MODE_NORMAL)
         return
     
     # Process feedback
     feedback_type = 'example_response'
     
-    # Save feedback in SQLite
+    # Save feedback in SQLite (the conversation row may still be queued)
+    get_log_writer().flush()
     db.add_feedback(
         user_id=chat_id,
         original_query=last_conv['query'],
@@ -165,31 +320,22 @@ def handle_feedback_input(update, context):
         conversation_id=last_conv['id']
     )
     
-    # Save as successful example in Pinecone
-    pinecone_manager = get_pinecone_manager()
-    success = pinecone_manager.add_example(
-        query=last_conv['query'],
-        response=text,  # The response the user expected
-        user_feedback="Expected response provided by user"
-    )
-    
-    if success:
-        update.message.reply_text("✅ Thank you! Your expected response has been saved as a successful example. This will help improve my future responses.")
-    else:
-        update.message.reply_text("📝 Thank you for your feedback. I'll take it into account to improve.")
+    # The feedback worker turns it into a Pinecone example in its next batch
+    get_feedback_worker().wake()
+    send_reply(update, "✅ Thank you! Your expected response will be saved as a successful example. This will help improve my future responses.")
     
     # Reset state
-    user_states[chat_id] = 'normal'
+    chat_states.set_mode(chat_id, MODE_NORMAL)
     print(f"✅ Reset user state for {chat_id} to 'normal'")
 
 def feedback_command(update, context):
     """Command /feedback - Request expected response"""
     chat_id = str(update.effective_chat.id)
     
-    # Check if there's a recent conversation
-    last_conv = db.get_last_conversation(chat_id)
+    # Check if there's a recent conversation (cached, the log is only read after eviction)
+    last_conv = get_last_conversation(chat_id)
     if not last_conv:
-        update.message.reply_text("I can't find a recent conversation to give feedback on.")
+        send_reply(update, "I can't find a recent conversation to give feedback on.")
         return
     
     # Show last conversation and request expected response
@@ -204,8 +350,8 @@ def feedback_command(update, context):
 **💡 How should I have responded?**
 """
     
-    update.message.reply_text(feedback_text)
-    user_states[chat_id] = 'waiting_feedback'
+    send_reply(update, feedback_text)
+    chat_states.request_feedback(chat_id, last_conv)
     print(f"⏳ Set user state for {chat_id} to 'waiting_feedback'")
 
 def stats_command(update, context):
@@ -214,10 +360,11 @@ def stats_command(update, context):
     
     # SQLite statistics
     sqlite_stats = db.get_feedback_stats()
+    log_stats = get_log_writer().get_metrics()
+    daily_stats = db.get_daily_stats(days=7)
     
     # Pinecone statistics
-    pinecone_manager = get_pinecone_manager()
-    pinecone_stats = pinecone_manager.get_index_stats()
+    pinecone_stats = get_pinecone_manager().get_index_stats() if startup.is_ready('pinecone') else {}
     
     stats_text = f"""
 📊 **Bot Statistics:**
@@ -226,6 +373,8 @@ def stats_command(update, context):
 • Total conversations: {sqlite_stats['total_conversations']}
 • Conversations with feedback: {sqlite_stats['conversations_with_feedback']}
 • Feedback rate: {sqlite_stats['feedback_rate']:.1f}%
+• Log rows waiting to be written: {log_stats['queued']}
+• Last 7 days: {' / '.join(str(day['conversations']) for day in daily_stats) or 'no data'}
 
 **🧠 Example memory (Pinecone):**
 • Total examples: {pinecone_stats.get('total_vector_count', 0)}
@@ -238,7 +387,52 @@ def stats_command(update, context):
         emoji = "📝" if feedback_type == "example_response" else "👍" if feedback_type == "positive" else "👎" if feedback_type == "negative" else "📝"
         stats_text += f"• {emoji} {feedback_type}: {count}\n"
     
-    update.message.reply_text(stats_text)
+    # Dispatcher statistics
+    dispatcher_stats = get_dispatcher().get_metrics()
+    stats_text += f"""
+**⚙️ Dispatcher:**
+• Queue depth: {dispatcher_stats['queue_depth']}
+• Active chats: {dispatcher_stats['active_chats']}/{dispatcher_stats['workers']} workers
+• Avg wait: {dispatcher_stats['avg_wait']:.2f}s (max {dispatcher_stats['max_wait']:.2f}s)
+"""
+    for lane, lane_stats in dispatcher_stats['lanes'].items():
+        stats_text += f"• {lane} lane: {lane_stats['queue_depth']} queued, avg wait {lane_stats['avg_wait']:.2f}s\n"
+    
+    # Admission control statistics
+    admission_stats = get_admission_controller().get_metrics()
+    stats_text += f"""
+**🚦 Admission control:**
+• In flight: {admission_stats['in_flight']}/{admission_stats['max_in_flight']}
+• Shed: {admission_stats['shed']} (queue full: {admission_stats['shed_full']}, too old: {admission_stats['shed_expired']}, cached answers: {admission_stats['served_cached']})
+"""
+    
+    # Chat state statistics
+    chat_stats = chat_states.get_metrics()
+    stats_text += f"""
+**🗂️ Chat states:**
+• Cached chats: {chat_stats['chats']}/{chat_states.max_chats}
+• Hits: {chat_stats['hits']}, misses: {chat_stats['misses']} (expired: {chat_stats['expired']}, evicted: {chat_stats['evicted']})
+"""
+    if thread_pool:
+        pool_stats = thread_pool.get_metrics()
+        stats_text += f"• Warm Assistant threads: {pool_stats['ready']}/{pool_stats['size']} (claimed: {pool_stats['claimed']}, created inline: {pool_stats['created_inline']})\n"
+    
+    # Outbound queue statistics
+    if outbound:
+        send_stats = outbound.get_metrics()
+        stats_text += f"""
+**📤 Outbound queue:**
+• Pending messages: {send_stats['queue_depth']}
+• Sent: {send_stats['sent']} (flood waits: {send_stats['flood_waits']}, failed: {send_stats['failed']})
+• Avg queue delay: {send_stats['avg_delay']:.2f}s (max {send_stats['max_delay']:.2f}s)
+"""
+    
+    # Connection reuse on the shared HTTP pools
+    stats_text += "\n**🔌 HTTP connections:**\n"
+    for pool, pool_stats in get_transport_metrics().items():
+        stats_text += f"• {pool}: {pool_stats['requests']} requests, {pool_stats['new_connections']} new connections ({pool_stats['reuse_rate']:.0f}% reused)\n"
+    
+    send_reply(update, stats_text)
 
 def help_command(update, context):
     """Command /help"""
@@ -268,44 +462,151 @@ def help_command(update, context):
 
 Your feedback helps me improve continuously! 🚀
 """
-    update.message.reply_text(help_text)
+    send_reply(update, help_text)
+
+def dispatched(handler, priority=PRIORITY_HIGH):
+    """Run a command handler on the dispatcher's lanes instead of Telegram's update thread"""
+    def submit(update, context):
+        get_dispatcher().submit(None, handler, update, context, priority=priority)
+    return submit
+
+def register_startup_checks():
+    """Dependency checks run concurrently at startup; Airtable and Pinecone may come up late"""
+    startup.add('database', get_database, required=True)
+    startup.add('openai', get_openai_client, required=True)
+    startup.add('airtable', lambda: get_airtable_client().test_connection())
+    startup.add('pinecone', lambda: bool(get_pinecone_manager().get_index_stats()))
+
+def build_updater(send_rate=None):
+    """Create the Updater with its handlers, outbound queue, worker pool and coalescing window"""
+    global outbound, thread_pool
+    
+    # Outbound messages leave through a rate-limited queue
+    outbound = OutboundScheduler(send_func=lambda chat_id, text, reply_to: up.bot.send_message(
+        chat_id=chat_id, text=text, reply_to_message_id=reply_to), global_rate=send_rate)
+    
+    # Size the Bot API connection pool for the sender threads so sends reuse connections
+    up = Updater(TELEGRAM_TOKEN, use_context=True, request_kwargs=telegram_request_kwargs(outbound.senders))
+    dp = up.dispatcher
+    outbound.start()
+    
+    # Warm Assistant threads so a new chat's first answer skips threads.create()
+    thread_pool = AssistantThreadPool(
+        create_func=lambda: get_openai_client().beta.threads.create().id,
+        delete_func=lambda thread_id: get_openai_client().beta.threads.delete(thread_id))
+    thread_pool.start()
+    
+    # Handlers
+    dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_msg))
+    dp.add_handler(CommandHandler("feedback", dispatched(feedback_command)))
+    dp.add_handler(CommandHandler("stats", dispatched(stats_command)))
+    dp.add_handler(CommandHandler("help", dispatched(help_command)))
+    dp.add_handler(CommandHandler("start", dispatched(help_command)))
+    
+    # Start worker pool and coalescing window before accepting updates
+    get_dispatcher()
+    get_coalescer()
+    return up
+
+def run_shard_worker(shard_id, updates, shards=1):
+    """
+    Entry point of a shard worker process started by shard_router.py
+    
+    Processes the raw update dicts the router sends for the chats this shard
+    owns, until it receives None. Each of the shards workers sends at most
+    its share of SEND_GLOBAL_RATE, so together they stay under Telegram's
+    global limit.
+    """
+    # The router coordinates shutdown; don't die halfway through on Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    # Checks finish in the background; backends are used as they become ready
+    register_startup_checks()
+    startup.start()
+    up = build_updater(send_rate=float(os.environ.get("SEND_GLOBAL_RATE", "30")) / shards)
+    if shard_id == 0:
+        # One process is enough to maintain the shared log database and process feedback
+        get_log_retention().start()
+        get_feedback_worker().start()
+    print(f"✅ Shard worker {shard_id} ready")
+    
+    while True:
+        data = updates.get()
+        if data is None:
+            break
+        try:
+            up.dispatcher.process_update(Update.de_json(data, up.bot))
+        except Exception as e:
+            print(f"❌ Shard {shard_id} error processing update: {e}")
+    
+    get_coalescer().stop(flush=True)
+    get_dispatcher().stop(wait=True)
+    outbound.stop(drain=True)
+    thread_pool.stop()
+    get_log_writer().stop()
+    get_log_retention().stop()
+    get_feedback_worker().stop()
+    db.close()
+    print(f"🛑 Shard worker {shard_id} stopped")
 
 def main():
     print("🤖 Starting bot with Pinecone (RAG + Airtable + Examples)...")
     print(f"📱 Token: {TELEGRAM_TOKEN[:10]}...")
     print(f"🧠 Assistant: {ASSISTANT_ID}")
     
-    # Test connections
-    print("📊 Testing Airtable connection...")
-    airtable_client = get_airtable_client()
-    if airtable_client.test_connection():
-        print("✅ Airtable connection successful")
-    else:
-        print("❌ Error connecting to Airtable")
-        return
-    
-    print("🧠 Testing Pinecone connection...")
-    pinecone_manager = get_pinecone_manager()
-    stats = pinecone_manager.get_index_stats()
-    print(f"✅ Pinecone connection successful ({stats.get('total_vector_count', 0)} examples)")
+    # Check dependencies concurrently while the updater is being built
+    register_startup_checks()
+    startup.start()
     
     try:
-        up = Updater(TELEGRAM_TOKEN, use_context=True)
+        up = build_updater()
         dp = up.dispatcher
+        startup.phase('updater')
+        
+        ready = startup.wait()
+        startup.print_report()
+        if not ready:
+            print("❌ A required dependency is unavailable, not starting")
+            outbound.stop(drain=False)
+            thread_pool.stop()
+            return
         
-        # Handlers
-        dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_msg))
-        dp.add_handler(CommandHandler("feedback", feedback_command))
-        dp.add_handler(CommandHandler("stats", stats_command))
-        dp.add_handler(CommandHandler("help", help_command))
-        dp.add_handler(CommandHandler("start", help_command))
+        # Partition, archive and vacuum old logs off-peak
+        get_log_retention().start()
+        
+        # Feedback becomes Pinecone examples in batches, off the request path
+        get_feedback_worker().start()
         
         print("✅ Bot with Pinecone started successfully")
         print("📱 Available commands: /feedback, /stats, /help")
         print("🛑 Press Ctrl+C to stop the bot")
         
-        up.start_polling()
-        up.idle()
+        if BOT_MODE == "webhook":
+            if not WEBHOOK_URL:
+                raise ValueError("WEBHOOK_URL must be configured in .env for webhook mode")
+            
+            # Updates arrive over HTTP and go straight through the dispatcher's handlers
+            server = WebhookServer(on_update=lambda data: dp.process_update(Update.de_json(data, up.bot)))
+            server.start()
+            up.bot.set_webhook(url=WEBHOOK_URL, api_kwargs={'secret_token': server.secret})
+            print(f"🌐 Webhook registered: {WEBHOOK_URL}")
+            
+            up.idle()
+            server.stop()
+        else:
+            up.start_polling()
+            up.idle()
+        
+        # Answer messages still in the coalescing window or running, then deliver queued replies
+        get_coalescer().stop(flush=True)
+        get_dispatcher().stop(wait=True)
+        outbound.stop(drain=True)
+        thread_pool.stop()
+        http_transport.close()
+        get_log_writer().stop()
+        get_log_retention().stop()
+        get_feedback_worker().stop()
+        db.close()
         
     except Exception as e:
         print(f"❌ Error starting bot: {e}")
@@ -313,6 +614,10 @@ def main():
 
 def signal_handler(signum, frame):
     print("\n🛑 Stopping bot...")
+    get_coalescer().stop(flush=False)
+    get_dispatcher().stop(wait=False)
+    if thread_pool:
+        thread_pool.stop()
     sys.exit(0)
 
 if __name__ == "__main__":
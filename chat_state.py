@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Module with a bounded, typed per-chat state cache
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from state_store import StateStore, MemoryStateStore, get_state_store
+
+MODE_NORMAL = 'normal'
+MODE_WAITING_FEEDBACK = 'waiting_feedback'
+
+
+class ChatState:
+    """Fixed-schema state of one chat"""
+    __slots__ = ('mode', 'thread_id', 'last_conversation_id', 'last_query', 'last_response',
+                 'feedback_conversation', 'touched_at')
+
+    def __init__(self, mode: str = MODE_NORMAL, thread_id: str = None, last_conversation_id: int = None,
+                 feedback_conversation: Dict[str, Any] = None):
+        self.mode = mode
+        self.thread_id = thread_id
+        self.last_conversation_id = last_conversation_id
+        self.last_query = None
+        self.last_response = None
+        self.feedback_conversation = feedback_conversation  # shown by /feedback, waiting for the expected response
+        self.touched_at = time.monotonic()
+
+
+class ChatStateStore:
+    """
+    In-process chat states with an LRU bound and TTL expiry.
+
+    Records idle for more than ttl seconds, or pushed out once max_chats is
+    reached, are dropped, so memory stays flat however many guests the bot
+    has seen. With a shared backend (STATE_BACKEND=sqlite) every change is
+    written through and evicted chats are reloaded on their next message.
+    The text of the last conversation is only kept in memory: it spares
+    /feedback a database round trip, and callers fall back to the
+    conversation log when it is gone.
+
+    Without a shared backend the thread ids are kept apart, in their own
+    LRU of max_chats entries with no TTL: losing one would start the guest
+    over in a new assistant thread, so an idle chat only loses its mode and
+    last conversation, and a thread id goes only once max_chats other chats
+    have used theirs more recently. STATE_BACKEND=sqlite keeps every one.
+    """
+
+    def __init__(self, backend: Optional[StateStore] = None, max_chats: int = None, ttl: float = None):
+        self.backend = backend
+        self.max_chats = max_chats or int(os.environ.get("CHAT_STATE_MAX_CHATS", "10000"))
+        self.ttl = ttl or float(os.environ.get("CHAT_STATE_TTL_HOURS", "168")) * 3600
+
+        self._lock = threading.Lock()
+        self._states: "OrderedDict[str, ChatState]" = OrderedDict()
+        self._threads: "OrderedDict[str, str]" = OrderedDict()
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0, 'threads_evicted': 0}
+
+    def _load(self, chat_id: str) -> ChatState:
+        if self.backend is None:
+            with self._lock:
+                thread_id = self._threads.get(chat_id)
+                if thread_id is not None:
+                    self._threads.move_to_end(chat_id)
+                return ChatState(thread_id=thread_id)
+        stored = self.backend.get_user_state(chat_id)
+        return ChatState(
+            mode=stored.get('mode', MODE_NORMAL),
+            thread_id=self.backend.get_thread(chat_id),
+            last_conversation_id=stored.get('last_conversation_id'),
+            feedback_conversation=stored.get('feedback_conversation')
+        )
+
+    def get(self, chat_id: str) -> ChatState:
+        """Get the chat's state, loading or creating it as needed"""
+        now = time.monotonic()
+        with self._lock:
+            record = self._states.get(chat_id)
+            if record is not None and now - record.touched_at > self.ttl:
+                del self._states[chat_id]
+                self._counters['expired'] += 1
+                record = None
+            if record is not None:
+                self._counters['hits'] += 1
+                record.touched_at = now
+                self._states.move_to_end(chat_id)
+                return record
+            self._counters['misses'] += 1
+
+        record = self._load(chat_id)
+        with self._lock:
+            # Another thread may have loaded it meanwhile
+            record = self._states.setdefault(chat_id, record)
+            self._states.move_to_end(chat_id)
+            while len(self._states) > self.max_chats:
+                self._states.popitem(last=False)
+                self._counters['evicted'] += 1
+            return record
+
+    def set_mode(self, chat_id: str, mode: str):
+        record = self.get(chat_id)
+        record.mode = mode
+        record.feedback_conversation = None
+        if self.backend:
+            self.backend.update_user_state(chat_id, mode=mode, feedback_conversation=None)
+
+    def request_feedback(self, chat_id: str, conversation: Dict[str, Any]):
+        """
+        Wait for the expected response to the conversation /feedback showed
+
+        Newer messages may be answered before the guest replies, so the
+        feedback is filed against this conversation, not the latest one.
+        """
+        record = self.get(chat_id)
+        record.mode = MODE_WAITING_FEEDBACK
+        record.feedback_conversation = {key: conversation[key] for key in ('id', 'query', 'response')}
+        if self.backend:
+            self.backend.update_user_state(chat_id, mode=MODE_WAITING_FEEDBACK,
+                                           feedback_conversation=record.feedback_conversation)
+
+    def feedback_conversation(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        return self.get(chat_id).feedback_conversation
+
+    def set_thread(self, chat_id: str, thread_id: str):
+        self.get(chat_id).thread_id = thread_id
+        if self.backend:
+            self.backend.set_thread(chat_id, thread_id)
+        else:
+            with self._lock:
+                self._threads[chat_id] = thread_id
+                self._threads.move_to_end(chat_id)
+                while len(self._threads) > self.max_chats:
+                    self._threads.popitem(last=False)
+                    self._counters['threads_evicted'] += 1
+
+    def set_last_conversation(self, chat_id: str, conversation_id: int, query: str, response: str):
+        record = self.get(chat_id)
+        record.last_conversation_id = conversation_id
+        record.last_query = query
+        record.last_response = response
+        if self.backend:
+            self.backend.update_user_state(chat_id, last_conversation_id=conversation_id)
+
+    def last_conversation(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Last conversation in the same shape as db.get_last_conversation, if cached"""
+        record = self.get(chat_id)
+        if record.last_conversation_id is None or record.last_query is None:
+            return None
+        return {
+            'id': record.last_conversation_id,
+            'query': record.last_query,
+            'response': record.last_response
+        }
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            metrics = dict(self._counters)
+            metrics['chats'] = len(self._states)
+            metrics['threads'] = len(self._threads)
+            return metrics
+
+
+# Global chat state store instance
+chat_state_store = None
+
+def get_chat_state_store():
+    global chat_state_store
+    if chat_state_store is None:
+        backend = get_state_store()
+        # The memory backend would just be a second, unbounded copy
+        if isinstance(backend, MemoryStateStore):
+            backend = None
+        chat_state_store = ChatStateStore(backend=backend)
+    return chat_state_store
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Module to merge rapid-fire messages from the same chat into a single request
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class _Batch:
+    __slots__ = ('items', 'first_at', 'deadline')
+
+    def __init__(self, now: float):
+        self.items = []
+        self.first_at = now
+        self.deadline = now
+
+
+class MessageCoalescer:
+    """
+    Per-chat debounce window.
+
+    Every message pushes the chat's deadline window seconds into the future.
+    When a chat has been quiet for the whole window (or max_delay has passed
+    since its first message) the buffered items are flushed together through
+    on_flush(chat_id, items).
+    """
+
+    def __init__(self, on_flush: Callable[[str, List[Any]], None],
+                 window: float = None, max_delay: float = None):
+        self.on_flush = on_flush
+        self.window = window if window is not None else float(os.environ.get("COALESCE_WINDOW_MS", "800")) / 1000
+        self.max_delay = max_delay if max_delay is not None else self.window * 4
+
+        self._lock = threading.Condition()
+        self._batches: Dict[str, _Batch] = {}
+        self._thread = None
+        self._running = False
+
+        # Metrics
+        self._messages = 0
+        self._flushes = 0
+
+    def start(self):
+        """Start the background flush thread"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="coalescer", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = True):
+        """Stop the flush thread, optionally flushing everything still buffered"""
+        with self._lock:
+            self._running = False
+            batches = self._batches if flush else {}
+            self._batches = {}
+            self._lock.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        for chat_id, batch in batches.items():
+            self._flush(chat_id, batch.items)
+
+    def add(self, chat_id: str, item: Any):
+        """Buffer an item for chat_id and restart its debounce window"""
+        if self.window <= 0:
+            self._messages += 1
+            self._flush(chat_id, [item])
+            return
+
+        with self._lock:
+            self._messages += 1
+            now = time.monotonic()
+            batch = self._batches.get(chat_id)
+            if batch is None:
+                batch = self._batches[chat_id] = _Batch(now)
+            batch.items.append(item)
+            batch.deadline = min(now + self.window, batch.first_at + self.max_delay)
+            self._lock.notify()
+
+    def _run(self):
+        while True:
+            due = []
+            with self._lock:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                for chat_id, batch in list(self._batches.items()):
+                    if batch.deadline <= now:
+                        due.append((chat_id, self._batches.pop(chat_id).items))
+                if not due:
+                    next_deadline = min((b.deadline for b in self._batches.values()), default=None)
+                    self._lock.wait(timeout=None if next_deadline is None else max(0.0, next_deadline - now))
+                    continue
+
+            for chat_id, items in due:
+                self._flush(chat_id, items)
+
+    def _flush(self, chat_id: str, items: List[Any]):
+        self._flushes += 1
+        try:
+            self.on_flush(chat_id, items)
+        except Exception as e:
+            print(f"❌ Error flushing coalesced messages for {chat_id}: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get coalescing metrics"""
+        with self._lock:
+            return {
+                'window': self.window,
+                'messages': self._messages,
+                'flushes': self._flushes,
+                'buffered_chats': len(self._batches),
+                'merged_messages': self._messages - self._flushes - sum(len(b.items) for b in self._batches.values())
+            }
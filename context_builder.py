@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Module to assemble the Assistant context within a token budget
+"""
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_WORD_PATTERN = re.compile(r"\w{3,}", re.UNICODE)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens locally
+
+    Uses tiktoken when it is installed; otherwise estimates from words and
+    punctuation, never below the usual four characters per token.
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(len(_TOKEN_PATTERN.findall(text)), (len(text) + 3) // 4)
+
+
+def _words(text: str) -> set:
+    return set(_WORD_PATTERN.findall(text.lower()))
+
+
+class Snippet:
+    """A piece of retrieved context with a relevance score between 0 and 1"""
+    __slots__ = ('source', 'section', 'text', 'score')
+
+    def __init__(self, source: str, section: str, text: str, score: float):
+        self.source = source
+        self.section = section
+        self.text = text
+        self.score = score
+
+
+class ContextBuilder:
+    def __init__(self, max_tokens: int = None, overlap_threshold: float = 0.8, min_truncated_tokens: int = 40):
+        """
+        Args:
+            max_tokens: Token budget for the whole context block
+            overlap_threshold: Drop a snippet when this fraction of its words is already packed
+            min_truncated_tokens: Smallest remainder worth filling with a truncated snippet
+        """
+        self.max_tokens = max_tokens or int(os.environ.get("CONTEXT_TOKEN_BUDGET", "1500"))
+        self.overlap_threshold = overlap_threshold
+        self.min_truncated_tokens = min_truncated_tokens
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to max_tokens at a line or word boundary"""
+        marker = " …"
+        budget = max_tokens - count_tokens(marker)
+        lines = text.split("\n")
+        kept = []
+        for line in lines:
+            candidate = "\n".join(kept + [line])
+            if count_tokens(candidate) <= budget:
+                kept.append(line)
+                continue
+            # Fill the rest of the budget with whole words of this line
+            words = line.split(" ")
+            lo, hi = 0, len(words)
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if count_tokens("\n".join(kept + [" ".join(words[:mid])])) <= budget:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            if lo:
+                kept.append(" ".join(words[:lo]))
+            break
+        return "\n".join(kept).rstrip() + marker if kept else ""
+
+    def build(self, snippets: List[Snippet]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Pack snippets by relevance into the token budget
+
+        Returns:
+            The context text and packing statistics
+        """
+        ranked = sorted(snippets, key=lambda s: s.score, reverse=True)
+
+        packed = []
+        packed_words = set()
+        used_tokens = 0
+        duplicates = 0
+        truncated = 0
+        section_cost = {}
+
+        for snippet in ranked:
+            words = _words(snippet.text)
+            if words and len(words & packed_words) / len(words) >= self.overlap_threshold:
+                duplicates += 1
+                continue
+
+            header_tokens = 0 if snippet.section in section_cost else count_tokens(snippet.section) + 1
+            remaining = self.max_tokens - used_tokens - header_tokens
+            text = snippet.text
+            tokens = count_tokens(text) + 1
+            if tokens > remaining:
+                if remaining < self.min_truncated_tokens:
+                    continue
+                text = self._truncate(text, remaining - 1)
+                if not text:
+                    continue
+                tokens = count_tokens(text) + 1
+                truncated += 1
+
+            section_cost.setdefault(snippet.section, header_tokens)
+            packed.append(Snippet(snippet.source, snippet.section, text, snippet.score))
+            packed_words |= words
+            used_tokens += header_tokens + tokens
+
+        # Render grouped by section, sections ordered by their best snippet
+        parts = []
+        for section in section_cost:
+            parts.append(section)
+            parts.extend(s.text for s in packed if s.section == section)
+
+        return "\n".join(parts), {
+            'candidates': len(snippets),
+            'packed': len(packed),
+            'duplicates': duplicates,
+            'truncated': truncated,
+            'tokens': used_tokens,
+            'budget': self.max_tokens,
+            'sources': sorted(set(s.source for s in packed))
+        }
+
+
+# Global context builder instance
+context_builder = None
+
+def get_context_builder():
+    global context_builder
+    if context_builder is None:
+        context_builder = ContextBuilder()
+    return context_builder
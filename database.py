@@ -4,17 +4,271 @@ Module to handle SQLite database
 """
 import sqlite3
 import os
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Iterator
+
+# Schema migrations, applied in order once each; PRAGMA user_version counts
+# the ones already applied. Scripts must be idempotent because two processes
+# may start at the same time (ALTER TABLE can't be: migrate() skips it when
+# another process got there first).
+MIGRATIONS = [
+    # 1: /feedback looks up a user's latest conversation, the feedback
+    #    processor scans pending rows; neither should scan the whole table
+    '''
+    CREATE INDEX IF NOT EXISTS idx_conversation_logs_user ON conversation_logs (user_id, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_feedback_unprocessed ON feedback (id) WHERE processed = FALSE;
+    ''',
+    # 2: counters and per-day rollups kept up to date by triggers, so /stats
+    #    never aggregates the raw logs; existing rows are counted once here
+    '''
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY, -- 'conversations', 'conversations_with_feedback', 'feedback_type:<type>'
+        value INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        day TEXT PRIMARY KEY, -- YYYY-MM-DD (UTC)
+        conversations INTEGER NOT NULL DEFAULT 0,
+        feedback INTEGER NOT NULL DEFAULT 0,
+        used_rag INTEGER NOT NULL DEFAULT 0,
+        used_airtable INTEGER NOT NULL DEFAULT 0,
+        total_response_time REAL NOT NULL DEFAULT 0
+    );
+    
+    DELETE FROM stats_counters;
+    DELETE FROM daily_stats;
+    INSERT INTO stats_counters (name, value)
+        SELECT 'conversations', COUNT(*) FROM conversation_logs;
+    INSERT INTO stats_counters (name, value)
+        SELECT 'conversations_with_feedback', COUNT(*) FROM conversation_logs WHERE feedback_given = TRUE;
+    INSERT INTO stats_counters (name, value)
+        SELECT 'feedback_type:' || feedback_type, COUNT(*) FROM feedback GROUP BY feedback_type;
+    INSERT INTO daily_stats (day, conversations, used_rag, used_airtable, total_response_time)
+        SELECT date(timestamp), COUNT(*), SUM(used_rag = TRUE), SUM(used_airtable = TRUE), TOTAL(response_time)
+        FROM conversation_logs GROUP BY date(timestamp);
+    INSERT INTO daily_stats (day, feedback)
+        SELECT date(timestamp), COUNT(*) FROM feedback GROUP BY date(timestamp)
+        ON CONFLICT(day) DO UPDATE SET feedback = excluded.feedback;
+    
+    CREATE TRIGGER IF NOT EXISTS stats_conversation_insert AFTER INSERT ON conversation_logs
+    BEGIN
+        INSERT INTO stats_counters (name, value) VALUES ('conversations', 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+        INSERT INTO daily_stats (day, conversations, used_rag, used_airtable, total_response_time)
+            VALUES (date(NEW.timestamp), 1, NEW.used_rag = TRUE, NEW.used_airtable = TRUE, IFNULL(NEW.response_time, 0))
+            ON CONFLICT(day) DO UPDATE SET
+                conversations = conversations + 1,
+                used_rag = used_rag + excluded.used_rag,
+                used_airtable = used_airtable + excluded.used_airtable,
+                total_response_time = total_response_time + excluded.total_response_time;
+    END;
+    CREATE TRIGGER IF NOT EXISTS stats_conversation_feedback AFTER UPDATE OF feedback_given ON conversation_logs
+    WHEN NEW.feedback_given = TRUE AND OLD.feedback_given = FALSE
+    BEGIN
+        INSERT INTO stats_counters (name, value) VALUES ('conversations_with_feedback', 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS stats_feedback_insert AFTER INSERT ON feedback
+    BEGIN
+        INSERT INTO stats_counters (name, value) VALUES ('feedback_type:' || NEW.feedback_type, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+        INSERT INTO daily_stats (day, feedback) VALUES (date(NEW.timestamp), 1)
+            ON CONFLICT(day) DO UPDATE SET feedback = feedback + 1;
+    END;
+    ''',
+    # 3: monthly partitions and archives of old conversations (see log_retention.py)
+    '''
+    CREATE INDEX IF NOT EXISTS idx_conversation_logs_timestamp ON conversation_logs (timestamp);
+    CREATE TABLE IF NOT EXISTS log_partitions (
+        month TEXT PRIMARY KEY, -- YYYY-MM
+        status TEXT NOT NULL, -- 'partition' (SQLite file) or 'archive' (gzip JSON lines)
+        path TEXT NOT NULL,
+        first_id INTEGER,
+        last_id INTEGER,
+        rows INTEGER NOT NULL DEFAULT 0,
+        bytes INTEGER,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    ''',
+    # 4: per-stage latency (ms), tokens and polls of each answer, written with
+    #    the conversation itself; NULL when the stage did not run
+    '''
+    ALTER TABLE conversation_logs ADD COLUMN used_pinecone BOOLEAN DEFAULT FALSE;
+    ALTER TABLE conversation_logs ADD COLUMN routing_ms FLOAT;
+    ALTER TABLE conversation_logs ADD COLUMN airtable_ms FLOAT;
+    ALTER TABLE conversation_logs ADD COLUMN embedding_ms FLOAT;
+    ALTER TABLE conversation_logs ADD COLUMN pinecone_ms FLOAT;
+    ALTER TABLE conversation_logs ADD COLUMN run_create_ms FLOAT;
+    ALTER TABLE conversation_logs ADD COLUMN poll_wait_ms FLOAT;
+    ALTER TABLE conversation_logs ADD COLUMN send_ms FLOAT;
+    ALTER TABLE conversation_logs ADD COLUMN prompt_tokens INTEGER;
+    ALTER TABLE conversation_logs ADD COLUMN completion_tokens INTEGER;
+    ALTER TABLE conversation_logs ADD COLUMN poll_count INTEGER;
+    ''',
+    # 5: full-text indexes over the logs and feedback (external content, kept
+    #    in sync by triggers) and the normalized query counts of
+    #    refresh_query_frequency(), which keeps its position in stats_counters
+    #    ('query_frequency:last_id')
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS conversation_search USING fts5(
+        query, response, content='conversation_logs', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS conversation_search_insert AFTER INSERT ON conversation_logs
+    BEGIN
+        INSERT INTO conversation_search (rowid, query, response) VALUES (NEW.id, NEW.query, NEW.response);
+    END;
+    CREATE TRIGGER IF NOT EXISTS conversation_search_delete AFTER DELETE ON conversation_logs
+    BEGIN
+        INSERT INTO conversation_search (conversation_search, rowid, query, response)
+            VALUES ('delete', OLD.id, OLD.query, OLD.response);
+    END;
+    CREATE TRIGGER IF NOT EXISTS conversation_search_update AFTER UPDATE OF query, response ON conversation_logs
+    BEGIN
+        INSERT INTO conversation_search (conversation_search, rowid, query, response)
+            VALUES ('delete', OLD.id, OLD.query, OLD.response);
+        INSERT INTO conversation_search (rowid, query, response) VALUES (NEW.id, NEW.query, NEW.response);
+    END;
+    INSERT INTO conversation_search (conversation_search) VALUES ('rebuild');
+    
+    CREATE VIRTUAL TABLE IF NOT EXISTS feedback_search USING fts5(
+        original_query, original_response, feedback_text,
+        content='feedback', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS feedback_search_insert AFTER INSERT ON feedback
+    BEGIN
+        INSERT INTO feedback_search (rowid, original_query, original_response, feedback_text)
+            VALUES (NEW.id, NEW.original_query, NEW.original_response, NEW.feedback_text);
+    END;
+    CREATE TRIGGER IF NOT EXISTS feedback_search_delete AFTER DELETE ON feedback
+    BEGIN
+        INSERT INTO feedback_search (feedback_search, rowid, original_query, original_response, feedback_text)
+            VALUES ('delete', OLD.id, OLD.original_query, OLD.original_response, OLD.feedback_text);
+    END;
+    CREATE TRIGGER IF NOT EXISTS feedback_search_update
+    AFTER UPDATE OF original_query, original_response, feedback_text ON feedback
+    BEGIN
+        INSERT INTO feedback_search (feedback_search, rowid, original_query, original_response, feedback_text)
+            VALUES ('delete', OLD.id, OLD.original_query, OLD.original_response, OLD.feedback_text);
+        INSERT INTO feedback_search (rowid, original_query, original_response, feedback_text)
+            VALUES (NEW.id, NEW.original_query, NEW.original_response, NEW.feedback_text);
+    END;
+    INSERT INTO feedback_search (feedback_search) VALUES ('rebuild');
+    
+    CREATE TABLE IF NOT EXISTS query_frequency (
+        normalized TEXT PRIMARY KEY, -- normalize_query() of the guest's text
+        example_query TEXT NOT NULL, -- latest original wording
+        count INTEGER NOT NULL DEFAULT 0,
+        first_seen DATETIME,
+        last_seen DATETIME,
+        last_conversation_id INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_query_frequency_count ON query_frequency (count DESC);
+    ''',
+    # 6: how each answer was routed, written with its conversation and
+    #    removed with it (replay_routing.py)
+    '''
+    CREATE TABLE IF NOT EXISTS routing_log (
+        conversation_id INTEGER PRIMARY KEY,
+        query_type TEXT, -- analyze_query category
+        route TEXT, -- fast path route: 'llm', 'example' or 'airtable'
+        confidence REAL,
+        sources TEXT, -- lookups made, comma separated ('airtable,pinecone')
+        used_sources TEXT, -- lookups that ended up in the answer
+        candidates TEXT, -- JSON [[kind, id, score], ...], kind 'pinecone', 'item' or 'house'
+        context_tokens INTEGER,
+        context_snippets INTEGER
+    );
+    CREATE TRIGGER IF NOT EXISTS routing_log_delete AFTER DELETE ON conversation_logs
+    BEGIN
+        DELETE FROM routing_log WHERE conversation_id = OLD.id;
+    END;
+    ''',
+    # 7: feedback stored before feedback_worker.py was upserted to Pinecone
+    #    inline (as example_<timestamp>_<hash>) and never marked processed;
+    #    mark it now so the worker doesn't add every old example twice
+    '''
+    UPDATE feedback SET processed = TRUE WHERE processed = FALSE;
+    ''',
+]
+
+# Telemetry keys accepted by log_conversation, in column order (migration 4)
+TELEMETRY_COLUMNS = (
+    'routing_ms', 'airtable_ms', 'embedding_ms', 'pinecone_ms', 'run_create_ms', 'poll_wait_ms', 'send_ms',
+    'prompt_tokens', 'completion_tokens', 'poll_count',
+)
+CONVERSATION_COLUMNS = (
+    'id', 'timestamp', 'user_id', 'query', 'response', 'response_time',
+    'used_rag', 'used_airtable', 'used_pinecone',
+) + TELEMETRY_COLUMNS
+# Routing record keys accepted by log_conversation, after conversation_id (migration 6)
+ROUTING_COLUMNS = (
+    'conversation_id', 'query_type', 'route', 'confidence', 'sources', 'used_sources',
+    'candidates', 'context_tokens', 'context_snippets',
+)
+
+def normalize_query(text: str) -> str:
+    """Lowercase, without accents, punctuation or repeated spaces: '¿Dónde está el jacuzzi?' -> 'donde esta el jacuzzi'"""
+    text = unicodedata.normalize('NFKD', text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def fts_query(text: str) -> Optional[str]:
+    """FTS5 MATCH expression for free text: every word must appear (quoted, so no operator syntax leaks in)"""
+    words = re.findall(r"\w+", text or "")
+    return " ".join(f'"{word}"' for word in words) or None
+
 
 class DatabaseManager:
     def __init__(self, db_path: str = "feedback.db"):
         self.db_path = db_path
+        self.busy_timeout = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+        self.mmap_size = int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+        self.stats_ttl = float(os.environ.get("STATS_CACHE_TTL", "10"))
+        self._stats_cache = None  # (expires_at, stats)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self.init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Connection of the calling thread, opened once and reused
+        
+        WAL lets readers run alongside the writer, and synchronous=NORMAL only
+        fsyncs at checkpoints instead of on every commit. Used as a context
+        manager the connection commits (or rolls back) like before.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout / 1000, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout}")
+            conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """Close every thread's connection (on shutdown)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+    
     def init_database(self):
         """Initialize database with necessary tables"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Conversation logs table
@@ -49,27 +303,128 @@ class DatabaseManager:
             ''')
             
             conn.commit()
+        
+        self.migrate()
+    
+    def migrate(self):
+        """Apply the schema migrations this database hasn't run yet"""
+        conn = self._connect()
+        while True:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= len(MIGRATIONS):
+                return
+            number = version + 1
+            try:
+                conn.executescript(f"BEGIN IMMEDIATE; {MIGRATIONS[version]} PRAGMA user_version = {number}; COMMIT;")
+            except sqlite3.OperationalError:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # ALTER TABLE can't be repeated: fine if another process just applied it
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= number:
+                    continue
+                raise
+            print(f"🗄️ Applied database migration {number}")
     
     def log_conversation(self, user_id: str, query: str, response: str, 
                         response_time: float = None, used_rag: bool = False, 
-                        used_airtable: bool = False) -> int:
-        """Log a conversation in the database"""
-        with sqlite3.connect(self.db_path) as conn:
+                        used_airtable: bool = False, used_pinecone: bool = False,
+                        telemetry: Dict[str, Any] = None, routing: Dict[str, Any] = None) -> int:
+        """
+        Log a conversation in the database
+        
+        telemetry holds TELEMETRY_COLUMNS values; routing, when given, is
+        written to routing_log in the same transaction.
+        """
+        telemetry = telemetry or {}
+        columns = CONVERSATION_COLUMNS[2:]
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO conversation_logs 
-                (user_id, query, response, response_time, used_rag, used_airtable)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (user_id, query, response, response_time, used_rag, used_airtable))
+            cursor.execute(f'''
+                INSERT INTO conversation_logs ({", ".join(columns)})
+                VALUES ({", ".join("?" * len(columns))})
+            ''', (user_id, query, response, response_time, used_rag, used_airtable, used_pinecone)
+                + tuple(telemetry.get(name) for name in TELEMETRY_COLUMNS))
+            if routing:
+                self._insert_routing(conn, [(cursor.lastrowid,) + tuple(routing.get(name) for name in ROUTING_COLUMNS[1:])])
             
             conn.commit()
             return cursor.lastrowid
     
+    def reserve_conversation_ids(self, count: int) -> int:
+        """
+        Reserve count consecutive conversation ids and return the first one
+        
+        Bumps the AUTOINCREMENT counter, so rows inserted later through
+        log_conversation (from this or another process) never reuse them.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'conversation_logs'").fetchone()
+            first = (row[0] if row else 0) + 1
+            if row:
+                conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'conversation_logs'", (first + count - 1,))
+            else:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('conversation_logs', ?)", (first + count - 1,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return first
+    
+    def log_conversations(self, rows: List[tuple], routing_rows: List[tuple] = None, send_times: List[tuple] = None):
+        """
+        Insert already numbered conversations in one transaction
+        
+        Each row holds the CONVERSATION_COLUMNS values, in that order, and
+        each routing row the ROUTING_COLUMNS values. send_times are
+        (send_ms, id) pairs for conversations logged before their reply was
+        delivered, applied after the inserts.
+        """
+        with self._connect() as conn:
+            conn.executemany(f'''
+                INSERT INTO conversation_logs ({", ".join(CONVERSATION_COLUMNS)})
+                VALUES ({", ".join("?" * len(CONVERSATION_COLUMNS))})
+            ''', rows)
+            if routing_rows:
+                self._insert_routing(conn, routing_rows)
+            if send_times:
+                conn.executemany("UPDATE conversation_logs SET send_ms = ? WHERE id = ?", send_times)
+    
+    @staticmethod
+    def _insert_routing(conn: sqlite3.Connection, routing_rows: List[tuple]):
+        conn.executemany(f'''
+            INSERT OR REPLACE INTO routing_log ({", ".join(ROUTING_COLUMNS)})
+            VALUES ({", ".join("?" * len(ROUTING_COLUMNS))})
+        ''', routing_rows)
+    
+    def iter_routing_log(self, chunk_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+        """Yield routing records with their query, in id order, through a read-only connection"""
+        columns = ROUTING_COLUMNS + ('query',)
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=self.busy_timeout / 1000)
+        after_id = 0
+        try:
+            while True:
+                rows = conn.execute(f'''
+                    SELECT {", ".join("r." + name for name in ROUTING_COLUMNS)}, c.query
+                    FROM routing_log r
+                    JOIN conversation_logs c ON c.id = r.conversation_id
+                    WHERE r.conversation_id > ?
+                    ORDER BY r.conversation_id
+                    LIMIT ?
+                ''', (after_id, chunk_size)).fetchall()
+                if not rows:
+                    return
+                yield [dict(zip(columns, row)) for row in rows]
+                after_id = rows[-1][0]
+        finally:
+            conn.close()
+    
     def add_feedback(self, user_id: str, original_query: str, original_response: str,
                     feedback_type: str, feedback_text: str = None, 
                     conversation_id: int = None) -> int:
         """Add feedback to a response"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO feedback 
@@ -92,13 +447,13 @@ class DatabaseManager:
     
     def get_last_conversation(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get the last conversation of a user"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT id, query, response, timestamp
                 FROM conversation_logs 
                 WHERE user_id = ? 
-                ORDER BY timestamp DESC 
+                ORDER BY id DESC 
                 LIMIT 1
             ''', (user_id,))
             
@@ -113,43 +468,200 @@ class DatabaseManager:
             return None
     
     def get_feedback_stats(self) -> Dict[str, Any]:
-        """Get feedback statistics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Total conversations
-            cursor.execute('SELECT COUNT(*) FROM conversation_logs')
-            total_conversations = cursor.fetchone()[0]
-            
-            # Conversations with feedback
-            cursor.execute('SELECT COUNT(*) FROM conversation_logs WHERE feedback_given = TRUE')
-            conversations_with_feedback = cursor.fetchone()[0]
-            
-            # Feedback types
-            cursor.execute('''
-                SELECT feedback_type, COUNT(*) 
-                FROM feedback 
-                GROUP BY feedback_type
-            ''')
-            feedback_types = dict(cursor.fetchall())
-            
-            return {
-                'total_conversations': total_conversations,
-                'conversations_with_feedback': conversations_with_feedback,
-                'feedback_rate': (conversations_with_feedback / total_conversations * 100) if total_conversations > 0 else 0,
-                'feedback_types': feedback_types
+        """
+        Get feedback statistics
+        
+        Reads the trigger-maintained counters (a handful of rows, whatever the
+        size of the logs) and keeps the result for stats_ttl seconds.
+        """
+        cached = self._stats_cache
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+        
+        with self._connect() as conn:
+            counters = dict(conn.execute('SELECT name, value FROM stats_counters').fetchall())
+        
+        total_conversations = counters.get('conversations', 0)
+        conversations_with_feedback = counters.get('conversations_with_feedback', 0)
+        stats = {
+            'total_conversations': total_conversations,
+            'conversations_with_feedback': conversations_with_feedback,
+            'feedback_rate': (conversations_with_feedback / total_conversations * 100) if total_conversations > 0 else 0,
+            'feedback_types': {name.split(':', 1)[1]: value for name, value in counters.items()
+                               if name.startswith('feedback_type:')}
+        }
+        self._stats_cache = (time.monotonic() + self.stats_ttl, stats)
+        return stats
+    
+    def get_daily_stats(self, days: int = 30) -> List[Dict[str, Any]]:
+        """Per-day volume for the last days days, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute('''
+                SELECT day, conversations, feedback, used_rag, used_airtable, total_response_time
+                FROM daily_stats
+                WHERE day >= date('now', ?)
+                ORDER BY day
+            ''', (f"-{days - 1} days",)).fetchall()
+        return [
+            {
+                'day': row[0],
+                'conversations': row[1],
+                'feedback': row[2],
+                'used_rag': row[3],
+                'used_airtable': row[4],
+                'avg_response_time': (row[5] / row[1]) if row[1] else 0.0
             }
+            for row in rows
+        ]
+    
+    def get_columns(self, table: str) -> List[tuple]:
+        """(name, declared type) of each column of a table"""
+        with self._connect() as conn:
+            return [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")]
+    
+    def iter_rows(self, table: str, after_id: int = 0, chunk_size: int = 10000) -> Iterator[List[tuple]]:
+        """
+        Yield the rows of a table with id > after_id in id order, chunk_size at a time
+        
+        Reads through its own read-only connection and pages by id, so each
+        chunk is a short read transaction: writers are never blocked and
+        memory stays flat however big the table is.
+        """
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=self.busy_timeout / 1000)
+        try:
+            while True:
+                rows = conn.execute(
+                    f"SELECT * FROM {table} WHERE id > ? ORDER BY id LIMIT ?", (after_id, chunk_size)
+                ).fetchall()
+                if not rows:
+                    return
+                yield rows
+                after_id = rows[-1][0]
+        finally:
+            conn.close()
+    
+    def search_conversations(self, text: str, limit: int = 20, user_id: str = None) -> List[Dict[str, Any]]:
+        """Best matching conversations for free text (all words, accents ignored), most relevant first"""
+        match = fts_query(text)
+        if not match:
+            return []
+        user_filter = "AND c.user_id = ?" if user_id else ""
+        params = (match, user_id, limit) if user_id else (match, limit)
+        with self._connect() as conn:
+            rows = conn.execute(f'''
+                SELECT c.id, c.user_id, c.query, c.response, c.timestamp,
+                       snippet(conversation_search, 1, '[', ']', '…', 12), s.rank
+                FROM conversation_search s
+                JOIN conversation_logs c ON c.id = s.rowid
+                WHERE conversation_search MATCH ? {user_filter}
+                ORDER BY s.rank
+                LIMIT ?
+            ''', params).fetchall()
+        return [
+            dict(zip(('id', 'user_id', 'query', 'response', 'timestamp', 'snippet', 'rank'), row))
+            for row in rows
+        ]
+    
+    def search_feedback(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Best matching feedback (query, response or expected answer), most relevant first"""
+        match = fts_query(text)
+        if not match:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute('''
+                SELECT f.id, f.conversation_id, f.original_query, f.original_response,
+                       f.feedback_type, f.feedback_text, f.timestamp, s.rank
+                FROM feedback_search s
+                JOIN feedback f ON f.id = s.rowid
+                WHERE feedback_search MATCH ?
+                ORDER BY s.rank
+                LIMIT ?
+            ''', (match, limit)).fetchall()
+        return [
+            dict(zip(('id', 'conversation_id', 'original_query', 'original_response',
+                      'feedback_type', 'feedback_text', 'timestamp', 'rank'), row))
+            for row in rows
+        ]
+    
+    def refresh_query_frequency(self, lag: float = 300, chunk_size: int = 10000) -> int:
+        """
+        Count the conversations logged since the last refresh into query_frequency
+        
+        Conversations younger than lag seconds wait for the next refresh: the
+        write-behind logger may still write lower ids (see export_analytics).
+        Returns the number of conversations counted.
+        """
+        cutoff = (datetime.utcnow() - timedelta(seconds=lag)).strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._connect()
+        counted = 0
+        while True:
+            conn.execute("BEGIN IMMEDIATE")  # two refreshes must not count the same rows
+            try:
+                row = conn.execute("SELECT value FROM stats_counters WHERE name = 'query_frequency:last_id'").fetchone()
+                rows = conn.execute(
+                    "SELECT id, timestamp, query FROM conversation_logs WHERE id > ? ORDER BY id LIMIT ?",
+                    (row[0] if row else 0, chunk_size)
+                ).fetchall()
+                ready = []
+                for conversation in rows:
+                    if conversation[1] >= cutoff:
+                        break
+                    ready.append(conversation)
+                
+                groups: Dict[str, list] = {}
+                for conversation_id, timestamp, query in ready:
+                    normalized = normalize_query(query)
+                    if not normalized:
+                        continue
+                    group = groups.setdefault(normalized, [normalized, query, 0, timestamp, timestamp, conversation_id])
+                    group[1], group[2], group[4], group[5] = query, group[2] + 1, timestamp, conversation_id
+                conn.executemany('''
+                    INSERT INTO query_frequency (normalized, example_query, count, first_seen, last_seen, last_conversation_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(normalized) DO UPDATE SET
+                        example_query = excluded.example_query,
+                        count = count + excluded.count,
+                        last_seen = excluded.last_seen,
+                        last_conversation_id = excluded.last_conversation_id
+                ''', list(groups.values()))
+                if ready:
+                    conn.execute('''
+                        INSERT INTO stats_counters (name, value) VALUES ('query_frequency:last_id', ?)
+                        ON CONFLICT(name) DO UPDATE SET value = excluded.value
+                    ''', (ready[-1][0],))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            counted += len(ready)
+            if len(ready) < chunk_size:
+                return counted
+    
+    def get_frequent_queries(self, limit: int = 20, min_count: int = 2) -> List[Dict[str, Any]]:
+        """Most asked normalized queries (as of the last refresh_query_frequency)"""
+        with self._connect() as conn:
+            rows = conn.execute('''
+                SELECT normalized, example_query, count, first_seen, last_seen, last_conversation_id
+                FROM query_frequency
+                WHERE count >= ?
+                ORDER BY count DESC
+                LIMIT ?
+            ''', (min_count, limit)).fetchall()
+        return [
+            dict(zip(('normalized', 'example_query', 'count', 'first_seen', 'last_seen', 'last_conversation_id'), row))
+            for row in rows
+        ]
     
     def get_unprocessed_feedback(self) -> List[Dict[str, Any]]:
         """Get unprocessed feedback"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT id, user_id, original_query, original_response, 
                        feedback_type, feedback_text, timestamp
                 FROM feedback 
                 WHERE processed = FALSE 
-                ORDER BY timestamp DESC
+                ORDER BY id DESC
             ''')
             
             rows = cursor.fetchall()
@@ -165,6 +677,54 @@ class DatabaseManager:
                 }
                 for row in rows
             ]
+    
+    def iter_unprocessed_feedback(self, batch_size: int = 50, after_id: int = 0) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield unprocessed feedback in id order, batch_size rows at a time
+        
+        Pages by id over the partial index, so memory stays flat however big
+        the backlog is and rows marked processed meanwhile are not seen again.
+        """
+        columns = ('id', 'conversation_id', 'user_id', 'original_query', 'original_response',
+                   'feedback_type', 'feedback_text', 'timestamp')
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(f'''
+                    SELECT {", ".join(columns)}
+                    FROM feedback
+                    WHERE processed = FALSE AND id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (after_id, batch_size)).fetchall()
+            if not rows:
+                return
+            yield [dict(zip(columns, row)) for row in rows]
+            after_id = rows[-1][0]
+    
+    def mark_feedback_processed(self, feedback_ids: List[int]) -> int:
+        """Mark feedback rows processed in one transaction; returns how many were still pending"""
+        with self._connect() as conn:
+            cursor = conn.executemany(
+                "UPDATE feedback SET processed = TRUE WHERE id = ? AND processed = FALSE",
+                [(feedback_id,) for feedback_id in feedback_ids]
+            )
+            return cursor.rowcount
+
+# Global database instance, created (and SQLite opened) on first use
+database_manager = None
+_database_lock = threading.Lock()
+
+def get_database():
+    global database_manager
+    if database_manager is None:
+        with _database_lock:
+            if database_manager is None:
+                database_manager = DatabaseManager()
+    return database_manager
+
+class _LazyDatabase:
+    """Stands in for the DatabaseManager so importing this module opens nothing"""
+    def __getattr__(self, name):
+        return getattr(get_database(), name)
 
-# Global database instance
-db = DatabaseManager()
+db = _LazyDatabase()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Module to dispatch bot work on a bounded worker pool with per-chat ordering and priority lanes
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# Priority lanes, lowest value runs first
+PRIORITY_HIGH = 0    # commands and feedback input, milliseconds of work
+PRIORITY_NORMAL = 1  # guest questions that go to the LLM
+PRIORITY_LOW = 2     # background work such as example upserts
+LANE_NAMES = ('high', 'normal', 'low')
+
+
+class _WorkItem:
+    __slots__ = ('key', 'func', 'args', 'kwargs', 'priority', 'enqueued_at')
+
+    def __init__(self, key: Optional[str], func: Callable, args: tuple, kwargs: dict, priority: int):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class ChatDispatcher:
+    """
+    Runs work items on a fixed number of worker threads.
+
+    Items submitted with the same key (the chat_id) run one at a time and in
+    submission order, because the Assistants API rejects a new run while
+    another one is active on the same thread. Items for different keys run
+    in parallel, up to max_workers at once.
+
+    Runnable items wait in one lane per priority and workers always serve the
+    highest lane first. To avoid starvation, an item that has waited longer
+    than starvation_after seconds is served before any younger item,
+    whatever its lane.
+    """
+
+    def __init__(self, max_workers: int = None, starvation_after: float = None):
+        self.max_workers = max_workers or int(os.environ.get("DISPATCHER_WORKERS", "8"))
+        self.starvation_after = starvation_after if starvation_after is not None else float(os.environ.get("DISPATCHER_STARVATION_MS", "10000")) / 1000
+
+        self._lock = threading.Condition()
+        self._lanes = tuple(deque() for _ in LANE_NAMES)  # items whose key is free to run
+        self._pending = {}         # key -> deque of items waiting for that key
+        self._busy_keys = set()    # keys with an item currently running
+        self._workers = []
+        self._running = False
+
+        # Metrics
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._promoted = 0
+        self._total_wait = [0.0] * len(LANE_NAMES)
+        self._lane_completed = [0] * len(LANE_NAMES)
+        self._max_wait = 0.0
+
+    def start(self):
+        """Start the worker threads"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"dispatcher-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        print(f"✅ Dispatcher started with {self.max_workers} workers")
+
+    def stop(self, wait: bool = True, timeout: float = 10.0):
+        """Stop the workers, optionally waiting for queued work to finish"""
+        with self._lock:
+            if wait:
+                deadline = time.monotonic() + timeout
+                while (any(self._lanes) or self._pending or self._busy_keys) and time.monotonic() < deadline:
+                    self._lock.wait(timeout=0.1)
+            self._running = False
+            self._lock.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=1.0)
+        self._workers = []
+
+    def submit(self, key: Optional[str], func: Callable, *args, priority: int = PRIORITY_NORMAL, **kwargs):
+        """
+        Queue func(*args, **kwargs) for execution
+
+        Args:
+            key: Serialization key (chat_id). None means no ordering constraint.
+            func: Callable to run on a worker thread
+            priority: PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW
+        """
+        item = _WorkItem(key, func, args, kwargs, priority)
+        with self._lock:
+            self._submitted += 1
+            if key is not None and (key in self._busy_keys or key in self._pending):
+                self._pending.setdefault(key, deque()).append(item)
+            else:
+                if key is not None:
+                    self._busy_keys.add(key)
+                self._lanes[priority].append(item)
+                self._lock.notify()
+
+    def _pick(self) -> _WorkItem:
+        """Oldest starving item if any, otherwise the head of the highest non-empty lane"""
+        now = time.monotonic()
+        starving = [lane for lane in self._lanes if lane and now - lane[0].enqueued_at > self.starvation_after]
+        if starving:
+            lane = min(starving, key=lambda l: l[0].enqueued_at)
+            if lane is not next(l for l in self._lanes if l):
+                self._promoted += 1
+            return lane.popleft()
+        return next(lane for lane in self._lanes if lane).popleft()
+
+    def _next_item(self) -> Optional[_WorkItem]:
+        with self._lock:
+            while self._running and not any(self._lanes):
+                self._lock.wait()
+            if not self._running:
+                return None
+            return self._pick()
+
+    def _release_key(self, key: Optional[str]):
+        """Hand the key to its next pending item, or mark it free"""
+        if key is None:
+            return
+        queue = self._pending.get(key)
+        if queue:
+            item = queue.popleft()
+            self._lanes[item.priority].append(item)
+            if not queue:
+                del self._pending[key]
+            self._lock.notify()
+        else:
+            self._busy_keys.discard(key)
+
+    def _worker_loop(self):
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+
+            wait = time.monotonic() - item.enqueued_at
+            failed = False
+            try:
+                item.func(*item.args, **item.kwargs)
+            except Exception as e:
+                failed = True
+                print(f"❌ Error in dispatched task for {item.key}: {e}")
+
+            with self._lock:
+                self._completed += 1
+                if failed:
+                    self._failed += 1
+                self._total_wait[item.priority] += wait
+                self._lane_completed[item.priority] += 1
+                self._max_wait = max(self._max_wait, wait)
+                self._release_key(item.key)
+                self._lock.notify_all()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue depth and wait-time metrics"""
+        with self._lock:
+            now = time.monotonic()
+            pending = [item for queue in self._pending.values() for item in queue]
+            waiting = [item for lane in self._lanes for item in lane] + pending
+            lanes = {}
+            for priority, name in enumerate(LANE_NAMES):
+                completed = self._lane_completed[priority]
+                lanes[name] = {
+                    'queue_depth': len(self._lanes[priority]) + sum(1 for item in pending if item.priority == priority),
+                    'avg_wait': (self._total_wait[priority] / completed) if completed else 0.0
+                }
+            return {
+                'workers': self.max_workers,
+                'queue_depth': len(waiting),
+                'ready': sum(len(lane) for lane in self._lanes),
+                'active_chats': len(self._busy_keys),
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'promoted': self._promoted,
+                'avg_wait': (sum(self._total_wait) / self._completed) if self._completed else 0.0,
+                'max_wait': self._max_wait,
+                'oldest_wait': max((now - item.enqueued_at for item in waiting), default=0.0),
+                'lanes': lanes
+            }
+
+
+# Global dispatcher instance
+dispatcher = None
+
+def get_dispatcher():
+    global dispatcher
+    if dispatcher is None:
+        dispatcher = ChatDispatcher()
+        dispatcher.start()
+    return dispatcher
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Incremental export of conversation_logs and feedback for analytics
+
+Streams new rows (id greater than the last exported one) in chunks to one
+file per table and run, so analysts query the export instead of the live
+feedback.db. Parquet and Arrow IPC need pyarrow; without it the export is
+written as gzip JSON lines. Run it nightly: the export only sees the hot
+database, and conversations older than LOG_HOT_MONTHS are moved to
+log_partitions (log_retention.py).
+
+Rows are exported once: later updates (feedback_given, processed) are not
+re-exported. Rows younger than ANALYTICS_EXPORT_LAG seconds wait for the
+next run: the write-behind logger hands out ids up to LOG_ID_BLOCK_MAX_AGE
+seconds before the row is written, so a recent row with a higher id may
+still be followed by a lower one.
+
+Usage:
+    python3 export_analytics.py [--format parquet|arrow|jsonl] [--out DIR] [--chunk-size N] [--full]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+from database import db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+TABLES = ('conversation_logs', 'feedback')
+EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow', 'jsonl': 'jsonl.gz'}
+
+
+def arrow_schema(columns: List[tuple]):
+    """Arrow schema from SQLite declared types; timestamps stay as text"""
+    types = {'INTEGER': pa.int64(), 'FLOAT': pa.float64(), 'REAL': pa.float64(), 'BOOLEAN': pa.bool_()}
+    return pa.schema([(name, types.get(declared.upper(), pa.string())) for name, declared in columns])
+
+
+class _ArrowWriter:
+    def __init__(self, path: str, columns: List[tuple], file_format: str):
+        self.names = [name for name, _ in columns]
+        self.schema = arrow_schema(columns)
+        if file_format == 'parquet':
+            self._writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            self._sink = pa.OSFile(path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+    def write(self, rows: List[tuple]):
+        arrays = []
+        for i, field in enumerate(self.schema):
+            values = [row[i] for row in rows]
+            if field.type == pa.bool_():
+                # SQLite stores booleans as 0/1
+                values = [None if value is None else bool(value) for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+        if hasattr(self, '_sink'):
+            self._sink.close()
+
+
+class _JsonLinesWriter:
+    def __init__(self, path: str, columns: List[tuple], file_format: str):
+        self.names = [name for name, _ in columns]
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+
+    def write(self, rows: List[tuple]):
+        for row in rows:
+            self._file.write(json.dumps(dict(zip(self.names, row)), ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class AnalyticsExporter:
+    """Exports each table's new rows and remembers the last exported id in out_dir/state.json"""
+
+    def __init__(self, out_dir: str = None, file_format: str = None, chunk_size: int = 10000, database=None):
+        self.db = database or db
+        self.out_dir = out_dir or os.environ.get("ANALYTICS_EXPORT_DIR", "analytics_export")
+        self.file_format = file_format or ('parquet' if pa else 'jsonl')
+        if self.file_format != 'jsonl' and pa is None:
+            raise ValueError(f"The {self.file_format} format needs pyarrow (pip install pyarrow)")
+        self.chunk_size = chunk_size
+        self.lag = float(os.environ.get("ANALYTICS_EXPORT_LAG", "300"))
+        self.state_path = os.path.join(self.out_dir, "state.json")
+
+    def load_state(self) -> Dict[str, int]:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def _save_state(self, state: Dict[str, int]):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def export_table(self, table: str, after_id: int) -> Dict[str, int]:
+        """Write rows with id > after_id to a new file; returns rows written and the last id"""
+        columns = self.db.get_columns(table)
+        os.makedirs(os.path.join(self.out_dir, table), exist_ok=True)
+        tmp_path = os.path.join(self.out_dir, table, f".export-{os.getpid()}.tmp")
+        writer_class = _JsonLinesWriter if self.file_format == 'jsonl' else _ArrowWriter
+
+        # Stop at the first row that is too recent, so no id is skipped for good
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.lag)).strftime('%Y-%m-%d %H:%M:%S')
+        timestamp_index = [name for name, _ in columns].index('timestamp')
+
+        writer = None
+        first_id = last_id = None
+        rows_written = 0
+        try:
+            for rows in self.db.iter_rows(table, after_id=after_id, chunk_size=self.chunk_size):
+                recent = next((i for i, row in enumerate(rows) if row[timestamp_index] >= cutoff), None)
+                if recent is not None:
+                    rows = rows[:recent]
+                if not rows:
+                    break
+                if writer is None:
+                    writer = writer_class(tmp_path, columns, self.file_format)
+                    first_id = rows[0][0]
+                writer.write(rows)
+                rows_written += len(rows)
+                last_id = rows[-1][0]
+                if recent is not None:
+                    break
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None:
+            return {'rows': 0, 'last_id': after_id}
+        # The file only gets its final name once complete
+        path = os.path.join(self.out_dir, table, f"{table}-{first_id:010d}-{last_id:010d}.{EXTENSIONS[self.file_format]}")
+        os.replace(tmp_path, path)
+        print(f"📤 {table}: {rows_written} rows (ids {first_id}-{last_id}) -> {path}")
+        return {'rows': rows_written, 'last_id': last_id}
+
+    def run(self, full: bool = False) -> Dict[str, int]:
+        """Export every table incrementally (or from the start with full=True)"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        state = {} if full else self.load_state()
+        exported = {}
+        for table in TABLES:
+            result = self.export_table(table, state.get(table, 0))
+            state[table] = result['last_id']
+            # Saved after each table so a failure doesn't re-export the finished ones
+            self._save_state(state)
+            exported[table] = result['rows']
+        return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export conversation logs and feedback for analytics")
+    parser.add_argument('--format', choices=sorted(EXTENSIONS), help="parquet (default with pyarrow), arrow or jsonl")
+    parser.add_argument('--out', help="Output directory (ANALYTICS_EXPORT_DIR, default analytics_export)")
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--full', action='store_true', help="Ignore the saved state and export everything")
+    args = parser.parse_args()
+
+    try:
+        exporter = AnalyticsExporter(out_dir=args.out, file_format=args.format, chunk_size=args.chunk_size)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"📊 Exporting to {exporter.out_dir} as {exporter.file_format}...")
+    started = time.monotonic()
+    exported = exporter.run(full=args.full)
+    print(f"✅ Exported {exported} in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Module to answer high-confidence queries directly, without an Assistant run
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.environ.get(name, default).lower() in ("1", "true", "yes", "on")
+
+
+class FastPathRouter:
+    """
+    Decides whether retrieval results are good enough to answer on their own.
+
+    Routes:
+      - example:  a stored example is a near-exact match, reuse its response
+      - airtable: one Airtable item clearly matches an appliance question,
+                  answer from a template
+      - llm:      anything else goes through the Assistant
+    """
+
+    def __init__(self, enabled: bool = None, example_threshold: float = None,
+                 airtable_threshold: float = None, airtable_margin: float = None):
+        self.enabled = enabled if enabled is not None else _env_flag("FAST_PATH_ENABLED", "true")
+        self.example_threshold = example_threshold if example_threshold is not None else float(os.environ.get("FAST_PATH_EXAMPLE_SCORE", "0.95"))
+        self.airtable_threshold = airtable_threshold if airtable_threshold is not None else float(os.environ.get("FAST_PATH_AIRTABLE_SCORE", "0.75"))
+        self.airtable_margin = airtable_margin if airtable_margin is not None else float(os.environ.get("FAST_PATH_AIRTABLE_MARGIN", "0.25"))
+
+        self._lock = threading.Lock()
+        self._routes = {'example': 0, 'airtable': 0, 'llm': 0}
+
+    def _airtable_reply(self, fields: Dict[str, Any]) -> Optional[str]:
+        """Template answer for an item; None when the record lacks the brand"""
+        code = fields.get('Code', '')
+        make = fields.get('Make (Brand)', '')
+        if not code or not make:
+            return None
+
+        reply = f"The {code} is a {make}"
+        model = fields.get('Model', '')
+        if model:
+            reply += f" (model {model})"
+        level = fields.get('Level of the house', [])
+        if level:
+            reply += f", located on the {', '.join(level)}"
+        return reply + "."
+
+    def select_candidates(self, query_type: str, example_scores: List[float],
+                          item_scores: List[float]) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Indexes of the example and the Airtable item whose scores clear the thresholds
+
+        Only looks at the scores, so replay_routing.py runs the same decision
+        on logged candidates. route() still needs the example's response and
+        the item's brand before answering with them.
+        """
+        example_index = max(range(len(example_scores)), key=example_scores.__getitem__, default=None)
+        if example_index is not None and example_scores[example_index] < self.example_threshold:
+            example_index = None
+
+        item_index = None
+        if query_type == 'appliances' and item_scores:
+            ranked = sorted((score, i) for i, score in enumerate(item_scores))
+            top_score, top_index = ranked[-1]
+            runner_up = ranked[-2][0] if len(ranked) > 1 else 0.0
+            if top_score >= self.airtable_threshold and top_score - runner_up >= self.airtable_margin:
+                item_index = top_index
+        return example_index, item_index
+
+    def route(self, query: str, query_type: str, airtable_data: Optional[Dict[str, Any]],
+              examples: List[Dict[str, Any]], airtable_client=None) -> Dict[str, Any]:
+        """
+        Pick a route for the query
+
+        Args:
+            query: Guest question
+            query_type: Category from analyze_query
+            airtable_data: Result of get_property_info, or None
+            examples: Result of search_similar_examples
+            airtable_client: Client used to score Airtable matches
+
+        Returns:
+            Decision with route, reply (None for llm), confidence, reason and elapsed_ms
+        """
+        started = time.perf_counter()
+        decision = {'route': 'llm', 'reply': None, 'confidence': 0.0, 'reason': 'disabled'}
+
+        if self.enabled:
+            decision['reason'] = 'low confidence'
+            example_scores = [example.get('original_score', example['score']) for example in examples]
+            items = []
+            if query_type == 'appliances' and airtable_data and airtable_client:
+                items = airtable_data.get('items', [])
+            item_scores = [airtable_client.match_confidence(item, query) for item in items]
+            example_index, item_index = self.select_candidates(query_type, example_scores, item_scores)
+
+            # Near-exact example match: reuse the stored response
+            decision['confidence'] = max(example_scores, default=0.0)
+            if example_index is not None and examples[example_index].get('response'):
+                best_example = examples[example_index]
+                decision.update(route='example', reply=best_example['response'],
+                                reason=f"example {best_example['id']}")
+
+            # Single clear Airtable item for an appliance question
+            if decision['route'] == 'llm' and item_scores:
+                decision['confidence'] = max(decision['confidence'], max(item_scores))
+                if item_index is not None:
+                    reply = self._airtable_reply(items[item_index].get('fields', {}))
+                    if reply:
+                        decision.update(route='airtable', reply=reply, confidence=item_scores[item_index],
+                                        reason=f"item {items[item_index].get('id')}")
+
+        decision['elapsed_ms'] = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._routes[decision['route']] += 1
+
+        print(f"🚦 Route: {decision['route']} (confidence: {decision['confidence']:.2f}, "
+              f"{decision['reason']}, {decision['elapsed_ms']:.1f}ms)")
+        return decision
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._routes)
+
+
+def routing_record(query: str, query_type: str, sources: List[str], decision: Dict[str, Any],
+                   examples: List[Dict[str, Any]], airtable_data: Optional[Dict[str, Any]],
+                   airtable_client=None, context_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Compact summary of how a query was routed, for the routing log
+
+    Args:
+        sources: Lookups made ('airtable', 'pinecone')
+        decision: Result of FastPathRouter.route
+        context_stats: ContextBuilder stats when the query went to the Assistant
+
+    Returns:
+        Record with the database.ROUTING_COLUMNS keys (except conversation_id)
+    """
+    candidates = [['pinecone', example['id'], round(example.get('original_score', example['score']), 4)]
+                  for example in examples]
+    if airtable_data and airtable_client:
+        for kind, records in (('item', airtable_data.get('items', [])), ('house', airtable_data.get('houses', []))):
+            candidates.extend([kind, record.get('id'), round(airtable_client.match_confidence(record, query), 4)]
+                              for record in records)
+    if decision['route'] == 'llm':
+        used_sources = context_stats['sources'] if context_stats else []
+    else:
+        used_sources = ['pinecone' if decision['route'] == 'example' else 'airtable']
+    return {
+        'query_type': query_type,
+        'route': decision['route'],
+        'confidence': round(decision['confidence'], 4),
+        'sources': ",".join(sources),
+        'used_sources': ",".join(used_sources),
+        'candidates': json.dumps(candidates, separators=(',', ':')),
+        'context_tokens': context_stats['tokens'] if context_stats else 0,
+        'context_snippets': context_stats['packed'] if context_stats else 0,
+    }
+
+
+# Global fast path router instance
+fast_path_router = None
+
+def get_fast_path_router():
+    global fast_path_router
+    if fast_path_router is None:
+        fast_path_router = FastPathRouter()
+    return fast_path_router
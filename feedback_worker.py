@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Module to turn feedback into Pinecone examples in batches, off the request path
+
+Unprocessed feedback is read in id order, FEEDBACK_BATCH_SIZE rows at a
+time. Each batch gets its query embeddings in one OpenAI request and its
+examples upserted in one Pinecone request. Then the batch is marked
+processed in one transaction. Example ids are derived from the feedback id
+(feedback_<id>), so a batch repeated after a crash overwrites the same
+vectors: the worker can be stopped and restarted at any point.
+
+Usage:
+    python3 feedback_worker.py    # process the whole backlog once
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from database import db
+
+
+def example_id(feedback_id: int) -> str:
+    return f"feedback_{feedback_id}"
+
+
+class FeedbackWorker:
+    """Processes the feedback backlog now and then, or as soon as wake() is called"""
+
+    def __init__(self, database=None, pinecone_manager=None, batch_size: int = None, interval: float = None):
+        self.db = database or db
+        self._pinecone_manager = pinecone_manager
+        self.batch_size = batch_size or int(os.environ.get("FEEDBACK_BATCH_SIZE", "50"))
+        self.interval = interval if interval is not None else float(os.environ.get("FEEDBACK_WORKER_INTERVAL", "30"))
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._run_lock = threading.Lock()  # one pass over the backlog at a time
+        self._thread = None
+        self._counters = {'processed': 0, 'upserted': 0, 'batches': 0, 'errors': 0}
+
+    def _vectors(self, rows: List[Dict[str, Any]], embeddings: List[List[float]]) -> List[Dict[str, Any]]:
+        vectors = []
+        for row, embedding in zip(rows, embeddings):
+            created_at = datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+            vectors.append({
+                "id": example_id(row['id']),
+                "values": embedding,
+                "metadata": {
+                    "query": row['original_query'],
+                    "response": row['feedback_text'],  # The response the user expected
+                    "user_feedback": "Expected response provided by user",
+                    "created_at": created_at.isoformat(),
+                    "type": "positive_example",
+                    "query_length": len(row['original_query']),
+                    "response_length": len(row['feedback_text']),
+                    "feedback_id": row['id'],
+                    "conversation_id": row['conversation_id'] or 0,
+                }
+            })
+        return vectors
+
+    def process_batch(self, rows: List[Dict[str, Any]]) -> bool:
+        """Upsert the batch's expected responses, then mark every row processed"""
+        examples = [row for row in rows
+                    if row['feedback_type'] == 'example_response' and row['feedback_text'] and row['original_query']]
+        if examples:
+            if self._pinecone_manager is None:
+                from pinecone_client import get_pinecone_manager
+                self._pinecone_manager = get_pinecone_manager()
+            pinecone_manager = self._pinecone_manager
+            embeddings = pinecone_manager.create_embeddings([row['original_query'] for row in examples])
+            if len(embeddings) != len(examples):
+                return False
+            if not pinecone_manager.upsert_examples(self._vectors(examples, embeddings)):
+                return False
+        self.db.mark_feedback_processed([row['id'] for row in rows])
+        self._counters['processed'] += len(rows)
+        self._counters['upserted'] += len(examples)
+        self._counters['batches'] += 1
+        return True
+
+    def run_once(self) -> int:
+        """Work through the backlog; a failed batch stops the pass and is retried on the next one"""
+        processed = 0
+        with self._run_lock:
+            for rows in self.db.iter_unprocessed_feedback(self.batch_size):
+                try:
+                    done = self.process_batch(rows)
+                except Exception as e:
+                    print(f"❌ Error processing feedback {rows[0]['id']}-{rows[-1]['id']}: {e}")
+                    done = False
+                if not done:
+                    self._counters['errors'] += 1
+                    break
+                processed += len(rows)
+                if self._stop.is_set():
+                    break
+        if processed:
+            print(f"🧠 Processed {processed} feedback entries")
+        return processed
+
+    def wake(self):
+        """Process the backlog now instead of at the next interval"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self._counters['errors'] += 1
+                print(f"❌ Error in feedback worker: {e}")
+            self._wake.wait(timeout=self.interval)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="feedback-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop after the batch in progress"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def get_metrics(self) -> Dict[str, int]:
+        return dict(self._counters)
+
+
+# Global feedback worker instance
+feedback_worker = None
+
+def get_feedback_worker():
+    global feedback_worker
+    if feedback_worker is None:
+        feedback_worker = FeedbackWorker()
+    return feedback_worker
+
+
+if __name__ == "__main__":
+    worker = get_feedback_worker()
+    started = time.monotonic()
+    worker.run_once()
+    print(f"✅ {worker.get_metrics()} in {time.monotonic() - started:.1f}s")
+    db.close()
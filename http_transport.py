@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Module with the shared HTTP transport: sized keep-alive connection pools for every client
+"""
+import os
+import threading
+from typing import Any, Dict, List
+
+# Pool sizes and keep-alive, shared by all outbound HTTP clients
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "60"))
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "false").lower() == "true"
+
+
+class _ReuseCounter:
+    """Counts requests and the new connections they opened, from httpcore trace events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    def on_request(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions['trace'] = self._trace
+
+    def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.connections += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return _reuse_metrics(self.requests, self.connections)
+
+
+def _reuse_metrics(requests: int, connections: int) -> Dict[str, Any]:
+    reused = max(0, requests - connections)
+    return {
+        'requests': requests,
+        'new_connections': connections,
+        'reused': reused,
+        'reuse_rate': (reused / requests * 100) if requests else 0.0
+    }
+
+
+_lock = threading.Lock()
+_httpx_client = None
+_httpx_counter = _ReuseCounter()
+_openai_client = None
+_requests_session = None
+_adapters: List[Any] = []
+
+
+def get_httpx_client():
+    """Shared httpx client (used by the OpenAI SDK) with a sized keep-alive pool"""
+    global _httpx_client
+    if _httpx_client is None:
+        with _lock:
+            if _httpx_client is None:
+                import httpx
+                limits = httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE,
+                                      keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+                kwargs = dict(limits=limits, timeout=httpx.Timeout(HTTP_TIMEOUT, connect=10.0),
+                              event_hooks={'request': [_httpx_counter.on_request]})
+                try:
+                    _httpx_client = httpx.Client(http2=HTTP2_ENABLED, **kwargs)
+                except ImportError:
+                    # http2=True needs the optional h2 package
+                    print("⚠️ HTTP2_ENABLED is set but h2 is not installed, using HTTP/1.1")
+                    _httpx_client = httpx.Client(**kwargs)
+    return _httpx_client
+
+
+def get_openai_client():
+    """The process-wide OpenAI client, on the shared httpx pool; importing the SDK is slow"""
+    global _openai_client
+    if _openai_client is None:
+        http_client = get_httpx_client()
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(http_client=http_client, max_retries=2)
+    return _openai_client
+
+
+def mount_pool(session):
+    """Give a requests session a sized keep-alive pool, keeping its retry policy"""
+    from requests.adapters import HTTPAdapter
+    for prefix in ('https://', 'http://'):
+        current = session.adapters.get(prefix)
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE,
+                              max_retries=getattr(current, 'max_retries', 0))
+        session.mount(prefix, adapter)
+        with _lock:
+            _adapters.append(adapter)
+    return session
+
+
+def get_requests_session():
+    """Shared requests session for plain HTTP calls (Telegram Bot API scripts, shard router)"""
+    global _requests_session
+    if _requests_session is None:
+        import requests
+        session = mount_pool(requests.Session())
+        with _lock:
+            if _requests_session is None:
+                _requests_session = session
+    return _requests_session
+
+
+def telegram_request_kwargs(workers: int) -> Dict[str, Any]:
+    """request_kwargs for the python-telegram-bot 13 Updater: one pooled connection per sending thread"""
+    return {'con_pool_size': workers + 4, 'connect_timeout': 10.0, 'read_timeout': 30.0}
+
+
+def get_transport_metrics() -> Dict[str, Dict[str, Any]]:
+    """Requests sent and connections opened per pool; reused = requests without a new handshake"""
+    metrics = {'httpx': _httpx_counter.get_metrics()}
+    requests_sent = connections = 0
+    with _lock:
+        adapters = list(_adapters)
+    for adapter in adapters:
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+    metrics['requests'] = _reuse_metrics(requests_sent, connections)
+    return metrics
+
+
+def close():
+    """Close the shared pools"""
+    if _httpx_client is not None:
+        _httpx_client.close()
+    if _requests_session is not None:
+        _requests_session.close()
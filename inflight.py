@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Module to track in-flight Assistant requests per chat and supersede stale ones
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+
+POLICIES = ('cancel', 'queue', 'merge')
+
+
+class RequestSuperseded(Exception):
+    """Raised inside a request's pipeline once a newer message has superseded it"""
+
+
+class InFlightRequest:
+    __slots__ = ('chat_id', 'texts', 'thread_id', 'run_id', '_cancelled', '_replied', '_lock')
+
+    def __init__(self, chat_id: str, texts: List[str]):
+        self.chat_id = chat_id
+        self.texts = texts
+        self.thread_id = None
+        self.run_id = None
+        self._cancelled = threading.Event()
+        self._replied = False
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def set_run(self, thread_id: str, run_id: str):
+        self.thread_id = thread_id
+        self.run_id = run_id
+
+    def check(self):
+        """Abort the pipeline if a newer message superseded this request"""
+        if self._cancelled.is_set():
+            raise RequestSuperseded(f"Request for {self.chat_id} superseded")
+
+    def cancel(self) -> bool:
+        """Cancel the request unless its reply is already on the way"""
+        with self._lock:
+            if self._replied:
+                return False
+            self._cancelled.set()
+            return True
+
+    def mark_replied(self) -> bool:
+        """Claim the right to reply; False if the request was cancelled first"""
+        with self._lock:
+            if self._cancelled.is_set():
+                return False
+            self._replied = True
+            return True
+
+
+class InFlightTracker:
+    """
+    Keeps the in-flight request of each chat.
+
+    When a new message arrives for a chat that already has a request running,
+    the policy decides what happens to the old one:
+      - cancel: abort retrieval / cancel the run and never send its reply
+      - queue:  let it finish and answer the new message afterwards
+      - merge:  cancel it and fold its text into the next request
+    """
+
+    def __init__(self, policy: str = None):
+        self.policy = (policy or os.environ.get("SUPERSEDE_POLICY", "merge")).lower()
+        if self.policy not in POLICIES:
+            raise ValueError(f"SUPERSEDE_POLICY must be one of {', '.join(POLICIES)}")
+
+        self._lock = threading.Lock()
+        self._requests: Dict[str, InFlightRequest] = {}
+        self._carry: Dict[str, List[str]] = {}
+
+        # Metrics
+        self._superseded = 0
+
+    def begin(self, chat_id: str, texts: List[str]) -> InFlightRequest:
+        """Register a new request, prepending any text carried over by a merge"""
+        with self._lock:
+            carried = self._carry.pop(chat_id, [])
+            request = InFlightRequest(chat_id, carried + list(texts))
+            self._requests[chat_id] = request
+            return request
+
+    def finish(self, request: InFlightRequest):
+        with self._lock:
+            if self._requests.get(request.chat_id) is request:
+                del self._requests[request.chat_id]
+
+    def get(self, chat_id: str) -> Optional[InFlightRequest]:
+        with self._lock:
+            return self._requests.get(chat_id)
+
+    def supersede(self, chat_id: str) -> bool:
+        """Apply the policy to the chat's in-flight request, if any"""
+        if self.policy == 'queue':
+            return False
+
+        with self._lock:
+            request = self._requests.get(chat_id)
+            if request is None or request.cancelled or not request.cancel():
+                return False
+            if self.policy == 'merge':
+                self._carry[chat_id] = self._carry.get(chat_id, []) + request.texts
+            self._superseded += 1
+
+        print(f"⏭️ Superseded in-flight request for {chat_id} (policy: {self.policy})")
+        return True
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'in_flight': len(self._requests),
+                'superseded': self._superseded
+            }
+
+
+# Global tracker instance
+tracker = None
+
+def get_inflight_tracker():
+    global tracker
+    if tracker is None:
+        tracker = InFlightTracker()
+    return tracker
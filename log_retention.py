@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Module to keep the hot conversation log small: monthly partitions, compressed archives and off-peak VACUUM
+
+Conversations older than LOG_HOT_MONTHS months move out of feedback.db into
+one SQLite file per month (LOG_PARTITION_DIR/conversations_YYYY_MM.db).
+Partitions older than LOG_ARCHIVE_MONTHS months are compressed to gzip JSON
+lines and their SQLite file removed. Archives are never rewritten: late
+conversations dated in an archived month are left in the hot database.
+The log_partitions table in the hot database is the thin index: month,
+location and id range of every partition or archive, so a conversation can
+still be found by id.
+
+Routing records (routing_log) move with their conversations: into the
+partition's own routing_log table, then into the archive line under
+'routing'. replay_routing.py and the full-text search (search_logs.py) only
+cover the hot database.
+
+Counters and daily rollups (database.py) are not affected: they count
+conversations when they are logged and are never decremented.
+
+Usage:
+    python3 log_retention.py [roll|archive|vacuum|all]
+"""
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from database import db, ROUTING_COLUMNS
+
+
+def _month_start(month: str) -> str:
+    """'2026-10' -> '2026-10-01', comparable with the log timestamps"""
+    return f"{month}-01"
+
+
+def _shift_month(month: str, delta: int) -> str:
+    year, number = map(int, month.split('-'))
+    index = year * 12 + (number - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+class LogRetention:
+    """Moves old conversations to monthly partitions and archives, then reclaims the space"""
+
+    def __init__(self, db_path: str = None, partition_dir: str = None, hot_months: int = None,
+                 archive_months: int = None, maintenance_hours: str = None, vacuum_min_free: float = None):
+        self.db_path = db_path or db.db_path
+        self.partition_dir = partition_dir or os.environ.get("LOG_PARTITION_DIR", "log_partitions")
+        self.hot_months = hot_months or int(os.environ.get("LOG_HOT_MONTHS", "2"))
+        self.archive_months = archive_months or int(os.environ.get("LOG_ARCHIVE_MONTHS", "12"))
+        start, end = (maintenance_hours or os.environ.get("LOG_MAINTENANCE_HOURS", "3-5")).split('-')
+        self.maintenance_hours = (int(start), int(end))
+        self.vacuum_min_free = vacuum_min_free if vacuum_min_free is not None else float(os.environ.get("LOG_VACUUM_MIN_FREE", "0.2"))
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_run_day = None
+        self._counters = {'rolled_rows': 0, 'skipped_months': 0, 'archived_months': 0, 'vacuums': 0, 'errors': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Its own autocommit connection: ATTACH must not leak into the shared ones
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _partition_path(self, month: str, extension: str) -> str:
+        return os.path.join(self.partition_dir, f"conversations_{month.replace('-', '_')}.{extension}")
+
+    @staticmethod
+    def _current_month(now: datetime = None) -> str:
+        return (now or datetime.utcnow()).strftime('%Y-%m')
+
+    def _prepare_partition(self, conn: sqlite3.Connection):
+        """Create the attached partition's tables with the hot tables' schema, adding newer columns"""
+        for table in ('conversation_logs', 'routing_log'):
+            create_sql = conn.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()[0]
+            conn.execute(create_sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE IF NOT EXISTS part.{table}", 1))
+        existing = {row[1] for row in conn.execute("PRAGMA part.table_info(conversation_logs)")}
+        for _, name, column_type, _, default, _ in conn.execute("PRAGMA main.table_info(conversation_logs)").fetchall():
+            if name not in existing:
+                default_sql = f" DEFAULT {default}" if default is not None else ""
+                conn.execute(f"ALTER TABLE part.conversation_logs ADD COLUMN {name} {column_type}{default_sql}")
+
+    def roll_partitions(self, now: datetime = None) -> int:
+        """Move conversations older than the hot window into their month's partition file"""
+        cutoff = _shift_month(self._current_month(now), -(self.hot_months - 1))
+        os.makedirs(self.partition_dir, exist_ok=True)
+        conn = self._connect()
+        moved = 0
+        after = ""
+        try:
+            while True:
+                row = conn.execute(
+                    "SELECT substr(MIN(timestamp), 1, 7) FROM conversation_logs WHERE timestamp >= ? AND timestamp < ?",
+                    (after, _month_start(cutoff))
+                ).fetchone()
+                month = row[0] if row else None
+                if not month:
+                    break
+                after = _month_start(_shift_month(month, 1))
+                status = conn.execute("SELECT status FROM log_partitions WHERE month = ?", (month,)).fetchone()
+                if status and status[0] == 'archive':
+                    # The archive is immutable; late rows stay in the hot log where they can still be found
+                    self._counters['skipped_months'] += 1
+                    print(f"⚠️ {month} is already archived, leaving its late conversations in the hot log")
+                    continue
+                moved += self._roll_month(conn, month)
+        finally:
+            conn.close()
+        return moved
+
+    def _roll_month(self, conn: sqlite3.Connection, month: str) -> int:
+        path = self._partition_path(month, "db")
+        bounds = (_month_start(month), _month_start(_shift_month(month, 1)))
+        conn.execute("ATTACH DATABASE ? AS part", (path,))
+        try:
+            self._prepare_partition(conn)
+            columns = ", ".join(row[1] for row in conn.execute("PRAGMA main.table_info(conversation_logs)"))
+            # WAL can't commit two files atomically: INSERT OR IGNORE makes a rerun after a crash safe
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO part.conversation_logs ({columns})
+                    SELECT {columns} FROM main.conversation_logs WHERE timestamp >= ? AND timestamp < ?
+                ''', bounds)
+                # Deleting a conversation deletes its routing record too (routing_log_delete)
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO part.routing_log ({", ".join(ROUTING_COLUMNS)})
+                    SELECT {", ".join("r." + name for name in ROUTING_COLUMNS)}
+                    FROM main.routing_log r
+                    JOIN main.conversation_logs c ON c.id = r.conversation_id
+                    WHERE c.timestamp >= ? AND c.timestamp < ?
+                ''', bounds)
+                moved = conn.execute(
+                    "DELETE FROM main.conversation_logs WHERE timestamp >= ? AND timestamp < ?", bounds
+                ).rowcount
+                first_id, last_id, rows = conn.execute(
+                    "SELECT MIN(id), MAX(id), COUNT(*) FROM part.conversation_logs"
+                ).fetchone()
+                conn.execute('''
+                    INSERT INTO log_partitions (month, status, path, first_id, last_id, rows, updated_at)
+                    VALUES (?, 'partition', ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(month) DO UPDATE SET status = excluded.status, path = excluded.path,
+                        first_id = excluded.first_id, last_id = excluded.last_id, rows = excluded.rows,
+                        updated_at = excluded.updated_at
+                ''', (month, path, first_id, last_id, rows))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.execute("DETACH DATABASE part")
+        self._counters['rolled_rows'] += moved
+        print(f"🗂️ Moved {moved} conversations from {month} to {path}")
+        return moved
+
+    def archive_partitions(self, now: datetime = None) -> List[str]:
+        """Compress partitions older than archive_months into gzip JSON lines"""
+        cutoff = _shift_month(self._current_month(now), -self.archive_months)
+        conn = self._connect()
+        archived = []
+        try:
+            months = [row[0] for row in conn.execute(
+                "SELECT month FROM log_partitions WHERE status = 'partition' AND month < ? ORDER BY month", (cutoff,)
+            )]
+            for month in months:
+                self._archive_month(conn, month)
+                archived.append(month)
+        finally:
+            conn.close()
+        return archived
+
+    def _archive_month(self, conn: sqlite3.Connection, month: str):
+        source = self._partition_path(month, "db")
+        target = self._partition_path(month, "jsonl.gz")
+        partition = sqlite3.connect(source)
+        partition.row_factory = sqlite3.Row
+        try:
+            # Written under a temporary name so a crash never leaves a truncated archive
+            # Partitions rolled before routing_log existed have no routing records
+            has_routing = partition.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'routing_log'"
+            ).fetchone()
+            with gzip.open(target + ".tmp", "wt", encoding="utf-8") as archive:
+                for row in partition.execute("SELECT * FROM conversation_logs ORDER BY id"):
+                    record = dict(row)
+                    if has_routing:
+                        routing = partition.execute(
+                            "SELECT * FROM routing_log WHERE conversation_id = ?", (record['id'],)
+                        ).fetchone()
+                        if routing:
+                            record['routing'] = dict(routing)
+                    archive.write(json.dumps(record, ensure_ascii=False) + "\n")
+        finally:
+            partition.close()
+        os.replace(target + ".tmp", target)
+        conn.execute(
+            "UPDATE log_partitions SET status = 'archive', path = ?, bytes = ?, updated_at = CURRENT_TIMESTAMP WHERE month = ?",
+            (target, os.path.getsize(target), month)
+        )
+        os.remove(source)
+        self._counters['archived_months'] += 1
+        print(f"📦 Archived {month} to {target}")
+
+    def vacuum_if_needed(self, force: bool = False) -> bool:
+        """VACUUM the hot database when enough of it is free pages"""
+        conn = self._connect()
+        try:
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not force and (not page_count or free / page_count < self.vacuum_min_free):
+                return False
+            started = time.monotonic()
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        self._counters['vacuums'] += 1
+        print(f"🧹 Vacuumed {self.db_path}: {free}/{page_count} free pages reclaimed in {time.monotonic() - started:.1f}s")
+        return True
+
+    def run(self, now: datetime = None):
+        """Roll, archive and vacuum"""
+        # Rows the write-behind logger still holds belong to the hot window anyway
+        self.roll_partitions(now)
+        self.archive_partitions(now)
+        self.vacuum_if_needed()
+
+    def find_conversation(self, conversation_id: int) -> Optional[Dict[str, Any]]:
+        """Find a conversation by id in the hot log, a partition or an archive"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            row = conn.execute("SELECT * FROM conversation_logs WHERE id = ?", (conversation_id,)).fetchone()
+            if row:
+                return dict(row)
+            located = conn.execute(
+                "SELECT status, path FROM log_partitions WHERE ? BETWEEN first_id AND last_id", (conversation_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        for status, path in located:
+            if status == 'partition':
+                partition = sqlite3.connect(path)
+                partition.row_factory = sqlite3.Row
+                try:
+                    row = partition.execute("SELECT * FROM conversation_logs WHERE id = ?", (conversation_id,)).fetchone()
+                finally:
+                    partition.close()
+                if row:
+                    return dict(row)
+            else:
+                with gzip.open(path, "rt", encoding="utf-8") as archive:
+                    for line in archive:
+                        record = json.loads(line)
+                        if record['id'] == conversation_id:
+                            return record
+        return None
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT month, status, path, first_id, last_id, rows, bytes FROM log_partitions ORDER BY month"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(('month', 'status', 'path', 'first_id', 'last_id', 'rows', 'bytes'), row)) for row in rows]
+
+    def _in_maintenance_window(self) -> bool:
+        start, end = self.maintenance_hours
+        hour = datetime.now().hour
+        return start <= hour < end if start <= end else (hour >= start or hour < end)
+
+    def _maintenance_loop(self):
+        while not self._stop.wait(timeout=600):
+            today = datetime.now().date()
+            if self._last_run_day == today or not self._in_maintenance_window():
+                continue
+            self._last_run_day = today
+            try:
+                self.run()
+            except Exception as e:
+                self._counters['errors'] += 1
+                print(f"❌ Error in log maintenance: {e}")
+
+    def start(self):
+        """Run maintenance once a day inside the off-peak window (LOG_MAINTENANCE_HOURS, local time)"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._maintenance_loop, name="log-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def get_metrics(self) -> Dict[str, int]:
+        return dict(self._counters)
+
+
+# Global log retention instance
+log_retention = None
+
+def get_log_retention():
+    global log_retention
+    if log_retention is None:
+        log_retention = LogRetention()
+    return log_retention
+
+
+if __name__ == "__main__":
+    action = sys.argv[1] if len(sys.argv) > 1 else "all"
+    retention = get_log_retention()
+    if action == "roll":
+        print(f"✅ Moved {retention.roll_partitions()} conversations")
+    elif action == "archive":
+        print(f"✅ Archived: {retention.archive_partitions() or 'nothing'}")
+    elif action == "vacuum":
+        retention.vacuum_if_needed(force=True)
+    elif action == "all":
+        retention.run()
+    else:
+        print(__doc__)
+        sys.exit(1)
+    for partition in retention.list_partitions():
+        print(f"   • {partition['month']}: {partition['status']}, {partition['rows']} conversations ({partition['path']})")
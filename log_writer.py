@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Module to log conversations write-behind, in batched transactions off the handler thread
+"""
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+from database import db, TELEMETRY_COLUMNS, ROUTING_COLUMNS
+
+
+class ConversationLogWriter:
+    """
+    Queues conversation rows and writes them with executemany in one
+    transaction every batch_size rows or flush_interval seconds.
+
+    log() returns the conversation id immediately: ids come from blocks of
+    id_block ids reserved up front in the database, so /feedback can refer
+    to a conversation before its row is written. Rows still queued are
+    flushed by stop(), which also runs at interpreter exit.
+    """
+
+    def __init__(self, database=None, batch_size: int = None, flush_interval: float = None, id_block: int = None):
+        self.db = database or db
+        self.batch_size = batch_size or int(os.environ.get("LOG_BATCH_SIZE", "100"))
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.environ.get("LOG_FLUSH_MS", "500")) / 1000
+        self.id_block = id_block or int(os.environ.get("LOG_ID_BLOCK", "100"))
+        # Leftover ids of an old block are dropped, so an id is always used
+        # shortly after it was reserved (export_analytics relies on this)
+        self.id_block_max_age = float(os.environ.get("LOG_ID_BLOCK_MAX_AGE", "60"))
+        # Failed flushes in a row before the queued rows are written one by one
+        self.max_retries = int(os.environ.get("LOG_MAX_RETRIES", "5"))
+
+        self._lock = threading.Condition()
+        self._flush_lock = threading.Lock()  # one writer transaction at a time
+        self._rows: List[tuple] = []
+        self._routing_rows: List[tuple] = []
+        self._send_times: List[tuple] = []
+        self._next_id = 0
+        self._last_id = -1
+        self._block_reserved_at = 0.0
+        self._failures = 0
+        self._running = False
+        self._thread = None
+        self._counters = {'logged': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'errors': 0}
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._flush_loop, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def log(self, user_id: str, query: str, response: str, response_time: float = None,
+            used_rag: bool = False, used_airtable: bool = False, used_pinecone: bool = False,
+            telemetry: Dict[str, Any] = None, routing: Dict[str, Any] = None) -> int:
+        """Queue a conversation (telemetry: stage timings and token counts; routing: routing_log record) and return its id"""
+        telemetry = telemetry or {}
+        timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')  # same format as CURRENT_TIMESTAMP
+        with self._lock:
+            if self._next_id > self._last_id or time.monotonic() - self._block_reserved_at > self.id_block_max_age:
+                self._next_id = self.db.reserve_conversation_ids(self.id_block)
+                self._last_id = self._next_id + self.id_block - 1
+                self._block_reserved_at = time.monotonic()
+            conversation_id = self._next_id
+            self._next_id += 1
+            self._rows.append((conversation_id, timestamp, user_id, query, response, response_time,
+                               used_rag, used_airtable, used_pinecone)
+                              + tuple(telemetry.get(name) for name in TELEMETRY_COLUMNS))
+            if routing:
+                self._routing_rows.append((conversation_id,) + tuple(routing.get(name) for name in ROUTING_COLUMNS[1:]))
+            self._counters['logged'] += 1
+            if len(self._rows) >= self.batch_size:
+                self._lock.notify()
+        return conversation_id
+
+    def record_send(self, conversation_id: int, send_ms: float):
+        """Queue the send_ms of a conversation already logged, known once its reply is delivered"""
+        with self._lock:
+            self._send_times.append((send_ms, conversation_id))
+
+    def flush(self):
+        """Write every queued row now"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                routing_rows, self._routing_rows = self._routing_rows, []
+                send_times, self._send_times = self._send_times, []
+            if not rows and not send_times:
+                return
+            try:
+                self.db.log_conversations(rows, routing_rows, send_times)
+            except Exception as e:
+                print(f"❌ Error writing {len(rows)} conversation logs: {e}")
+                with self._lock:
+                    self._counters['errors'] += 1
+                    self._failures += 1
+                    if self._failures < self.max_retries:
+                        # Keep them for the next flush, ahead of newer rows
+                        self._rows[:0] = rows
+                        self._routing_rows[:0] = routing_rows
+                        self._send_times[:0] = send_times
+                        return
+                    self._failures = 0
+                # A bad row would block every later one: write them one by one and drop those that fail
+                self._write_rows_apart(rows, routing_rows, send_times)
+                return
+            with self._lock:
+                self._failures = 0
+                self._counters['written'] += len(rows)
+                self._counters['flushes'] += 1
+
+    def _write_rows_apart(self, rows: List[tuple], routing_rows: List[tuple], send_times: List[tuple]):
+        routing = {row[0]: row for row in routing_rows}
+        written = 0
+        for row in rows:
+            try:
+                self.db.log_conversations([row], [routing[row[0]]] if row[0] in routing else None)
+                written += 1
+            except Exception as e:
+                print(f"🗑️ Dropped conversation log {row[0]} of {row[2]} after {self.max_retries} tries: {e}")
+        if send_times:
+            try:
+                self.db.log_conversations([], None, send_times)
+            except Exception as e:
+                print(f"🗑️ Dropped {len(send_times)} send times: {e}")
+        with self._lock:
+            self._counters['written'] += written
+            self._counters['dropped'] += len(rows) - written
+            self._counters['flushes'] += 1
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                deadline = time.monotonic() + self.flush_interval
+                while self._running and len(self._rows) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._lock.wait(timeout=remaining)
+                running = self._running
+            self.flush()
+            if not running:
+                return
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the background thread after a final flush"""
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._counters)
+            metrics['queued'] = len(self._rows)
+            return metrics
+
+
+# Global log writer instance
+log_writer = None
+
+def get_log_writer():
+    global log_writer
+    if log_writer is None:
+        log_writer = ConversationLogWriter()
+        log_writer.start()
+    return log_writer
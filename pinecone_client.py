@@ -3,12 +3,14 @@
 Module to handle Pinecone with successful response examples
 """
 import os
-from pinecone import Pinecone
-from openai import OpenAI
+import threading
+import time
 from typing import List, Dict, Any, Optional
 import json
 from datetime import datetime
 from dotenv import load_dotenv
+from context_builder import Snippet
+from http_transport import get_openai_client
 
 load_dotenv()
 
@@ -21,14 +23,21 @@ class PineconeExamplesManager:
         if not all([self.api_key, self.environment, self.index_name]):
             raise ValueError("PINECONE_API_KEY, PINECONE_ENVIRONMENT and PINECONE_INDEX_NAME must be configured in .env")
         
+        # The SDK is imported here so importing this module stays cheap
+        from pinecone import Pinecone
+        
         # Initialize Pinecone (new API)
         self.pc = Pinecone(api_key=self.api_key)
         
-        # Connect to index
-        self.index = self.pc.Index(self.index_name)
+        # Connect to index (pool_threads also sizes its keep-alive connection pool)
+        self.index = self.pc.Index(self.index_name, pool_threads=int(os.environ.get("PINECONE_POOL_THREADS", "4")))
+        
+        # describe_index_stats is a network call; /stats can live with slightly old numbers
+        self.stats_ttl = float(os.environ.get("PINECONE_STATS_TTL", "60"))
+        self._stats_cache = None  # (expires_at, stats)
         
-        # OpenAI client for embeddings
-        self.openai_client = OpenAI()
+        # OpenAI client for embeddings, shared with the bot so both reuse one connection pool
+        self.openai_client = get_openai_client()
         
         print(f"✅ Connected to Pinecone index: {self.index_name}")
     
@@ -44,6 +53,33 @@ class PineconeExamplesManager:
             print(f"❌ Error creating embedding: {e}")
             return []
     
+    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Create the embeddings of several texts in one request (same order); [] on error"""
+        try:
+            response = self.openai_client.embeddings.create(
+                model="text-embedding-ada-002",
+                input=texts
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            print(f"❌ Error creating {len(texts)} embeddings: {e}")
+            return []
+    
+    def upsert_examples(self, examples: List[Dict[str, Any]]) -> bool:
+        """
+        Upsert several examples in one request
+        
+        Each example has id, values (its query embedding) and metadata; a
+        fixed id makes repeating the upsert harmless.
+        """
+        try:
+            self.index.upsert(vectors=examples)
+            print(f"✅ {len(examples)} examples upserted")
+            return True
+        except Exception as e:
+            print(f"❌ Error upserting {len(examples)} examples: {e}")
+            return False
+    
     def add_example(self, query: str, response: str, user_feedback: str = None, metadata: Dict = None) -> bool:
         """
         Add a successful response example to Pinecone
@@ -94,29 +130,35 @@ class PineconeExamplesManager:
             print(f"❌ Error adding example: {e}")
             return False
     
-    def search_similar_examples(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+    def search_similar_examples(self, query: str, top_k: int = 3, timings: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
         Search for examples similar to a query
         
         Args:
             query: The query to search for similar examples
             top_k: Maximum number of examples to return
+            timings: Optional dict that receives embedding_ms and pinecone_ms
         
         Returns:
             List of similar examples with their metadata
         """
+        timings = timings if timings is not None else {}
         try:
             # Create query embedding
+            started = time.perf_counter()
             query_embedding = self.create_embedding(query)
+            timings['embedding_ms'] = (time.perf_counter() - started) * 1000
             if not query_embedding:
                 return []
             
             # Search in Pinecone with more results to allow for reordering
+            started = time.perf_counter()
             results = self.index.query(
                 vector=query_embedding,
                 top_k=top_k * 2,  # Get more results to allow for reordering
                 include_metadata=True
             )
+            timings['pinecone_ms'] = (time.perf_counter() - started) * 1000
             
             # Process results and add recency boost
             examples = []
@@ -178,17 +220,31 @@ class PineconeExamplesManager:
         context = "\n\n📚 **Similar successful response examples:**\n"
         
         for i, example in enumerate(examples, 1):
-            # Add recency indicator
-            recency_indicator = "🆕" if example.get('recency_boost', 0) >= 0.1 else "📝"
-            context += f"\n{recency_indicator} **Example {i}** (similarity: {example['score']:.2f}):\n"
-            context += f"**Question:** {example['query']}\n"
-            context += f"**Successful response:** {example['response']}\n"
-            
-            if example['user_feedback']:
-                context += f"**User feedback:** {example['user_feedback']}\n"
+            context += "\n" + self.format_example(example, i)
         
         return context
     
+    def format_example(self, example: Dict[str, Any], number: int = None) -> str:
+        """Format one example for use as context"""
+        # Add recency indicator
+        recency_indicator = "🆕" if example.get('recency_boost', 0) >= 0.1 else "📝"
+        label = f"Example {number}" if number else "Example"
+        text = f"{recency_indicator} **{label}** (similarity: {example['score']:.2f}):\n"
+        text += f"**Question:** {example['query']}\n"
+        text += f"**Successful response:** {example['response']}\n"
+        
+        if example['user_feedback']:
+            text += f"**User feedback:** {example['user_feedback']}\n"
+        return text
+    
+    def get_context_snippets(self, examples: List[Dict[str, Any]]) -> List[Snippet]:
+        """Turn search results into context snippets scored by raw similarity"""
+        return [
+            Snippet('pinecone', "📚 **Similar successful response examples:**",
+                    self.format_example(example).rstrip(), example.get('original_score', example['score']))
+            for example in examples
+        ]
+    
     def get_all_examples(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get all stored examples (for debugging)"""
         try:
@@ -228,24 +284,33 @@ class PineconeExamplesManager:
             return False
     
     def get_index_stats(self) -> Dict[str, Any]:
-        """Get index statistics"""
+        """Get index statistics (cached for PINECONE_STATS_TTL seconds)"""
+        cached = self._stats_cache
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
         try:
             stats = self.index.describe_index_stats()
-            return {
+            result = {
                 "total_vector_count": stats.total_vector_count,
                 "dimension": stats.dimension,
                 "index_fullness": stats.index_fullness,
                 "namespaces": stats.namespaces
             }
+            self._stats_cache = (time.monotonic() + self.stats_ttl, result)
+            return result
         except Exception as e:
             print(f"❌ Error getting statistics: {e}")
             return {}
 
 # Global Pinecone manager instance
 pinecone_manager = None
+_pinecone_manager_lock = threading.Lock()
 
 def get_pinecone_manager():
     global pinecone_manager
     if pinecone_manager is None:
-        pinecone_manager = PineconeExamplesManager()
+        # Startup checks may create it from another thread
+        with _pinecone_manager_lock:
+            if pinecone_manager is None:
+                pinecone_manager = PineconeExamplesManager()
     return pinecone_manager
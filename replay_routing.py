@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Replay the routing log offline to see which lookups were wasted
+
+For every logged conversation (routing_log, see database.py) it counts the
+Airtable and Pinecone lookups made and those that ended up in the answer,
+per analyze_query category. It also re-runs the current analyze_query and
+fast path thresholds on the logged query and candidate scores. Nothing is
+called over the network, so analyzer or threshold changes can be tried
+before deploying them.
+
+The replayed airtable route only checks the match scores; the live router
+also needs the item's brand for its template, so it is an upper bound.
+
+Only the hot database is replayed: records of conversations moved out by
+log_retention.py live in their month's partition file or archive.
+
+Usage:
+    python3 replay_routing.py [--example-score S] [--airtable-score S] [--airtable-margin M]
+"""
+import argparse
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+from airtable_client import analyze_query
+from database import db
+from fast_path import FastPathRouter
+
+SOURCES = ('airtable', 'pinecone')
+
+
+def replay_route(query_type: str, candidates: List[list], router: FastPathRouter) -> str:
+    """Route the logged candidate scores would get from router (same select_candidates as live routing)"""
+    example_index, item_index = router.select_candidates(
+        query_type,
+        [score for kind, _, score in candidates if kind == 'pinecone'],
+        [score for kind, _, score in candidates if kind == 'item']
+    )
+    if example_index is not None:
+        return 'example'
+    if item_index is not None:
+        return 'airtable'
+    return 'llm'
+
+
+def replay(records: Iterable[Dict[str, Any]], router: FastPathRouter) -> Dict[str, Any]:
+    """Aggregate the routing records; see the module docstring"""
+    report = {
+        'conversations': 0,
+        'categories': {},
+        'routes': Counter(),
+        'replayed_routes': Counter(),
+        'category_changes': Counter(),
+    }
+    for record in records:
+        report['conversations'] += 1
+        sources = set(filter(None, (record['sources'] or "").split(',')))
+        used = set(filter(None, (record['used_sources'] or "").split(',')))
+        category = report['categories'].setdefault(
+            record['query_type'], {'conversations': 0, **{f"{s}_{k}": 0 for s in SOURCES for k in ('lookups', 'used')}}
+        )
+        category['conversations'] += 1
+        for source in SOURCES:
+            if source in sources:
+                category[f"{source}_lookups"] += 1
+                category[f"{source}_used"] += source in used
+
+        query_type = analyze_query(record['query'])['query_type']
+        if query_type != record['query_type']:
+            report['category_changes'][(record['query_type'], query_type)] += 1
+        report['routes'][record['route']] += 1
+        report['replayed_routes'][replay_route(query_type, json.loads(record['candidates'] or "[]"), router)] += 1
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"🔁 Replayed {report['conversations']} routed conversations")
+    print("\n📊 Lookups used in the answer, per category:")
+    for name, category in sorted(report['categories'].items(), key=lambda item: -item[1]['conversations']):
+        parts = []
+        for source in SOURCES:
+            lookups = category[f"{source}_lookups"]
+            if lookups:
+                wasted = lookups - category[f"{source}_used"]
+                parts.append(f"{source} {category[f'{source}_used']}/{lookups} ({wasted / lookups * 100:.0f}% wasted)")
+        print(f"   • {name}: {category['conversations']} conversations; {', '.join(parts) or 'no lookups'}")
+
+    print(f"\n🚦 Routes: logged {dict(report['routes'])}, replayed {dict(report['replayed_routes'])}")
+    if report['category_changes']:
+        print("\n🔍 Categories changed by the current analyze_query:")
+        for (old, new), count in report['category_changes'].most_common():
+            print(f"   • {old} -> {new}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the routing log offline")
+    parser.add_argument('--example-score', type=float, help="Example similarity for the example route")
+    parser.add_argument('--airtable-score', type=float, help="Item match score for the airtable route")
+    parser.add_argument('--airtable-margin', type=float, help="Lead over the runner-up item")
+    args = parser.parse_args()
+
+    router = FastPathRouter(enabled=True, example_threshold=args.example_score,
+                            airtable_threshold=args.airtable_score, airtable_margin=args.airtable_margin)
+    records = (record for chunk in db.iter_routing_log() for record in chunk)
+    print_report(replay(records, router))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Search past conversations and feedback, and list the most frequent questions
+
+Uses the FTS5 indexes of database.py (accents and case are ignored, every
+word must match). The frequent questions are counted incrementally: each
+run folds in the conversations logged since the previous one, so the most
+asked ones can seed Pinecone examples.
+
+Only the hot database is indexed: conversations moved to monthly partitions
+by log_retention.py leave the index and can only be found by id there.
+
+Usage:
+    python3 search_logs.py search "hot tub" [--user CHAT_ID] [--limit N]
+    python3 search_logs.py feedback "hot tub" [--limit N]
+    python3 search_logs.py frequent [--limit N] [--min-count N]
+"""
+import argparse
+from database import db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search conversation logs and feedback")
+    subparsers = parser.add_subparsers(dest='action', required=True)
+    search = subparsers.add_parser('search', help="Search conversations")
+    search.add_argument('text')
+    search.add_argument('--user', help="Only this chat id")
+    search.add_argument('--limit', type=int, default=20)
+    feedback = subparsers.add_parser('feedback', help="Search feedback")
+    feedback.add_argument('text')
+    feedback.add_argument('--limit', type=int, default=20)
+    frequent = subparsers.add_parser('frequent', help="Most frequent questions")
+    frequent.add_argument('--limit', type=int, default=20)
+    frequent.add_argument('--min-count', type=int, default=2)
+    args = parser.parse_args()
+
+    if args.action == 'search':
+        results = db.search_conversations(args.text, limit=args.limit, user_id=args.user)
+        print(f"🔎 {len(results)} conversations for '{args.text}'")
+        for result in results:
+            print(f"   • #{result['id']} {result['timestamp']} ({result['user_id']}): {result['query']}")
+            print(f"       {result['snippet']}")
+    elif args.action == 'feedback':
+        results = db.search_feedback(args.text, limit=args.limit)
+        print(f"🔎 {len(results)} feedback entries for '{args.text}'")
+        for result in results:
+            print(f"   • #{result['id']} {result['feedback_type']}: {result['original_query']}")
+            if result['feedback_text']:
+                print(f"       {result['feedback_text']}")
+    else:
+        counted = db.refresh_query_frequency()
+        print(f"📈 {counted} new conversations counted")
+        for query in db.get_frequent_queries(limit=args.limit, min_count=args.min_count):
+            print(f"   • {query['count']}x {query['example_query']} (last {query['last_seen']})")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Module to schedule outbound Telegram messages within the platform's send limits
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+# Telegram errors a retry can't fix (chat not found, bot blocked, bad token),
+# matched by class name so either python-telegram-bot version works
+PERMANENT_ERRORS = ('BadRequest', 'Unauthorized', 'Forbidden', 'InvalidToken', 'ChatMigrated')
+
+
+def is_permanent_error(error: Exception) -> bool:
+    return any(cls.__name__ in PERMANENT_ERRORS for cls in type(error).__mro__)
+
+
+def split_message(text: str, limit: int = TELEGRAM_MAX_MESSAGE_LENGTH) -> List[str]:
+    """Split text into chunks of at most limit characters, preferring line and word breaks"""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text or not parts:
+        parts.append(text)
+    return parts
+
+
+class _Outbound:
+    __slots__ = ('chat_id', 'text', 'reply_to', 'on_sent', 'enqueued_at', 'attempts')
+
+    def __init__(self, chat_id, text: str, reply_to: Optional[int], on_sent: Optional[Callable[[bool], None]]):
+        self.chat_id = chat_id
+        self.text = text
+        self.reply_to = reply_to
+        self.on_sent = on_sent
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class OutboundScheduler:
+    """
+    Sends messages through send_func(chat_id, text, reply_to_message_id).
+
+    - A global token bucket keeps the bot under Telegram's overall limit.
+    - Each chat gets at most one message per per_chat_interval, and its
+      messages leave in order even with several sender threads.
+    - A flood error carrying retry_after pauses all sending for that long
+      and the message is retried; permanent errors (BadRequest, Unauthorized,
+      Forbidden...) drop it at once; other errors are retried with backoff.
+    - Replies longer than 4096 characters are split.
+    """
+
+    def __init__(self, send_func: Callable[[Any, str, Optional[int]], Any], global_rate: float = None,
+                 per_chat_interval: float = None, senders: int = None, max_retries: int = 3):
+        self.send_func = send_func
+        self.global_rate = global_rate or float(os.environ.get("SEND_GLOBAL_RATE", "30"))
+        self.per_chat_interval = per_chat_interval if per_chat_interval is not None else float(os.environ.get("SEND_CHAT_INTERVAL", "1.0"))
+        self.senders = senders or int(os.environ.get("SEND_WORKERS", "4"))
+        self.max_retries = max_retries
+
+        self._lock = threading.Condition()
+        self._chats: Dict[Any, deque] = {}   # chat_id -> messages waiting
+        self._ready = []                     # heap of (ready_at, seq, chat_id) for idle chats with messages
+        self._seq = itertools.count()
+        self._tokens = self.global_rate
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._threads = []
+        self._running = False
+
+        # Metrics
+        self._counters = {'queued': 0, 'sent': 0, 'retried': 0, 'flood_waits': 0, 'failed': 0}
+        self._total_delay = 0.0
+        self._max_delay = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self.senders):
+            thread = threading.Thread(target=self._sender_loop, name=f"sender-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, drain: bool = True, timeout: float = 10.0):
+        """Stop the senders, optionally waiting until queued messages are sent"""
+        with self._lock:
+            if drain:
+                deadline = time.monotonic() + timeout
+                while self._chats and time.monotonic() < deadline:
+                    self._lock.wait(timeout=0.1)
+            self._running = False
+            self._lock.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    def send(self, chat_id, text: str, reply_to_message_id: int = None, on_sent: Callable[[bool], None] = None):
+        """
+        Queue a message, splitting it if it exceeds Telegram's length limit
+
+        on_sent(success) is called once the last part is delivered or dropped.
+        """
+        parts = split_message(text)
+        with self._lock:
+            queue = self._chats.get(chat_id)
+            idle = queue is None
+            if idle:
+                queue = self._chats[chat_id] = deque()
+            for i, part in enumerate(parts):
+                # Only the first part quotes the guest message; only the last reports delivery
+                queue.append(_Outbound(chat_id, part, reply_to_message_id if i == 0 else None,
+                                       on_sent if i == len(parts) - 1 else None))
+            self._counters['queued'] += len(parts)
+            if idle:
+                heapq.heappush(self._ready, (time.monotonic(), next(self._seq), chat_id))
+                self._lock.notify()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.global_rate, self._tokens + (now - self._refilled_at) * self.global_rate)
+        self._refilled_at = now
+
+    def _next_message(self) -> Optional[_Outbound]:
+        with self._lock:
+            while True:
+                if not self._running:
+                    return None
+                if not self._ready:
+                    self._lock.wait()
+                    continue
+
+                now = time.monotonic()
+                self._refill(now)
+                ready_at = self._ready[0][0]
+                wait = max(ready_at - now, self._paused_until - now, (1 - self._tokens) / self.global_rate)
+                if wait > 0:
+                    self._lock.wait(timeout=wait)
+                    continue
+
+                _, _, chat_id = heapq.heappop(self._ready)
+                self._tokens -= 1
+                # The chat stays out of the heap until this message is done, which keeps its order
+                return self._chats[chat_id][0]
+
+    def _finish(self, message: _Outbound, delivered: bool, retry_at: float = None):
+        with self._lock:
+            now = time.monotonic()
+            queue = self._chats[message.chat_id]
+            if retry_at is None:
+                queue.popleft()
+                if delivered:
+                    delay = now - message.enqueued_at
+                    self._total_delay += delay
+                    self._max_delay = max(self._max_delay, delay)
+            if queue:
+                next_at = retry_at if retry_at is not None else now + self.per_chat_interval
+                heapq.heappush(self._ready, (next_at, next(self._seq), message.chat_id))
+            else:
+                del self._chats[message.chat_id]
+            self._lock.notify_all()
+
+    def _sender_loop(self):
+        while True:
+            message = self._next_message()
+            if message is None:
+                return
+
+            message.attempts += 1
+            try:
+                self.send_func(message.chat_id, message.text, message.reply_to)
+            except Exception as e:
+                retry_after = getattr(e, 'retry_after', None)
+                if retry_after is not None:
+                    # Flood control: hold every sender back, then retry this message first
+                    retry_after = float(getattr(retry_after, 'total_seconds', lambda: retry_after)())
+                    with self._lock:
+                        self._counters['flood_waits'] += 1
+                        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                    print(f"⏳ Flood control: pausing sends for {retry_after:.1f}s")
+                    self._finish(message, False, retry_at=time.monotonic())
+                    continue
+                if message.attempts <= self.max_retries and not is_permanent_error(e):
+                    with self._lock:
+                        self._counters['retried'] += 1
+                    self._finish(message, False, retry_at=time.monotonic() + message.attempts)
+                    continue
+
+                print(f"❌ Error sending message to {message.chat_id}: {e}")
+                with self._lock:
+                    self._counters['failed'] += 1
+                self._finish(message, False)
+                self._notify(message, False)
+                continue
+
+            with self._lock:
+                self._counters['sent'] += 1
+            self._finish(message, True)
+            self._notify(message, True)
+
+    def _notify(self, message: _Outbound, delivered: bool):
+        if message.on_sent:
+            try:
+                message.on_sent(delivered)
+            except Exception as e:
+                print(f"❌ Error in send callback for {message.chat_id}: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            metrics = dict(self._counters)
+            metrics['queue_depth'] = sum(len(queue) for queue in self._chats.values())
+            metrics['avg_delay'] = (self._total_delay / self._counters['sent']) if self._counters['sent'] else 0.0
+            metrics['max_delay'] = self._max_delay
+            metrics['paused_for'] = max(0.0, self._paused_until - now)
+            return metrics
@@ -2,9 +2,9 @@
 """
 Script to configure bot commands with BotFather
 """
-import requests
 from dotenv import load_dotenv
 import os
+from http_transport import get_requests_session
 
 def setup_bot_commands():
     load_dotenv()
@@ -45,7 +45,7 @@ def setup_bot_commands():
     
     try:
         print("🤖 Configuring bot commands...")
-        response = requests.post(url, json=data)
+        response = get_requests_session().post(url, json=data)
         
         if response.status_code == 200:
             result = response.json()
@@ -75,7 +75,7 @@ def get_bot_info():
     url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getMe"
     
     try:
-        response = requests.get(url)
+        response = get_requests_session().get(url)
         if response.status_code == 200:
             result = response.json()
             if result.get("ok"):
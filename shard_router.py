@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Front process that shards chats across several bot worker processes
+
+Each worker runs the bot_pinecone pipeline for the chats it owns; chats are
+assigned by consistent hashing of chat_id so adding a worker only moves a
+fraction of them. Thread mappings and user states live in the shared state
+store (STATE_BACKEND, SQLite by default here) so any worker can take over a
+chat after a resize.
+
+Usage:
+    SHARD_WORKERS=4 python3 shard_router.py
+"""
+import bisect
+import hashlib
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Optional
+import requests
+from dotenv import load_dotenv
+from http_transport import get_requests_session
+
+# Load environment variables
+load_dotenv()
+
+# Workers share per-chat state through SQLite unless another backend is configured
+os.environ.setdefault("STATE_BACKEND", "sqlite")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, nodes: List[int], replicas: int = 100):
+        self.replicas = replicas
+        self._keys = []
+        self._nodes = {}
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+    def add_node(self, node: int):
+        for i in range(self.replicas):
+            h = self._hash(f"{node}:{i}")
+            bisect.insort(self._keys, h)
+            self._nodes[h] = node
+
+    def get_node(self, key: str) -> int:
+        h = self._hash(key)
+        index = bisect.bisect(self._keys, h) % len(self._keys)
+        return self._nodes[self._keys[index]]
+
+
+def extract_chat_id(update: Dict[str, Any]) -> Optional[str]:
+    """Find the chat (or, failing that, the user) an update belongs to"""
+    for field in ('message', 'edited_message', 'channel_post', 'edited_channel_post', 'my_chat_member', 'chat_member'):
+        if field in update and 'chat' in update[field]:
+            return str(update[field]['chat']['id'])
+    callback = update.get('callback_query')
+    if callback and callback.get('message'):
+        return str(callback['message']['chat']['id'])
+    for value in update.values():
+        if isinstance(value, dict) and 'from' in value:
+            return str(value['from']['id'])
+    return None
+
+
+def _worker_main(shard_id: int, updates, shards: int):
+    # Imported here so the router process never loads the bot's SDKs
+    from bot_pinecone import run_shard_worker
+    run_shard_worker(shard_id, updates, shards)
+
+
+class ShardRouter:
+    def __init__(self, workers: int = None, queue_size: int = None):
+        self.workers = workers or int(os.environ.get("SHARD_WORKERS", "2"))
+        self.queue_size = queue_size or int(os.environ.get("SHARD_QUEUE_SIZE", "1000"))
+        self.ring = HashRing(list(range(self.workers)))
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues = [self._ctx.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self._processes = [None] * self.workers
+        self._routed = [0] * self.workers
+
+    def _spawn(self, shard_id: int):
+        process = self._ctx.Process(target=_worker_main, args=(shard_id, self._queues[shard_id], self.workers),
+                                    name=f"shard-{shard_id}", daemon=False)
+        process.start()
+        self._processes[shard_id] = process
+
+    def start(self):
+        for shard_id in range(self.workers):
+            self._spawn(shard_id)
+        print(f"✅ Started {self.workers} shard workers")
+
+    def route(self, update: Dict[str, Any]):
+        """Send a raw update to the worker that owns its chat"""
+        chat_id = extract_chat_id(update)
+        shard_id = self.ring.get_node(chat_id) if chat_id else 0
+
+        process = self._processes[shard_id]
+        if not process.is_alive():
+            print(f"⚠️ Shard worker {shard_id} died (exit code {process.exitcode}), restarting")
+            self._spawn(shard_id)
+
+        # Blocks when the shard is saturated, pushing back on the ingress
+        self._queues[shard_id].put(update)
+        self._routed[shard_id] += 1
+
+    def stop(self, timeout: float = 30.0):
+        for queue in self._queues:
+            queue.put(None)
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        print(f"🛑 Shard workers stopped (routed per shard: {self._routed})")
+
+
+def poll_updates(token: str, router: ShardRouter):
+    """Long-poll getUpdates and route the raw JSON, without decoding it into objects"""
+    api = f"https://api.telegram.org/bot{token}"
+    session = get_requests_session()
+    session.post(f"{api}/deleteWebhook")
+    offset = None
+    while True:
+        try:
+            response = session.get(f"{api}/getUpdates", params={'offset': offset, 'timeout': 30}, timeout=40)
+            updates = response.json().get('result', [])
+        except (requests.RequestException, ValueError) as e:
+            # ValueError: a non-JSON reply, e.g. a proxy's 502 page
+            print(f"❌ Error polling updates: {e}")
+            time.sleep(1)
+            continue
+        for update in updates:
+            offset = update['update_id'] + 1
+            router.route(update)
+
+
+def main():
+    token = os.environ["TELEGRAM_TOKEN"]
+    router = ShardRouter()
+    print(f"🤖 Starting shard router ({router.workers} workers, state backend: {os.environ['STATE_BACKEND']})...")
+    router.start()
+
+    server = None
+
+    def shutdown(signum, frame):
+        print("\n🛑 Stopping shard router...")
+        if server:
+            server.stop()
+        router.stop()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    if os.environ.get("BOT_MODE", "polling") == "webhook":
+        from webhook_server import WebhookServer
+        server = WebhookServer(on_update=router.route)
+        server.start()
+        get_requests_session().post(f"https://api.telegram.org/bot{token}/setWebhook",
+                      json={'url': os.environ["WEBHOOK_URL"], 'secret_token': server.secret})
+        print(f"🌐 Webhook registered: {os.environ['WEBHOOK_URL']}")
+        signal.pause()
+    else:
+        poll_updates(token, router)
+
+
+if __name__ == "__main__":
+    main()
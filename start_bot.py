@@ -5,7 +5,7 @@ Script de inicio para el bot de Telegram
 import asyncio
 import signal
 import sys
-from openai import OpenAI
+from openai import AsyncOpenAI
 from telegram.ext import Application, MessageHandler, filters
 import os
 from dotenv import load_dotenv
@@ -18,7 +18,7 @@ OPENAI_KEY = os.environ["OPENAI_API_KEY"]
 TELEGRAM_TOKEN = os.environ["TELEGRAM_TOKEN"]
 ASSISTANT_ID = os.environ["ASSISTANT_ID"]
 
-client = OpenAI()
+client = AsyncOpenAI()
 threads = {}  # chat_id -> thread_id (en memoria; luego usa Redis/DB)
 
 async def handle_msg(update, context):
@@ -30,25 +30,24 @@ async def handle_msg(update, context):
 
         # 1) thread por chat
         if chat_id not in threads:
-            t = client.beta.threads.create()
+            t = await client.beta.threads.create()
             threads[chat_id] = t.id
         thread_id = threads[chat_id]
 
         # 2) mensaje del usuario
-        client.beta.threads.messages.create(thread_id=thread_id, role="user", content=text)
+        await client.beta.threads.messages.create(thread_id=thread_id, role="user", content=text)
 
         # 3) run del Assistant
-        run = client.beta.threads.runs.create(thread_id=thread_id, assistant_id=ASSISTANT_ID)
+        run = await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=ASSISTANT_ID)
 
         # 4) poll básico
-        import time
         while True:
-            r = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+            r = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
             if r.status in ["completed","failed","requires_action"]: break
-            time.sleep(0.7)
+            await asyncio.sleep(0.7)
 
         # 5) última respuesta
-        msgs = client.beta.threads.messages.list(thread_id=thread_id, order="desc")
+        msgs = await client.beta.threads.messages.list(thread_id=thread_id, order="desc")
         reply = msgs.data[0].content[0].text.value
         await update.message.reply_text(reply)
         
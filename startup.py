@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Module to run the bot's startup health checks concurrently with per-check timeouts
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class _Check:
+    __slots__ = ('name', 'func', 'required', 'timeout', 'status', 'elapsed', 'error', 'done')
+
+    def __init__(self, name: str, func: Callable[[], Any], required: bool, timeout: float):
+        self.name = name
+        self.func = func
+        self.required = required
+        self.timeout = timeout
+        self.status = 'pending'  # pending | ok | failed | timeout
+        self.elapsed = 0.0
+        self.error = None
+        self.done = threading.Event()
+
+
+class StartupChecks:
+    """
+    Runs every dependency check at once, each on its own thread.
+
+    run() waits for each check up to its timeout, so startup takes as long as
+    the slowest check instead of the sum of all of them. A required check
+    that fails or times out aborts startup. An optional one leaves its backend
+    degraded: callers skip it (is_ready() is False) until the check finishes
+    late or succeeds on a background retry every retry_interval seconds.
+    """
+
+    def __init__(self, timeout: float = None, retry_interval: float = None):
+        self.timeout = timeout or float(os.environ.get("STARTUP_CHECK_TIMEOUT", "5"))
+        self.retry_interval = retry_interval or float(os.environ.get("STARTUP_RETRY_INTERVAL", "30"))
+        self._checks: Dict[str, _Check] = {}
+        self._phases: List[tuple] = []
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._last_phase_at = self._started_at
+        self._checks_started_at = self._started_at
+
+    def add(self, name: str, func: Callable[[], Any], required: bool = False, timeout: float = None):
+        """Register a check; func raises or returns False when the dependency is unusable"""
+        self._checks[name] = _Check(name, func, required, timeout or self.timeout)
+
+    def phase(self, name: str, since: float = None):
+        """Record a phase of the timing breakdown, lasting from since (or the previous phase) until now"""
+        now = time.monotonic()
+        since = self._last_phase_at if since is None else since
+        self._phases.append((name, now - since))
+        self._started_at = min(self._started_at, since)
+        self._last_phase_at = now
+
+    def _attempt(self, check: _Check) -> bool:
+        started = time.monotonic()
+        try:
+            ok = check.func() is not False
+            check.error = None if ok else "check returned False"
+        except Exception as e:
+            ok = False
+            check.error = str(e)
+        check.elapsed = time.monotonic() - started
+        return ok
+
+    def _run_check(self, check: _Check):
+        while True:
+            ok = self._attempt(check)
+            with self._lock:
+                previous = check.status
+                check.status = 'ok' if ok else 'failed'
+                check.done.set()
+            if previous == 'timeout' or (ok and previous == 'failed'):
+                print(f"{'✅' if ok else '⚠️'} {check.name} check finished late: {check.status} ({check.elapsed:.2f}s)")
+            if ok or check.required:
+                return
+            # Optional backends keep retrying in the background
+            time.sleep(self.retry_interval)
+
+    def start(self):
+        """Start every check without waiting, so other startup work can overlap them"""
+        self._checks_started_at = time.monotonic()
+        for check in self._checks.values():
+            threading.Thread(target=self._run_check, args=(check,), name=f"startup-{check.name}", daemon=True).start()
+
+    def wait(self) -> bool:
+        """Wait for the checks; False means a required check failed"""
+        ok = True
+        for check in self._checks.values():
+            remaining = check.timeout - (time.monotonic() - self._checks_started_at)
+            if not check.done.wait(timeout=max(0.0, remaining)):
+                with self._lock:
+                    if not check.done.is_set():
+                        check.status = 'timeout'
+                        check.elapsed = check.timeout
+            if check.required and check.status != 'ok':
+                ok = False
+        self.phase('checks')
+        return ok
+
+    def run(self) -> bool:
+        self.start()
+        return self.wait()
+
+    def is_ready(self, name: str) -> bool:
+        check = self._checks.get(name)
+        return check is None or check.status == 'ok'
+
+    def degraded(self) -> List[str]:
+        return [check.name for check in self._checks.values() if check.status != 'ok']
+
+    def print_report(self):
+        """Print the per-check results and the startup timing breakdown"""
+        print("⏱️ Startup checks:")
+        for check in self._checks.values():
+            emoji = {'ok': '✅', 'timeout': '⏳'}.get(check.status, '❌')
+            kind = "required" if check.required else "optional"
+            line = f"   {emoji} {check.name} ({kind}): {check.status} in {check.elapsed:.2f}s"
+            if check.error:
+                line += f" - {check.error}"
+            print(line)
+
+        breakdown = ", ".join(f"{name} {duration:.2f}s" for name, duration in self._phases)
+        print(f"⏱️ Startup took {self._last_phase_at - self._started_at:.2f}s ({breakdown})")
+
+        degraded = self.degraded()
+        if degraded:
+            print(f"⚠️ Running in degraded mode without: {', '.join(degraded)}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {name: {'status': check.status, 'elapsed': check.elapsed, 'required': check.required}
+                for name, check in self._checks.items()}
+
+
+# Global startup checks instance
+startup_checks = None
+
+def get_startup_checks():
+    global startup_checks
+    if startup_checks is None:
+        startup_checks = StartupChecks()
+    return startup_checks
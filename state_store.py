@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Module to keep per-chat bot state (Assistant threads, user states) outside process memory
+"""
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+
+class StateStore(ABC):
+    """
+    Per-chat state shared by every bot process.
+
+    Backends implement the four methods below; register new ones with
+    register_backend() and select them with STATE_BACKEND.
+    """
+
+    @abstractmethod
+    def get_thread(self, chat_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set_thread(self, chat_id: str, thread_id: str):
+        ...
+
+    @abstractmethod
+    def get_user_state(self, chat_id: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def update_user_state(self, chat_id: str, **fields) -> Dict[str, Any]:
+        """Merge fields into the chat's state and return the new state"""
+
+
+class MemoryStateStore(StateStore):
+    """Process-local backend, enough for a single bot process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._threads = {}
+        self._states = {}
+
+    def get_thread(self, chat_id: str) -> Optional[str]:
+        return self._threads.get(chat_id)
+
+    def set_thread(self, chat_id: str, thread_id: str):
+        self._threads[chat_id] = thread_id
+
+    def get_user_state(self, chat_id: str) -> Dict[str, Any]:
+        return dict(self._states.get(chat_id, {}))
+
+    def update_user_state(self, chat_id: str, **fields) -> Dict[str, Any]:
+        with self._lock:
+            state = self._states.setdefault(chat_id, {})
+            state.update(fields)
+            return dict(state)
+
+
+class SQLiteStateStore(StateStore):
+    """SQLite backend in WAL mode, shared by the worker processes of one machine"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.environ.get("STATE_DB_PATH", "state.db")
+        self._local = threading.local()
+        self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; multi-statement updates use explicit transactions
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def init_database(self):
+        """Initialize database with necessary tables"""
+        conn = self._connect()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS chat_threads (
+                    chat_id TEXT PRIMARY KEY,
+                    thread_id TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS chat_states (
+                    chat_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL, -- JSON object
+                    updated_at REAL NOT NULL
+                )
+            ''')
+
+    def get_thread(self, chat_id: str) -> Optional[str]:
+        row = self._connect().execute(
+            'SELECT thread_id FROM chat_threads WHERE chat_id = ?', (chat_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_thread(self, chat_id: str, thread_id: str):
+        self._connect().execute('''
+            INSERT INTO chat_threads (chat_id, thread_id, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET thread_id = excluded.thread_id, updated_at = excluded.updated_at
+        ''', (chat_id, thread_id, time.time()))
+
+    def get_user_state(self, chat_id: str) -> Dict[str, Any]:
+        row = self._connect().execute(
+            'SELECT state FROM chat_states WHERE chat_id = ?', (chat_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def update_user_state(self, chat_id: str, **fields) -> Dict[str, Any]:
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front so the read-modify-write is atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute('SELECT state FROM chat_states WHERE chat_id = ?', (chat_id,)).fetchone()
+            state = json.loads(row[0]) if row else {}
+            state.update(fields)
+            conn.execute('''
+                INSERT INTO chat_states (chat_id, state, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(chat_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at
+            ''', (chat_id, json.dumps(state), time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return state
+
+
+_backends: Dict[str, Callable[[], StateStore]] = {
+    'memory': MemoryStateStore,
+    'sqlite': SQLiteStateStore,
+}
+
+def register_backend(name: str, factory: Callable[[], StateStore]):
+    """Make a new backend selectable through STATE_BACKEND"""
+    if inspect.isclass(factory) and inspect.isabstract(factory):
+        missing = ", ".join(sorted(factory.__abstractmethods__))
+        raise TypeError(f"State backend '{name}' does not implement: {missing}")
+    _backends[name] = factory
+
+# Global state store instance
+state_store = None
+
+def get_state_store():
+    global state_store
+    if state_store is None:
+        backend = os.environ.get("STATE_BACKEND", "memory")
+        if backend not in _backends:
+            raise ValueError(f"Unknown STATE_BACKEND '{backend}' (available: {', '.join(_backends)})")
+        state_store = _backends[backend]()
+    return state_store
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar el control de admisión
+"""
+import time
+from admission import AdmissionController, BUSY_MESSAGE
+
+def test_admission():
+    print("🧪 Probando control de admisión...")
+
+    controller = AdmissionController(max_in_flight=2, max_queue_age=0.1)
+
+    # Test 1: Límite de mensajes en curso
+    print("\n1. Probando límite de mensajes en curso...")
+    assert controller.try_admit()
+    assert controller.try_admit()
+    assert not controller.try_admit()
+    controller.release()
+    assert controller.try_admit()
+    print("✅ Límite respetado")
+
+    # Test 2: Antigüedad máxima en cola
+    print("\n2. Probando antigüedad en cola...")
+    assert not controller.is_expired(time.monotonic())
+    assert controller.is_expired(time.monotonic() - 1)
+    print("✅ Mensajes viejos descartados")
+
+    # Test 3: Respuesta de reserva
+    print("\n3. Probando respuesta de reserva...")
+    controller.remember_answer("chat_1", "Is the pool heated?", "Yes, it's heated to 28°C.")
+    assert controller.fallback("chat_1", "is the pool heated") == "Yes, it's heated to 28°C."
+    assert controller.fallback("chat_1", "wifi password?") == BUSY_MESSAGE
+    # Same normalization as the search index: accents and punctuation don't matter
+    controller.remember_answer("chat_1", "¿Dónde está el jacuzzi?", "In the patio.")
+    assert controller.fallback("chat_1", "donde esta el jacuzzi") == "In the patio."
+    # Answers can depend on the guest's booking: never served to another chat
+    assert controller.fallback("chat_2", "is the pool heated") == BUSY_MESSAGE
+    print("✅ Respuesta cacheada o mensaje de ocupado")
+
+    metrics = controller.get_metrics()
+    assert metrics['shed'] == 2 and metrics['served_cached'] == 2, metrics
+    print(f"\n📊 Métricas: {metrics}")
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_admission()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar la caché acotada de estado por chat
+"""
+import os
+import tempfile
+import time
+from chat_state import ChatStateStore, MODE_NORMAL, MODE_WAITING_FEEDBACK
+from state_store import SQLiteStateStore
+
+def test_chat_state():
+    print("🧪 Probando estado por chat...")
+
+    # Test 1: Estado tipado y última conversación
+    print("\n1. Probando estado y última conversación...")
+    store = ChatStateStore(max_chats=2, ttl=0.1)
+    assert store.get("chat_a").mode == MODE_NORMAL
+    assert store.last_conversation("chat_a") is None
+    store.set_last_conversation("chat_a", 7, "Where is the fridge?", "In the kitchen.")
+    store.set_mode("chat_a", MODE_WAITING_FEEDBACK)
+    assert store.last_conversation("chat_a") == {'id': 7, 'query': "Where is the fridge?", 'response': "In the kitchen."}
+    assert store.get("chat_a").mode == MODE_WAITING_FEEDBACK
+    print("✅ Estado guardado sin consultar la base de datos")
+
+    # Test 2: Límite LRU
+    print("\n2. Probando límite LRU...")
+    store.get("chat_b")
+    store.get("chat_a")
+    store.get("chat_c")  # chat_b es el menos reciente
+    metrics = store.get_metrics()
+    assert metrics['chats'] == 2 and metrics['evicted'] == 1, metrics
+    assert store.get("chat_a").last_conversation_id == 7
+    print(f"✅ Métricas: {metrics}")
+
+    # Test 3: Expiración por inactividad
+    print("\n3. Probando TTL...")
+    time.sleep(0.15)
+    assert store.get("chat_a").mode == MODE_NORMAL
+    assert store.get_metrics()['expired'] == 1
+    print("✅ Chat inactivo descartado")
+
+    # Test 4: El hilo sobrevive a la expulsión sin backend
+    print("\n4. Probando hilos sin backend...")
+    store = ChatStateStore(max_chats=1, ttl=0.1)
+    store.set_thread("chat_a", "thread_1")
+    store.set_mode("chat_a", MODE_WAITING_FEEDBACK)
+    store.get("chat_b")  # expulsa chat_a de la caché
+    record = store.get("chat_a")
+    assert (record.mode, record.thread_id) == (MODE_NORMAL, "thread_1")
+    time.sleep(0.15)
+    assert store.get("chat_a").thread_id == "thread_1"
+    assert store.get_metrics()['evicted'] >= 1 and store.get_metrics()['expired'] == 1
+    store.set_thread("chat_b", "thread_2")  # los hilos también están acotados
+    metrics = store.get_metrics()
+    assert metrics['threads'] == 1 and metrics['threads_evicted'] == 1, metrics
+    print("✅ Hilo conservado tras la expulsión y el TTL, con memoria acotada")
+
+    # Test 5: Escritura directa al backend compartido
+    print("\n5. Probando backend SQLite...")
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteStateStore(os.path.join(tmp, "state.db"))
+        store = ChatStateStore(backend=backend, max_chats=1)
+        store.set_thread("chat_a", "thread_1")
+        store.set_mode("chat_a", MODE_WAITING_FEEDBACK)
+        store.set_last_conversation("chat_a", 9, "Wifi?", "Network: casa")
+        store.get("chat_b")  # expulsa chat_a de la caché
+
+        record = store.get("chat_a")
+        assert (record.mode, record.thread_id, record.last_conversation_id) == (MODE_WAITING_FEEDBACK, "thread_1", 9)
+        assert store.last_conversation("chat_a") is None  # el texto solo vive en memoria
+    print("✅ Estado recuperado del backend tras la expulsión")
+
+    # Test 6: El feedback se asocia a la conversación mostrada por /feedback
+    print("\n6. Probando conversación del feedback...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ChatStateStore(backend=SQLiteStateStore(os.path.join(tmp, "state.db")), max_chats=1)
+        store.set_last_conversation("chat_a", 10, "Wifi?", "Network: casa")
+        store.request_feedback("chat_a", store.last_conversation("chat_a"))
+        store.set_last_conversation("chat_a", 11, "Parking?", "In the garage")  # respondida mientras tanto
+        store.get("chat_b")  # expulsa chat_a de la caché
+        assert store.get("chat_a").mode == MODE_WAITING_FEEDBACK
+        assert store.feedback_conversation("chat_a") == {'id': 10, 'query': "Wifi?", 'response': "Network: casa"}
+        store.set_mode("chat_a", MODE_NORMAL)
+        assert store.feedback_conversation("chat_a") is None
+    print("✅ Feedback asociado a la conversación mostrada")
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_chat_state()
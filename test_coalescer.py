@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar la ventana de agrupación de mensajes
+"""
+import time
+from coalescer import MessageCoalescer
+
+def test_coalescer():
+    print("🧪 Probando agrupación de mensajes...")
+
+    flushed = []
+    coalescer = MessageCoalescer(on_flush=lambda chat_id, items: flushed.append((chat_id, items)), window=0.1)
+    coalescer.start()
+
+    # Test 1: Mensajes seguidos del mismo chat se agrupan
+    print("\n1. Probando mensajes seguidos...")
+    for text in ["hi", "question about the pool", "is it heated?"]:
+        coalescer.add("chat_a", text)
+        time.sleep(0.02)
+    coalescer.add("chat_b", "wifi password?")
+
+    time.sleep(0.3)
+    assert ("chat_a", ["hi", "question about the pool", "is it heated?"]) in flushed, flushed
+    assert ("chat_b", ["wifi password?"]) in flushed, flushed
+    print(f"✅ Lotes enviados: {flushed}")
+
+    # Test 2: Mensajes separados por más que la ventana no se agrupan
+    print("\n2. Probando mensajes separados...")
+    flushed.clear()
+    coalescer.add("chat_a", "first")
+    time.sleep(0.25)
+    coalescer.add("chat_a", "second")
+    coalescer.stop(flush=True)
+    assert flushed == [("chat_a", ["first"]), ("chat_a", ["second"])], flushed
+    print(f"✅ Lotes enviados: {flushed}")
+
+    print(f"\n📊 Métricas: {coalescer.get_metrics()}")
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_coalescer()
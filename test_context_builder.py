@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar el armado de contexto con presupuesto de tokens
+"""
+from context_builder import ContextBuilder, Snippet, count_tokens
+
+def test_context_builder():
+    print("🧪 Probando armado de contexto...")
+
+    items = "📦 **Items found:**"
+    examples = "📚 **Similar successful response examples:**"
+    snippets = [
+        Snippet('airtable', items, "• **Refrigerator** (Brand: Samsung) (Model: RF28)", 0.5),
+        Snippet('airtable', items, "• **Toaster** (Brand: Oster)", 0.25),
+        Snippet('pinecone', examples, "📝 **Example** (similarity: 0.91):\n**Question:** What brand is the refrigerator?\n"
+                                      "**Successful response:** The refrigerator is a Samsung RF28.", 0.91),
+        Snippet('pinecone', examples, "📝 **Example** (similarity: 0.91):\n**Question:** What brand is the refrigerator?\n"
+                                      "**Successful response:** The refrigerator is a Samsung RF28.", 0.90),
+        Snippet('airtable', items, "• **Washer** " + "very long description " * 200, 0.3),
+    ]
+
+    # Test 1: Presupuesto, orden y duplicados
+    print("\n1. Probando presupuesto...")
+    builder = ContextBuilder(max_tokens=200)
+    context, stats = builder.build(snippets)
+    assert stats['tokens'] <= 200, stats
+    assert count_tokens(context) <= 200, count_tokens(context)
+    # The Airtable fridge line is already covered by the example
+    assert stats['duplicates'] == 2, stats
+    assert stats['truncated'] == 1, stats
+    assert context.startswith(examples), context
+    assert "**Refrigerator**" not in context and "Toaster" not in context, context
+    print(f"✅ Contexto ({stats['tokens']} tokens): {stats}")
+
+    # Test 2: Sin fragmentos no hay contexto
+    print("\n2. Probando contexto vacío...")
+    context, stats = builder.build([])
+    assert context == "" and stats['packed'] == 0
+    print("✅ Contexto vacío")
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_context_builder()
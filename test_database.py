@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar las conexiones persistentes de la base de datos
+"""
+import os
+import tempfile
+import threading
+from database import DatabaseManager, MIGRATIONS, TELEMETRY_COLUMNS
+
+def test_connections():
+    print("🧪 Probando conexiones SQLite...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "feedback.db"))
+
+        # Test 1: Modo WAL y conexión reutilizada en el mismo hilo
+        print("\n1. Probando configuración de la conexión...")
+        conn = db._connect()
+        assert conn is db._connect()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        print("✅ WAL + synchronous=NORMAL")
+
+        # Test 2: Escrituras concurrentes desde varios hilos
+        print("\n2. Probando escrituras concurrentes...")
+        ids = []
+        lock = threading.Lock()
+
+        def writer(n):
+            for i in range(50):
+                conv_id = db.log_conversation(f"user_{n}", f"query {i}", f"response {i}")
+                with lock:
+                    ids.append(conv_id)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(set(ids)) == 200
+        assert db.get_feedback_stats()['total_conversations'] == 200
+        print(f"✅ 200 conversaciones desde 4 hilos con {len(db._connections)} conexiones")
+
+        db.close()
+        assert db._connections == []
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+def test_indexes():
+    print("🧪 Probando índices y migraciones...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "feedback.db")
+        db = DatabaseManager(path)
+        conn = db._connect()
+
+        # Test 1: Migraciones aplicadas una sola vez
+        print("\n1. Probando migraciones...")
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+        DatabaseManager(path).close()  # reabrir no vuelve a migrar
+        print(f"✅ Esquema en la versión {len(MIGRATIONS)}")
+
+        # Test 2: Las búsquedas usan los índices
+        print("\n2. Probando planes de consulta...")
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM conversation_logs WHERE user_id = ? ORDER BY id DESC LIMIT 1",
+                            ("user_1",)).fetchall()
+        assert "idx_conversation_logs_user" in plan[0][3], plan
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM feedback WHERE processed = FALSE ORDER BY id DESC").fetchall()
+        assert "idx_feedback_unprocessed" in plan[0][3], plan
+        print("✅ Sin recorridos completos")
+
+        # Test 3: La última conversación no depende de la resolución del timestamp
+        print("\n3. Probando última conversación...")
+        for i in range(5):
+            db.log_conversation("user_1", f"query {i}", f"response {i}")
+        assert db.get_last_conversation("user_1")['query'] == "query 4"
+        print("✅ Última conversación correcta")
+
+        db.close()
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+def test_stats():
+    print("🧪 Probando estadísticas materializadas...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "feedback.db")
+
+        # Base con datos anteriores a los contadores (versión 1 del esquema)
+        db = DatabaseManager(path)
+        conn = db._connect()
+        conn.executescript("""
+            DROP TRIGGER stats_conversation_insert;
+            DROP TRIGGER stats_conversation_feedback;
+            DROP TRIGGER stats_feedback_insert;
+            DROP TABLE stats_counters;
+            DROP TABLE daily_stats;
+            PRAGMA user_version = 1;
+        """)
+        # Columns added by later migrations, which will run again
+        for column in ('used_pinecone',) + TELEMETRY_COLUMNS:
+            conn.execute(f"ALTER TABLE conversation_logs DROP COLUMN {column}")
+        first = conn.execute(
+            "INSERT INTO conversation_logs (user_id, query, response, used_rag) VALUES ('user_1', 'old query', 'old response', TRUE)"
+        ).lastrowid
+        conn.commit()
+        db.close()
+
+        # Test 1: La migración cuenta las filas existentes
+        print("\n1. Probando migración de contadores...")
+        db = DatabaseManager(path)
+        db.stats_ttl = 0
+        assert db.get_feedback_stats()['total_conversations'] == 1
+        print("✅ Contadores inicializados")
+
+        # Test 2: Los triggers mantienen los contadores
+        print("\n2. Probando triggers...")
+        second = db.log_conversation("user_2", "query", "response", response_time=2.0, used_airtable=True)
+        db.add_feedback("user_1", "old query", "old response", "example_response", "better", conversation_id=first)
+        db.add_feedback("user_1", "old query", "old response", "positive", conversation_id=first)
+        db.add_feedback("user_2", "query", "response", "negative", conversation_id=second)
+        stats = db.get_feedback_stats()
+        assert stats['total_conversations'] == 2
+        assert stats['conversations_with_feedback'] == 2
+        assert stats['feedback_types'] == {'example_response': 1, 'positive': 1, 'negative': 1}, stats
+        print(f"✅ Estadísticas: {stats}")
+
+        # Test 3: Resumen diario
+        print("\n3. Probando resumen diario...")
+        days = db.get_daily_stats(days=7)
+        assert len(days) == 1, days
+        assert days[0]['conversations'] == 2 and days[0]['feedback'] == 3
+        assert days[0]['used_rag'] == 1 and days[0]['used_airtable'] == 1
+        print(f"✅ Hoy: {days[0]}")
+
+        db.close()
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+def test_search():
+    print("🧪 Probando búsqueda de texto completo...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "feedback.db"))
+        db.log_conversation("user_1", "¿Dónde está el jacuzzi?", "El jacuzzi está en el patio, junto a la piscina.")
+        db.log_conversation("user_2", "donde esta el JACUZZI", "En el patio.")
+        db.log_conversation("user_2", "What is the wifi password?", "It is on the fridge.")
+        db.add_feedback("user_3", "hot tub?", "No idea", "example_response", "The hot tub is in the garden")
+
+        # Test 1: Búsqueda sin acentos ni mayúsculas, con filtro por usuario
+        print("\n1. Probando búsqueda...")
+        results = db.search_conversations("jacuzzi DÓNDE")
+        assert [r['id'] for r in results] and {r['user_id'] for r in results} == {'user_1', 'user_2'}, results
+        assert [r['user_id'] for r in db.search_conversations("jacuzzi", user_id="user_2")] == ['user_2']
+        assert db.search_conversations("sauna") == [] and db.search_conversations("¿?") == []
+        assert db.search_conversations('wifi* (password') != []  # FTS5 syntax is quoted, not parsed
+        assert [f['feedback_text'] for f in db.search_feedback("garden")] == ["The hot tub is in the garden"]
+        print(f"✅ {len(results)} resultados: {results[0]['snippet']}")
+
+        # Test 2: Los triggers mantienen el índice al borrar
+        print("\n2. Probando sincronización del índice...")
+        with db._connect() as conn:
+            conn.execute("DELETE FROM conversation_logs WHERE user_id = 'user_1'")
+        assert [r['user_id'] for r in db.search_conversations("jacuzzi")] == ['user_2']
+        print("✅ Índice sincronizado")
+
+        # Test 3: Consultas frecuentes normalizadas, de forma incremental
+        print("\n3. Probando consultas frecuentes...")
+        assert db.refresh_query_frequency() == 0  # still too recent
+        assert db.refresh_query_frequency(lag=-60) == 2
+        db.log_conversation("user_4", "¿Dónde está el jacuzzi?", "En el patio.")
+        assert db.refresh_query_frequency(lag=-60) == 1
+        frequent = db.get_frequent_queries()
+        assert frequent == [{
+            'normalized': 'donde esta el jacuzzi', 'example_query': '¿Dónde está el jacuzzi?', 'count': 2,
+            'first_seen': frequent[0]['first_seen'], 'last_seen': frequent[0]['last_seen'], 'last_conversation_id': 4
+        }], frequent
+        print(f"✅ Frecuentes: {frequent}")
+
+        db.close()
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_connections()
+    test_indexes()
+    test_stats()
+    test_search()
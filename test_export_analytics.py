@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar la exportación incremental para analítica
+"""
+import gzip
+import json
+import os
+import tempfile
+from database import DatabaseManager
+from export_analytics import AnalyticsExporter
+
+def read_export(directory):
+    rows = []
+    for name in sorted(os.listdir(directory)):
+        with gzip.open(os.path.join(directory, name), 'rt') as f:
+            rows.extend(json.loads(line) for line in f)
+    return rows
+
+def test_export():
+    print("🧪 Probando exportación para analítica...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "feedback.db"))
+        for i in range(25):
+            db.log_conversation(f"user_{i % 3}", f"query {i}", f"response {i}", response_time=0.1 * i)
+        db.add_feedback("user_0", "query 0", "response 0", "positive", conversation_id=1)
+
+        out = os.path.join(tmp, "export")
+        exporter = AnalyticsExporter(out_dir=out, file_format='jsonl', chunk_size=10, database=db)
+        exporter.lag = -60  # the test rows are brand new
+
+        # Test 1: Primera exportación completa, por bloques
+        print("\n1. Probando primera exportación...")
+        assert exporter.run() == {'conversation_logs': 25, 'feedback': 1}
+        rows = read_export(os.path.join(out, "conversation_logs"))
+        assert [row['id'] for row in rows] == list(range(1, 26))
+        assert rows[3]['query'] == "query 3"
+        print("✅ 25 conversaciones y 1 feedback exportados")
+
+        # Test 2: Solo las filas nuevas en la siguiente ejecución
+        print("\n2. Probando exportación incremental...")
+        assert exporter.run() == {'conversation_logs': 0, 'feedback': 0}
+        for i in range(5):
+            db.log_conversation("user_9", f"new {i}", "response")
+        assert exporter.run() == {'conversation_logs': 5, 'feedback': 0}
+        assert exporter.load_state() == {'conversation_logs': 30, 'feedback': 1}
+        assert len(os.listdir(os.path.join(out, "conversation_logs"))) == 2
+        assert [row['id'] for row in read_export(os.path.join(out, "conversation_logs"))] == list(range(1, 31))
+        print("✅ Solo se exportaron las 5 filas nuevas")
+
+        # Test 3: Las filas demasiado recientes esperan a la siguiente ejecución
+        print("\n3. Probando margen para filas recientes...")
+        db.log_conversation("user_9", "recent", "response")
+        exporter.lag = 300
+        assert exporter.run()['conversation_logs'] == 0
+        assert exporter.load_state()['conversation_logs'] == 30
+        print("✅ Fila reciente pendiente")
+
+        db.close()
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_export()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar la respuesta directa sin LLM
+"""
+import os
+from unittest import mock
+from airtable_client import AirtableClient, analyze_query
+from fast_path import FastPathRouter, routing_record
+
+class FakeAirtableClient:
+    def match_confidence(self, record, query):
+        query_words = max(1, len([word for word in query.lower().split() if len(word) > 2]))
+        return min(1.0, record.get('match_score', 0) / query_words)
+
+def test_fast_path():
+    print("🧪 Probando respuesta directa...")
+
+    router = FastPathRouter(enabled=True, example_threshold=0.95, airtable_threshold=0.75, airtable_margin=0.25)
+    fridge = {'id': 'rec1', 'match_score': 2, 'fields': {'Code': 'Refrigerator', 'Make (Brand)': 'Samsung', 'Model': 'RF28'}}
+    toaster = {'id': 'rec2', 'match_score': 0, 'fields': {'Code': 'Toaster', 'Make (Brand)': 'Oster'}}
+
+    # Test 1: Ejemplo casi idéntico
+    print("\n1. Probando ejemplo casi idéntico...")
+    examples = [{'id': 'example_1', 'score': 1.05, 'original_score': 0.97, 'response': 'The fridge is a Samsung.'}]
+    decision = router.route("what brand is the fridge", 'appliances', None, examples)
+    assert decision['route'] == 'example' and decision['reply'] == 'The fridge is a Samsung.', decision
+    print(f"✅ {decision}")
+
+    # Test 2: Un único item claro en Airtable
+    print("\n2. Probando item de Airtable...")
+    data = {'items': [fridge, toaster], 'houses': []}
+    decision = router.route("fridge brand", 'appliances', data, [], FakeAirtableClient())
+    assert decision['route'] == 'airtable', decision
+    assert decision['reply'] == "The Refrigerator is a Samsung (model RF28).", decision
+    print(f"✅ {decision}")
+
+    # Test 3: Baja confianza va al Assistant
+    print("\n3. Probando baja confianza...")
+    examples = [{'id': 'example_2', 'score': 0.9, 'original_score': 0.85, 'response': 'Check-in is at 3 PM.'}]
+    decision = router.route("can I check in early?", 'general', None, examples)
+    assert decision['route'] == 'llm' and decision['reply'] is None, decision
+    print(f"✅ {decision}")
+
+    # Test 4: Un umbral explícito de 0 se respeta
+    print("\n4. Probando umbrales a cero...")
+    assert FastPathRouter(airtable_margin=0).airtable_margin == 0
+    assert FastPathRouter(example_threshold=0.0).example_threshold == 0.0
+    print("✅ Umbrales a cero respetados")
+
+    # Test 5: Sin Airtable configurado se enruta sin cliente
+    print("\n5. Probando Airtable sin configurar...")
+    env = {k: v for k, v in os.environ.items() if k not in ('AIRTABLE_API_KEY', 'AIRTABLE_BASE_ID')}
+    with mock.patch.dict(os.environ, env, clear=True):
+        try:
+            AirtableClient()
+            assert False, "AirtableClient should need its credentials"
+        except ValueError:
+            pass
+        analysis = analyze_query("What brand is the fridge?")
+        assert analysis['query_type'] == 'appliances'
+        decision = router.route("fridge brand", analysis['query_type'], None, [], None)
+        assert decision['route'] == 'llm', decision
+        routing = routing_record("fridge brand", analysis['query_type'], ['pinecone'], decision, [], None, None)
+        assert routing['candidates'] == '[]' and routing['sources'] == 'pinecone', routing
+    print("✅ Consulta enrutada sin cliente de Airtable")
+
+    print(f"\n📊 Métricas: {router.get_metrics()}")
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_fast_path()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar el procesamiento por lotes del feedback
+"""
+import os
+import tempfile
+from database import DatabaseManager
+from feedback_worker import FeedbackWorker
+
+class FakePinecone:
+    """Guarda los vectores en memoria y puede fallar una vez"""
+
+    def __init__(self):
+        self.vectors = {}
+        self.embedding_calls = 0
+        self.fail_next_upsert = False
+
+    def create_embeddings(self, texts):
+        self.embedding_calls += 1
+        return [[float(len(text))] for text in texts]
+
+    def upsert_examples(self, examples):
+        if self.fail_next_upsert:
+            self.fail_next_upsert = False
+            return False
+        for example in examples:
+            self.vectors[example['id']] = example
+        return True
+
+def test_feedback_worker():
+    print("🧪 Probando procesamiento de feedback...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "feedback.db"))
+        for i in range(7):
+            feedback_type = 'positive' if i % 3 == 2 else 'example_response'
+            db.add_feedback(f"user_{i}", f"query {i}", f"response {i}", feedback_type, f"expected {i}")
+        pinecone = FakePinecone()
+        worker = FeedbackWorker(database=db, pinecone_manager=pinecone, batch_size=3)
+
+        # Test 1: Un lote fallido detiene la pasada sin marcar sus filas
+        print("\n1. Probando lote fallido...")
+        pinecone.fail_next_upsert = True
+        assert worker.run_once() == 0
+        assert len(db.get_unprocessed_feedback()) == 7
+        print("✅ Nada marcado como procesado")
+
+        # Test 2: Se reanuda y procesa todo por lotes, con un embedding por lote
+        print("\n2. Probando reanudación...")
+        assert worker.run_once() == 7
+        assert db.get_unprocessed_feedback() == []
+        assert sorted(pinecone.vectors) == sorted(f"feedback_{i}" for i in (1, 2, 4, 5, 7)), sorted(pinecone.vectors)
+        assert pinecone.vectors['feedback_1']['metadata']['response'] == "expected 0"
+        assert pinecone.embedding_calls == 4  # 3 batches, plus the failed one
+        print(f"✅ Métricas: {worker.get_metrics()}")
+
+        # Test 3: Una segunda pasada no repite nada
+        print("\n3. Probando idempotencia...")
+        assert worker.run_once() == 0 and pinecone.embedding_calls == 4
+        print("✅ Sin trabajo pendiente")
+
+        # Test 4: El feedback anterior al worker ya está en Pinecone
+        print("\n4. Probando migración del feedback existente...")
+        db.add_feedback("user_9", "old query", "old response", 'example_response', "old expected")
+        with db._connect() as conn:
+            conn.execute("PRAGMA user_version = 6")
+        db.migrate()
+        assert db.get_unprocessed_feedback() == []
+        assert worker.run_once() == 0 and pinecone.embedding_calls == 4
+        print("✅ Feedback antiguo marcado como procesado")
+
+        db.close()
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_feedback_worker()
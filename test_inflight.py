@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar la cancelación de consultas obsoletas
+"""
+from inflight import InFlightTracker, RequestSuperseded
+
+def test_inflight():
+    print("🧪 Probando consultas en curso...")
+
+    # Test 1: Política merge
+    print("\n1. Probando política merge...")
+    tracker = InFlightTracker(policy="merge")
+    old = tracker.begin("chat_a", ["is the pool heated?"])
+    assert tracker.supersede("chat_a")
+    try:
+        old.check()
+        assert False, "la consulta debería estar cancelada"
+    except RequestSuperseded:
+        pass
+    assert not old.mark_replied()
+    tracker.finish(old)
+    new = tracker.begin("chat_a", ["sorry, I meant the hot tub"])
+    assert new.texts == ["is the pool heated?", "sorry, I meant the hot tub"], new.texts
+    print(f"✅ Texto combinado: {new.texts}")
+
+    # Test 2: Una respuesta ya enviada no se cancela
+    print("\n2. Probando respuesta ya enviada...")
+    assert new.mark_replied()
+    assert not tracker.supersede("chat_a")
+    tracker.finish(new)
+    print("✅ Respuesta enviada no se cancela")
+
+    # Test 3: Política queue
+    print("\n3. Probando política queue...")
+    tracker = InFlightTracker(policy="queue")
+    request = tracker.begin("chat_b", ["hi"])
+    assert not tracker.supersede("chat_b")
+    assert not request.cancelled
+    print("✅ La consulta anterior sigue en curso")
+
+    print(f"\n📊 Métricas: {tracker.get_metrics()}")
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_inflight()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar las particiones mensuales y el archivo de logs
+"""
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+from database import DatabaseManager
+from log_retention import LogRetention
+
+def test_log_retention():
+    print("🧪 Probando retención de logs...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "feedback.db"))
+        rows = []
+        for month, count in (("2025-12", 3), ("2026-08", 4), ("2026-09", 2), ("2026-10", 5)):
+            for i in range(count):
+                rows.append((None, f"{month}-1{i} 12:00:00", f"user_{i}", f"query {month} {i}", "response", 1.0, True, False))
+        with db._connect() as conn:
+            conn.executemany('''
+                INSERT INTO conversation_logs (id, timestamp, user_id, query, response, response_time, used_rag, used_airtable)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            # Registros de enrutamiento: uno archivado (2), uno en partición (5) y uno caliente (14)
+            conn.executemany(
+                "INSERT INTO routing_log (conversation_id, query_type, route, sources) VALUES (?, 'amenities', ?, 'pinecone')",
+                [(2, 'llm'), (5, 'example'), (14, 'llm')]
+            )
+        stats_before = db.get_feedback_stats()
+
+        retention = LogRetention(db_path=db.db_path, partition_dir=os.path.join(tmp, "partitions"),
+                                 hot_months=2, archive_months=6, vacuum_min_free=0.0)
+        now = datetime(2026, 10, 19)
+
+        # Test 1: Los meses fuera de la ventana caliente pasan a particiones
+        print("\n1. Probando particiones mensuales...")
+        assert retention.roll_partitions(now) == 7
+        assert retention.roll_partitions(now) == 0  # idempotente
+        with db._connect() as conn:
+            remaining = conn.execute("SELECT COUNT(*) FROM conversation_logs").fetchone()[0]
+        assert remaining == 7
+        with db._connect() as conn:
+            assert conn.execute("SELECT conversation_id FROM routing_log").fetchall() == [(14,)]
+        partition = sqlite3.connect(os.path.join(tmp, "partitions", "conversations_2026_08.db"))
+        assert partition.execute("SELECT conversation_id, route FROM routing_log").fetchall() == [(5, 'example')]
+        partition.close()
+        print("✅ 7 conversaciones movidas con su enrutamiento, 7 siguen en la base caliente")
+
+        # Test 2: Las particiones antiguas se comprimen
+        print("\n2. Probando archivo comprimido...")
+        assert retention.archive_partitions(now) == ["2025-12"]
+        partitions = {p['month']: p for p in retention.list_partitions()}
+        assert partitions["2025-12"]['status'] == 'archive' and partitions["2025-12"]['rows'] == 3
+        assert partitions["2026-08"]['status'] == 'partition' and partitions["2026-08"]['rows'] == 4
+        assert not os.path.exists(os.path.join(tmp, "partitions", "conversations_2025_12.db"))
+        print(f"✅ Particiones: {sorted(partitions)}")
+
+        # Test 3: Búsqueda por id en todos los niveles
+        print("\n3. Probando búsqueda por id...")
+        assert retention.find_conversation(2)['query'] == "query 2025-12 1"   # archivo
+        assert retention.find_conversation(2)['routing']['route'] == 'llm'
+        assert 'routing' not in retention.find_conversation(1)
+        assert retention.find_conversation(5)['query'] == "query 2026-08 1"   # partición
+        assert retention.find_conversation(14)['query'] == "query 2026-10 4"  # base caliente
+        assert retention.find_conversation(999) is None
+        print("✅ Conversaciones encontradas")
+
+        # Test 4: Un mes archivado no se reescribe
+        print("\n4. Probando filas tardías de un mes archivado...")
+        with db._connect() as conn:
+            late = conn.execute('''
+                INSERT INTO conversation_logs (timestamp, user_id, query, response, response_time, used_rag, used_airtable)
+                VALUES ('2025-12-31 23:59:00', 'user_9', 'late query', 'response', 1.0, 1, 0)
+            ''').lastrowid
+        assert retention.roll_partitions(now) == 0
+        partitions = {p['month']: p for p in retention.list_partitions()}
+        assert partitions["2025-12"]['status'] == 'archive' and partitions["2025-12"]['rows'] == 3
+        assert retention.find_conversation(2)['query'] == "query 2025-12 1"
+        assert retention.find_conversation(late)['query'] == "late query"
+        assert retention.get_metrics()['skipped_months'] == 1
+        print("✅ Archivo intacto, la fila tardía sigue en la base caliente")
+
+        # Test 5: Los contadores no cambian y VACUUM recupera espacio
+        print("\n5. Probando contadores y VACUUM...")
+        db.stats_ttl = 0
+        assert db.get_feedback_stats() == stats_before
+        assert retention.vacuum_if_needed()
+        db.close()
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_log_retention()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar el registro de conversaciones por lotes
+"""
+import os
+import tempfile
+import time
+from database import DatabaseManager
+from log_writer import ConversationLogWriter
+
+def test_log_writer():
+    print("🧪 Probando registro por lotes...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "feedback.db"))
+        writer = ConversationLogWriter(database=db, batch_size=50, flush_interval=0.1, id_block=20)
+        writer.start()
+
+        # Test 1: Los ids se devuelven al instante, antes de escribir la fila
+        print("\n1. Probando ids pre-asignados...")
+        ids = [writer.log("user_1", f"query {i}", f"response {i}", response_time=0.5, used_rag=True) for i in range(45)]
+        assert ids == list(range(1, 46)), ids
+        print(f"✅ Ids {ids[0]}..{ids[-1]} asignados sin esperar a SQLite")
+
+        # Test 2: Un log directo no reutiliza ids reservados
+        print("\n2. Probando reserva de bloques...")
+        direct_id = db.log_conversation("user_2", "direct", "row")
+        assert direct_id > 60, direct_id
+        print(f"✅ Log directo con id {direct_id}")
+
+        # Test 3: Escritura por tiempo y en lote
+        print("\n3. Probando flush...")
+        time.sleep(0.3)
+        assert writer.get_metrics()['queued'] == 0
+        last = db.get_last_conversation("user_1")
+        assert last['id'] in ids
+        for i in range(45, 100):
+            writer.log("user_1", f"query {i}", f"response {i}")
+        writer.stop()
+        metrics = writer.get_metrics()
+        assert metrics['written'] == 100 and metrics['queued'] == 0, metrics
+        assert db.get_feedback_stats()['total_conversations'] == 101
+        print(f"✅ Métricas: {metrics}")
+
+        # Test 4: Tiempos por etapa y tokens en la misma fila
+        print("\n4. Probando telemetría...")
+        writer = ConversationLogWriter(database=db, batch_size=50, flush_interval=0.1, id_block=20)
+        telemetry = {'routing_ms': 1.5, 'embedding_ms': 80.0, 'pinecone_ms': 25.0, 'run_create_ms': 300.0,
+                     'poll_wait_ms': 2100.0, 'send_ms': 90.0, 'prompt_tokens': 812, 'completion_tokens': 95, 'poll_count': 3}
+        conversation_id = writer.log("user_3", "query", "response", used_rag=True, used_pinecone=True, telemetry=telemetry)
+        writer.stop()
+        row = db._connect().execute(
+            "SELECT used_pinecone, airtable_ms, poll_wait_ms, prompt_tokens, poll_count FROM conversation_logs WHERE id = ?",
+            (conversation_id,)
+        ).fetchone()
+        assert row == (1, None, 2100.0, 812, 3), row
+        print(f"✅ Fila {conversation_id}: {row}")
+
+        # Test 5: El tiempo de envío llega tras la entrega
+        print("\n5. Probando send_ms diferido...")
+        pending = writer.log("user_4", "query", "response")
+        writer.record_send(pending, 40.0)  # antes de escribir la fila
+        writer.flush()
+        writer.record_send(conversation_id, 120.0)  # fila ya escrita
+        writer.flush()
+        send_ms = dict(db._connect().execute(
+            "SELECT id, send_ms FROM conversation_logs WHERE id IN (?, ?)", (pending, conversation_id)
+        ).fetchall())
+        assert send_ms == {pending: 40.0, conversation_id: 120.0}, send_ms
+        print(f"✅ send_ms: {send_ms}")
+
+        # Test 6: Una fila imposible de escribir no bloquea las demás
+        print("\n6. Probando fila defectuosa...")
+        writer.max_retries = 2
+        writer.log("user_5", "good", "row")
+        with writer._lock:
+            writer._rows.append((pending,) + writer._rows[-1][1:])  # id repetido: IntegrityError
+        writer.log("user_5", "good too", "row")
+        writer.flush()
+        assert writer.get_metrics()['queued'] == 3
+        writer.flush()
+        metrics = writer.get_metrics()
+        assert metrics['queued'] == 0 and metrics['dropped'] == 1, metrics
+        queries = [row[0] for row in db._connect().execute("SELECT query FROM conversation_logs WHERE user_id = 'user_5'")]
+        assert sorted(queries) == ["good", "good too"], queries
+        print(f"✅ Métricas: {metrics}")
+
+        db.close()
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_log_writer()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar el registro de enrutamiento y su reproducción
+"""
+import json
+import os
+import tempfile
+from database import DatabaseManager
+from fast_path import FastPathRouter, routing_record
+from log_writer import ConversationLogWriter
+from replay_routing import replay, replay_route
+
+class FakeAirtable:
+    def match_confidence(self, record, query):
+        return record['match_score']
+
+def test_replay_routing():
+    print("🧪 Probando registro de enrutamiento...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "feedback.db"))
+        writer = ConversationLogWriter(database=db, batch_size=50, flush_interval=0.1, id_block=20)
+        examples = [{'id': 'feedback_1', 'score': 0.97, 'original_score': 0.92, 'response': 'In the patio'}]
+        airtable_data = {'items': [{'id': 'rec1', 'match_score': 0.9}, {'id': 'rec2', 'match_score': 0.2}], 'houses': []}
+        llm = {'route': 'llm', 'confidence': 0.92}
+
+        # Test 1: El registro se escribe con la conversación
+        print("\n1. Probando registro...")
+        routing = routing_record("Where is the jacuzzi?", 'amenities', ['airtable', 'pinecone'], llm, examples,
+                                 {'items': [], 'houses': []}, FakeAirtable(),
+                                 {'sources': ['pinecone'], 'tokens': 120, 'packed': 1})
+        first = writer.log("user_1", "Where is the jacuzzi?", "In the patio", used_rag=True, routing=routing)
+        routing = routing_record("Which fridge brand?", 'appliances', ['airtable', 'pinecone'], llm, [],
+                                 airtable_data, FakeAirtable(), {'sources': ['airtable'], 'tokens': 300, 'packed': 2})
+        writer.log("user_2", "Which fridge brand?", "A Bosch", used_rag=True, routing=routing)
+        routing = routing_record("hello", 'general', ['pinecone'], llm, [], None, None,
+                                 {'sources': [], 'tokens': 0, 'packed': 0})
+        writer.log("user_3", "hello", "Hi!", used_rag=True, routing=routing)
+        writer.stop()
+        records = [record for chunk in db.iter_routing_log() for record in chunk]
+        assert len(records) == 3
+        assert records[0]['candidates'] == '[["pinecone","feedback_1",0.92]]', records[0]
+        assert records[1]['used_sources'] == 'airtable' and records[1]['context_tokens'] == 300
+        print(f"✅ {len(records)} registros")
+
+        # Test 2: La reproducción cuenta las búsquedas desperdiciadas
+        print("\n2. Probando reproducción...")
+        report = replay(records, FastPathRouter(enabled=True, example_threshold=0.9))
+        amenities = report['categories']['amenities']
+        assert amenities['airtable_lookups'] == 1 and amenities['airtable_used'] == 0
+        assert amenities['pinecone_lookups'] == 1 and amenities['pinecone_used'] == 1
+        assert report['routes'] == {'llm': 3}
+        assert report['replayed_routes'] == {'example': 1, 'airtable': 1, 'llm': 1}, report['replayed_routes']
+        assert not report['category_changes']
+        print(f"✅ Rutas con los nuevos umbrales: {dict(report['replayed_routes'])}")
+
+        # Test 3: El registro se borra con su conversación
+        print("\n3. Probando borrado...")
+        with db._connect() as conn:
+            conn.execute("DELETE FROM conversation_logs WHERE id = ?", (first,))
+            assert conn.execute("SELECT COUNT(*) FROM routing_log").fetchone()[0] == 2
+        print("✅ Registro borrado")
+
+        # Test 4: La reproducción coincide con el enrutamiento en vivo
+        print("\n4. Probando que reproducción y ruta en vivo coinciden...")
+        router = FastPathRouter(enabled=True, example_threshold=0.9, airtable_threshold=0.75, airtable_margin=0.25)
+        fridge = {'id': 'rec1', 'match_score': 0.9, 'fields': {'Code': 'Refrigerator', 'Make (Brand)': 'Samsung'}}
+        oven = {'id': 'rec2', 'match_score': 0.8, 'fields': {'Code': 'Oven', 'Make (Brand)': 'Bosch'}}
+        toaster = {'id': 'rec3', 'match_score': 0.1, 'fields': {'Code': 'Toaster', 'Make (Brand)': 'Oster'}}
+        cases = [
+            ('appliances', examples, {'items': [fridge, toaster], 'houses': []}),  # ejemplo
+            ('appliances', [], {'items': [fridge, toaster], 'houses': []}),        # item claro
+            ('appliances', [], {'items': [fridge, oven], 'houses': []}),           # sin margen
+            ('amenities', [], {'items': [fridge], 'houses': []}),                  # no es electrodoméstico
+            ('general', [{'id': 'feedback_2', 'score': 0.9, 'original_score': 0.6, 'response': 'Hi'}], None),
+        ]
+        for query_type, case_examples, data in cases:
+            decision = router.route("fridge brand", query_type, data, case_examples, FakeAirtable())
+            record = routing_record("fridge brand", query_type, ['pinecone'], decision, case_examples, data, FakeAirtable())
+            assert replay_route(query_type, json.loads(record['candidates']), router) == decision['route'], (query_type, decision)
+        print(f"✅ {len(cases)} casos coinciden")
+
+        db.close()
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_replay_routing()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar la cola de envío de mensajes
+"""
+import threading
+import time
+from send_queue import OutboundScheduler, split_message
+
+class RetryAfter(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Flood control exceeded. Retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+class BadRequest(Exception):
+    pass
+
+def test_split_message():
+    print("🧪 Probando división de mensajes...")
+    text = ("line " * 300 + "\n") * 5
+    parts = split_message(text)
+    assert all(len(part) <= 4096 for part in parts), [len(p) for p in parts]
+    assert "".join(parts).replace("\n", "").replace(" ", "") == text.replace("\n", "").replace(" ", "")
+    assert split_message("hola") == ["hola"]
+    print(f"✅ {len(text)} caracteres divididos en {len(parts)} partes")
+
+def test_send_queue():
+    print("🧪 Probando cola de envío...")
+
+    sent = []
+    lock = threading.Lock()
+    flooded = []
+
+    def send_func(chat_id, text, reply_to):
+        with lock:
+            if text == "b1" and not flooded:
+                flooded.append(time.monotonic())
+                raise RetryAfter(0.2)
+            sent.append((chat_id, text, time.monotonic()))
+
+    scheduler = OutboundScheduler(send_func, global_rate=100, per_chat_interval=0.05, senders=3)
+    scheduler.start()
+
+    delivered = []
+    for i in range(3):
+        scheduler.send("chat_a", f"a{i}")
+        scheduler.send("chat_b", f"b{i}", on_sent=delivered.append)
+    scheduler.stop(drain=True)
+
+    # Test 1: Orden por chat, aun con varios hilos y un reintento
+    print("\n1. Probando orden por chat...")
+    assert [t for c, t, _ in sent if c == "chat_a"] == ["a0", "a1", "a2"], sent
+    assert [t for c, t, _ in sent if c == "chat_b"] == ["b0", "b1", "b2"], sent
+    print("✅ Orden respetado")
+
+    # Test 2: retry_after pausa todos los envíos
+    print("\n2. Probando retry_after...")
+    b1_at = [at for c, t, at in sent if t == "b1"][0]
+    assert b1_at - flooded[0] >= 0.2, b1_at - flooded[0]
+    assert delivered == [True, True, True]
+    print("✅ Reintento tras la espera indicada")
+
+    metrics = scheduler.get_metrics()
+    assert metrics['sent'] == 6 and metrics['flood_waits'] == 1, metrics
+    print(f"\n📊 Métricas: {metrics}")
+
+    # Test 3: Los errores permanentes no se reintentan
+    print("\n3. Probando errores permanentes...")
+    attempts = []
+
+    def failing_send(chat_id, text, reply_to):
+        attempts.append(text)
+        raise BadRequest("Chat not found")
+
+    scheduler = OutboundScheduler(failing_send, global_rate=100, per_chat_interval=0.01, senders=1)
+    scheduler.start()
+    results = []
+    scheduler.send("chat_gone", "hola", on_sent=results.append)
+    scheduler.stop(drain=True)
+    assert attempts == ["hola"] and results == [False], (attempts, results)
+    assert scheduler.get_metrics()['retried'] == 0
+    print("✅ Mensaje descartado sin reintentos")
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_split_message()
+    test_send_queue()
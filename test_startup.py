@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar las comprobaciones de arranque en paralelo
+"""
+import time
+from startup import StartupChecks
+
+def test_startup():
+    print("🧪 Probando comprobaciones de arranque...")
+
+    # Test 1: Las comprobaciones corren en paralelo
+    print("\n1. Probando ejecución en paralelo...")
+    checks = StartupChecks(timeout=1.0)
+    checks.add('database', lambda: time.sleep(0.2), required=True)
+    checks.add('airtable', lambda: time.sleep(0.2))
+    checks.add('pinecone', lambda: time.sleep(0.2))
+    started = time.monotonic()
+    assert checks.run()
+    elapsed = time.monotonic() - started
+    assert elapsed < 0.4, elapsed
+    assert checks.degraded() == []
+    checks.print_report()
+    print(f"✅ 3 comprobaciones en {elapsed:.2f}s")
+
+    # Test 2: Un backend opcional lento deja el bot en modo degradado
+    print("\n2. Probando modo degradado...")
+    checks = StartupChecks(timeout=0.1, retry_interval=0.2)
+    checks.add('database', lambda: True, required=True)
+    checks.add('pinecone', lambda: time.sleep(0.3))
+    attempts = []
+    checks.add('airtable', lambda: attempts.append(1) or len(attempts) > 1)
+    started = time.monotonic()
+    assert checks.run()
+    assert time.monotonic() - started < 0.2
+    assert not checks.is_ready('pinecone') and not checks.is_ready('airtable')
+    checks.print_report()
+    time.sleep(0.4)
+    assert checks.is_ready('pinecone'), checks.get_metrics()
+    assert checks.is_ready('airtable'), checks.get_metrics()
+    print("✅ Backends recuperados en segundo plano")
+
+    # Test 3: Una comprobación obligatoria que falla detiene el arranque
+    print("\n3. Probando comprobación obligatoria...")
+    checks = StartupChecks(timeout=0.1)
+    checks.add('openai', lambda: 1 / 0, required=True)
+    assert not checks.run()
+    assert checks.get_metrics()['openai']['status'] == 'failed'
+    print("✅ Arranque abortado")
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_startup()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar el almacenamiento compartido de estado por chat
+"""
+import os
+import tempfile
+from state_store import MemoryStateStore, SQLiteStateStore, StateStore, register_backend
+
+def check_store(store):
+    assert store.get_thread("chat_a") is None
+    store.set_thread("chat_a", "thread_1")
+    store.set_thread("chat_a", "thread_2")
+    assert store.get_thread("chat_a") == "thread_2"
+
+    assert store.get_user_state("chat_a") == {}
+    store.update_user_state("chat_a", mode="waiting_feedback")
+    state = store.update_user_state("chat_a", last_conversation_id=42)
+    assert state == {'mode': 'waiting_feedback', 'last_conversation_id': 42}, state
+    assert store.get_user_state("chat_a") == state
+
+def test_state_store():
+    print("🧪 Probando almacenamiento de estado...")
+
+    # Test 1: Backend en memoria
+    print("\n1. Probando backend en memoria...")
+    check_store(MemoryStateStore())
+    print("✅ Backend en memoria correcto")
+
+    # Test 2: Backend SQLite compartido entre instancias (como entre procesos)
+    print("\n2. Probando backend SQLite...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "state.db")
+        check_store(SQLiteStateStore(path))
+        other = SQLiteStateStore(path)
+        assert other.get_thread("chat_a") == "thread_2"
+        assert other.get_user_state("chat_a")['last_conversation_id'] == 42
+    print("✅ Backend SQLite correcto")
+
+    # Test 3: Un backend incompleto falla al registrarlo
+    print("\n3. Probando backend incompleto...")
+
+    class ThreadsOnly(StateStore):
+        def get_thread(self, chat_id):
+            return None
+
+        def set_thread(self, chat_id, thread_id):
+            pass
+
+    try:
+        register_backend("threads_only", ThreadsOnly)
+        assert False, "register_backend should reject an incomplete backend"
+    except TypeError as e:
+        assert "get_user_state" in str(e), e
+    print("✅ Backend incompleto rechazado")
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_state_store()
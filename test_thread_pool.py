@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar el pool de threads pre-creados del Assistant
+"""
+import itertools
+import threading
+import time
+from thread_pool import AssistantThreadPool
+
+def test_thread_pool():
+    print("🧪 Probando pool de threads...")
+
+    counter = itertools.count()
+    lock = threading.Lock()
+    deleted = []
+
+    def create():
+        time.sleep(0.01)
+        with lock:
+            return f"thread_{next(counter)}"
+
+    pool = AssistantThreadPool(create_func=create, delete_func=deleted.append, size=3)
+    pool.start()
+
+    # Test 1: El pool se llena en segundo plano
+    print("\n1. Probando llenado...")
+    deadline = time.monotonic() + 2
+    while pool.get_metrics()['ready'] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.get_metrics()['ready'] == 3
+    print("✅ 3 threads listos")
+
+    # Test 2: Un chat nuevo toma un thread al instante y el pool se rellena
+    print("\n2. Probando claim...")
+    started = time.monotonic()
+    thread_id = pool.claim()
+    assert time.monotonic() - started < 0.005
+    assert thread_id == "thread_0"
+    time.sleep(0.1)
+    assert pool.get_metrics()['ready'] == 3
+    print(f"✅ Claim instantáneo: {thread_id}")
+
+    # Test 3: Los threads no usados se borran al parar
+    print("\n3. Probando limpieza...")
+    pool.stop()
+    assert sorted(deleted) == ["thread_1", "thread_2", "thread_3"], deleted
+    assert pool.claim() == "thread_4"  # vacío: se crea en línea
+    metrics = pool.get_metrics()
+    assert metrics['created_inline'] == 1 and metrics['deleted'] == 3, metrics
+    print(f"✅ Métricas: {metrics}")
+
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_thread_pool()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar el servidor de webhook
+"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from webhook_server import WebhookServer, SECRET_HEADER
+
+def post(server, body, secret):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.port}{server.path}",
+        data=json.dumps(body).encode(),
+        headers={SECRET_HEADER: secret, "Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def test_webhook():
+    print("🧪 Probando servidor de webhook...")
+
+    received = []
+    release = threading.Event()
+
+    def on_update(update):
+        release.wait(timeout=5)
+        received.append(update['update_id'])
+
+    server = WebhookServer(on_update=on_update, listen="127.0.0.1", port=0, path="/telegram",
+                           secret="test-secret", queue_size=2)
+    server.start()
+
+    # Test 1: Token secreto inválido
+    print("\n1. Probando token inválido...")
+    assert post(server, {'update_id': 1}, "wrong") == 403
+    print("✅ Rechazado con 403")
+
+    # Test 2: Cola acotada
+    print("\n2. Probando cola acotada...")
+    statuses = [post(server, {'update_id': 1}, "test-secret")]
+    time.sleep(0.1)
+    statuses += [post(server, {'update_id': i}, "test-secret") for i in range(2, 5)]
+    # One update is held by the consumer, two wait in the queue, the last one is rejected
+    assert statuses == [200, 200, 200, 503], statuses
+    print(f"✅ Respuestas: {statuses}")
+
+    release.set()
+    server.stop()
+    assert received == [1, 2, 3], received
+    print(f"✅ Updates procesados: {received}")
+
+    print(f"\n📊 Métricas: {server.get_metrics()}")
+    print("\n🎉 ¡Todas las pruebas pasaron exitosamente!")
+
+if __name__ == "__main__":
+    test_webhook()
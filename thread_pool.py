@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Module to keep a warm pool of pre-created OpenAI Assistant threads for new chats
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+
+
+class AssistantThreadPool:
+    """
+    Pre-creates Assistant threads with create_func() so a new chat can claim
+    one instantly instead of waiting for threads.create().
+
+    A background thread keeps size threads ready, refilling after each
+    claim. When the pool is empty claim() falls back to creating a thread
+    inline. On stop() the unclaimed threads are deleted with delete_func.
+    """
+
+    def __init__(self, create_func: Callable[[], str], delete_func: Callable[[str], Any] = None, size: int = None):
+        self.create_func = create_func
+        self.delete_func = delete_func
+        self.size = size if size is not None else int(os.environ.get("ASSISTANT_THREAD_POOL_SIZE", "5"))
+
+        self._lock = threading.Condition()
+        self._ready = deque()
+        self._running = False
+        self._refiller = None
+        self._counters = {'claimed': 0, 'created_inline': 0, 'prefilled': 0, 'errors': 0, 'deleted': 0}
+
+    def start(self):
+        with self._lock:
+            if self._running or self.size <= 0:
+                return
+            self._running = True
+        self._refiller = threading.Thread(target=self._refill_loop, name="thread-pool", daemon=True)
+        self._refiller.start()
+
+    def _refill_loop(self):
+        backoff = 1.0
+        while True:
+            with self._lock:
+                while self._running and len(self._ready) >= self.size:
+                    self._lock.wait()
+                if not self._running:
+                    return
+            try:
+                thread_id = self.create_func()
+            except Exception as e:
+                with self._lock:
+                    self._counters['errors'] += 1
+                print(f"⚠️ Could not pre-create Assistant thread: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+            backoff = 1.0
+            with self._lock:
+                self._ready.append(thread_id)
+                self._counters['prefilled'] += 1
+
+    def claim(self) -> str:
+        """Take a ready thread, or create one inline when the pool is empty"""
+        with self._lock:
+            if self._ready:
+                self._counters['claimed'] += 1
+                thread_id = self._ready.popleft()
+                self._lock.notify()
+                return thread_id
+            self._counters['created_inline'] += 1
+        return self.create_func()
+
+    def stop(self, cleanup: bool = True):
+        """Stop refilling and delete the threads nobody claimed"""
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+            unclaimed = list(self._ready)
+            self._ready.clear()
+        if self._refiller:
+            self._refiller.join(timeout=5.0)
+            # A create that was in flight may have added one more
+            with self._lock:
+                unclaimed.extend(self._ready)
+                self._ready.clear()
+        if not cleanup or not self.delete_func:
+            return
+        for thread_id in unclaimed:
+            try:
+                self.delete_func(thread_id)
+                self._counters['deleted'] += 1
+            except Exception as e:
+                print(f"⚠️ Could not delete unused Assistant thread {thread_id}: {e}")
+        if unclaimed:
+            print(f"🧹 Deleted {self._counters['deleted']} unused Assistant threads")
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            metrics = dict(self._counters)
+            metrics['ready'] = len(self._ready)
+            metrics['size'] = self.size
+            return metrics
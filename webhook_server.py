@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Module to receive Telegram updates through a webhook instead of long polling
+"""
+import hmac
+import json
+import os
+import queue
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """
+    Embedded HTTP server for Telegram webhooks.
+
+    Requests are authenticated with the secret token Telegram echoes in the
+    X-Telegram-Bot-Api-Secret-Token header, parsed, and put on a bounded
+    ingest queue. When the queue is full the server answers 503 so Telegram
+    retries later instead of us buffering without limit. Consumer threads
+    take updates off the queue and call on_update(update_dict).
+
+    Locally it can be exercised by POSTing captured update JSON:
+        curl -X POST -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET" \\
+             --data @update.json http://localhost:8443/telegram
+    """
+
+    def __init__(self, on_update: Callable[[Dict[str, Any]], None], listen: str = None, port: int = None,
+                 path: str = None, secret: str = None, queue_size: int = None, consumers: int = 1):
+        self.on_update = on_update
+        self.listen = listen or os.environ.get("WEBHOOK_LISTEN", "0.0.0.0")
+        self.port = port if port is not None else int(os.environ.get("WEBHOOK_PORT", "8443"))
+        self.path = path or os.environ.get("WEBHOOK_PATH", "/telegram")
+        self.secret = secret or os.environ.get("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+        self.consumers = consumers
+
+        self._queue = queue.Queue(maxsize=queue_size or int(os.environ.get("WEBHOOK_QUEUE_SIZE", "1000")))
+        self._httpd = None
+        self._threads = []
+        self._lock = threading.Lock()
+        self._counters = {'received': 0, 'unauthorized': 0, 'invalid': 0, 'rejected_full': 0, 'processed': 0, 'failed': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: Dict[str, Any] = None):
+                payload = json.dumps(body or {}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path == "/healthz":
+                    self._reply(200, server.get_metrics())
+                else:
+                    self._reply(404)
+
+            def do_POST(self):
+                if self.path != server.path:
+                    self._reply(404)
+                    return
+
+                token = self.headers.get(SECRET_HEADER, "")
+                if not hmac.compare_digest(token.encode(), server.secret.encode()):
+                    server._count('unauthorized')
+                    self._reply(403)
+                    return
+
+                try:
+                    length = int(self.headers.get("Content-Length", "0"))
+                    update = json.loads(self.rfile.read(length))
+                    if not isinstance(update, dict):
+                        raise ValueError("update must be a JSON object")
+                except ValueError:
+                    server._count('invalid')
+                    self._reply(400)
+                    return
+
+                try:
+                    server._queue.put_nowait(update)
+                except queue.Full:
+                    server._count('rejected_full')
+                    self._reply(503)
+                    return
+
+                server._count('received')
+                self._reply(200, {'ok': True})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _consume(self):
+        while True:
+            update = self._queue.get()
+            if update is None:
+                return
+            try:
+                self.on_update(update)
+                self._count('processed')
+            except Exception as e:
+                self._count('failed')
+                print(f"❌ Error processing webhook update: {e}")
+
+    def start(self):
+        """Start the HTTP server and the consumer threads"""
+        self._httpd = ThreadingHTTPServer((self.listen, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        # Port 0 picks a free port; expose the real one
+        self.port = self._httpd.server_address[1]
+
+        self._threads = [threading.Thread(target=self._httpd.serve_forever, name="webhook-http", daemon=True)]
+        for i in range(self.consumers):
+            self._threads.append(threading.Thread(target=self._consume, name=f"webhook-consumer-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        print(f"✅ Webhook server listening on {self.listen}:{self.port}{self.path}")
+
+    def stop(self):
+        """Stop accepting requests and let the consumers drain the queue"""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        for _ in range(self.consumers):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        self._threads = []
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._counters)
+        metrics['queue_depth'] = self._queue.qsize()
+        metrics['queue_size'] = self._queue.maxsize
+        return metrics